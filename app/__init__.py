@@ -1,6 +1,7 @@
 from flask import Flask
 from dotenv import load_dotenv
 from .config import AppConfig
+from .db_routing import init_replica_routing
 from .extensions import db, migrate, cors
 from .routes import register_routes
 
@@ -15,12 +16,32 @@ def create_app(config: type[AppConfig] | None = None) -> Flask:
 
     # Extensions
     db.init_app(app)
+    init_replica_routing(app)
     migrate.init_app(app, db)
     cors.init_app(app, resources={r"/*": {"origins": "*"}})
 
     # Blueprints / Routes
     register_routes(app)
 
+    if app.config.get("SQL_PROFILING"):
+        from .services.query_profiler import init_query_profiler
+
+        init_query_profiler(app)
+
+    from .services.sampling_profiler import init_sampling_profiler
+
+    init_sampling_profiler(app)
+
+    if app.config.get("LEAD_ARCHIVE_ENABLED"):
+        from .services.lead_retention import init_lead_archiver
+
+        init_lead_archiver(app)
+
+    if app.config.get("LEAD_WRITE_BEHIND"):
+        from .services.lead_buffer import init_lead_write_behind
+
+        init_lead_write_behind(app)
+
     return app
 
 
@@ -0,0 +1,102 @@
+"""
+ASGI application for running under uvicorn.
+
+WhatsApp webhook deliveries (POST /webhook/whatsapp) are handled on the event
+loop with the asyncio service variants, so one worker can keep many
+conversations in flight while GPT, the stock API and Meta respond. Every other
+route is served by the regular Flask app through uvicorn's WSGI bridge.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+
+from flask import Flask
+from uvicorn.middleware.wsgi import WSGIMiddleware
+
+from . import create_app
+from .routes.webhook import (
+    _iter_text_messages,
+    _process_user_message_async,
+    _send_whatsapp_text_async,
+)
+from .services.async_utils import create_async_http_client
+from .services.metrics import stage_timer
+
+WEBHOOK_PATH = "/webhook/whatsapp"
+
+
+class AsgiApp:
+    """Routes webhook POSTs to the async pipeline and everything else to Flask."""
+
+    def __init__(self, flask_app: Flask) -> None:
+        self.flask_app = flask_app
+        self._wsgi = WSGIMiddleware(
+            flask_app, workers=flask_app.config.get("ASGI_WSGI_THREADS", 10)
+        )
+        self._client = None
+
+    async def __call__(self, scope: dict[str, Any], receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"].rstrip("/") == WEBHOOK_PATH
+        ):
+            await self._receive_message(receive, send)
+        else:
+            await self._wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._client = create_async_http_client()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._client is not None:
+                    await self._client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _receive_message(self, receive, send) -> None:
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = {}
+        if not isinstance(payload, dict):
+            payload = {}
+
+        if self._client is None:
+            # Server started without lifespan support
+            self._client = create_async_http_client()
+
+        with self.flask_app.app_context():
+            await asyncio.gather(
+                *(self._reply(user_id, text) for user_id, text in _iter_text_messages(payload))
+            )
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        })
+        await send({"type": "http.response.body", "body": json.dumps({"status": "ok"}).encode()})
+
+    async def _reply(self, user_id: str, text: str) -> None:
+        with stage_timer("message"):
+            response_text = await _process_user_message_async(user_id, text, self._client)
+            await _send_whatsapp_text_async(self._client, user_id, response_text)
+
+
+def create_asgi_app(flask_app: Flask | None = None) -> AsgiApp:
+    return AsgiApp(flask_app or create_app())
@@ -1,5 +1,6 @@
 import os
 from dataclasses import dataclass, field
+from typing import Any
 
 
 def _env(name: str, default: str | None = None) -> str | None:
@@ -20,28 +21,149 @@ class AppConfig:
         )
     )
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
+    SQLALCHEMY_ENGINE_OPTIONS: dict[str, Any] = field(default_factory=dict)
+    SQLALCHEMY_BINDS: dict[str, str] = field(default_factory=dict)
+
+    # Connection pool, per engine and worker process (sizes are not applied to SQLite)
+    DB_POOL_SIZE: int = int(_env("DB_POOL_SIZE", "10") or 10)
+    DB_MAX_OVERFLOW: int = int(_env("DB_MAX_OVERFLOW", "20") or 20)
+    DB_POOL_TIMEOUT: int = int(_env("DB_POOL_TIMEOUT", "30") or 30)
+    # Recycle before MySQL's wait_timeout closes idle connections server-side
+    DB_POOL_RECYCLE: int = int(_env("DB_POOL_RECYCLE", "1800") or 1800)
+    DB_POOL_PRE_PING: bool = (_env("DB_POOL_PRE_PING", "true") or "").lower() in ("1", "true", "yes")
+
+    # Read replicas for search reads, comma-separated URLs (see app/db_routing.py)
+    DATABASE_REPLICA_URLS: list[str] = field(default_factory=list)
+    # Replicas further behind than this are skipped; the primary serves when none qualify
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(_env("DB_REPLICA_MAX_LAG_SECONDS", "5") or 5)
+    DB_REPLICA_LAG_CHECK_SECONDS: float = float(_env("DB_REPLICA_LAG_CHECK_SECONDS", "5") or 5)
+    # Custom lag query returning seconds (e.g. from a heartbeat table); default per database
+    DB_REPLICA_LAG_QUERY: str | None = _env("DB_REPLICA_LAG_QUERY")
 
     # External services
     OPENAI_API_KEY: str | None = _env("OPENAI_API_KEY")
     OPENAI_MODEL: str = _env("OPENAI_MODEL", "gpt-4o-mini") or "gpt-4o-mini"
+    # OpenAI-compatible endpoint (proxy, load-test stub); unset = api.openai.com
+    OPENAI_BASE_URL: str | None = _env("OPENAI_BASE_URL")
 
     META_VERIFY_TOKEN: str | None = _env("META_VERIFY_TOKEN")
     META_ACCESS_TOKEN: str | None = _env("META_ACCESS_TOKEN")
     META_PHONE_NUMBER_ID: str | None = _env("META_PHONE_NUMBER_ID")
+    META_GRAPH_API_URL: str = (
+        _env("META_GRAPH_API_URL", "https://graph.facebook.com/v18.0") or "https://graph.facebook.com/v18.0"
+    )
+
+    CARPARTSDUBAI_STOCK_URL: str = (
+        _env("CARPARTSDUBAI_STOCK_URL", "https://carpartsdubai.com/stock-details") or "https://carpartsdubai.com/stock-details"
+    )
 
     CHASSIS_API_BASE_URL: str | None = _env("CHASSIS_API_BASE_URL")
     CHASSIS_API_KEY: str | None = _env("CHASSIS_API_KEY")
+    # Unknown chassis numbers are not re-queried for this many seconds
+    CHASSIS_NEGATIVE_CACHE_TTL: int = int(_env("CHASSIS_NEGATIVE_CACHE_TTL", "3600") or 3600)
+    CHASSIS_NEGATIVE_CACHE_SIZE: int = int(_env("CHASSIS_NEGATIVE_CACHE_SIZE", "10000") or 10000)
+    # Bulk (fleet) resolution
+    CHASSIS_BULK_WORKERS: int = int(_env("CHASSIS_BULK_WORKERS", "8") or 8)
+    CHASSIS_BULK_MAX_ITEMS: int = int(_env("CHASSIS_BULK_MAX_ITEMS", "2000") or 2000)
+    # Per-fleet API keys, e.g. "acme=KEY1,globex=KEY2"; the endpoint refuses everyone else
+    CHASSIS_BULK_API_KEYS: dict[str, str] = field(default_factory=dict)
+    # Chassis numbers each fleet may submit per hour, across all workers
+    CHASSIS_BULK_QUOTA_PER_HOUR: int = int(_env("CHASSIS_BULK_QUOTA_PER_HOUR", "5000") or 5000)
+
+    # Translation cache (SQLite file shared by workers on this host)
+    TRANSLATION_CACHE_PATH: str | None = (
+        _env("TRANSLATION_CACHE_PATH", "instance/translation_cache.sqlite3") or None
+    )
+
+    # Threads serving non-webhook Flask routes under the ASGI entry point
+    ASGI_WSGI_THREADS: int = int(_env("ASGI_WSGI_THREADS", "10") or 10)
 
     # Admin & Sales
     ADMIN_TOKEN: str = _env("ADMIN_TOKEN", "admin-token") or "admin-token"
     SALES_AGENTS: list[str] = field(default_factory=list)
+    # "least_loaded": fewest leads; "weighted": fewest leads per unit of weight
+    LEAD_ASSIGNMENT_STRATEGY: str = _env("LEAD_ASSIGNMENT_STRATEGY", "least_loaded") or "least_loaded"
+    # Initial weights for new agents, e.g. "alice=2,bob=0.5" (others get 1)
+    SALES_AGENT_WEIGHTS: dict[str, float] = field(default_factory=dict)
+    # Write-behind lead recording (see app/services/lead_buffer.py for crash behaviour)
+    LEAD_WRITE_BEHIND: bool = (_env("LEAD_WRITE_BEHIND", "false") or "").lower() in ("1", "true", "yes")
+    LEAD_BUFFER_MAX_SIZE: int = int(_env("LEAD_BUFFER_MAX_SIZE", "100") or 100)
+    LEAD_BUFFER_MAX_DELAY: float = float(_env("LEAD_BUFFER_MAX_DELAY", "2") or 2)
+    # Events held in memory at most; beyond that leads are recorded synchronously
+    LEAD_BUFFER_MAX_PENDING: int = int(_env("LEAD_BUFFER_MAX_PENDING", "10000") or 10000)
+    # Failed attempts before a batch is written event by event and rejects are dead-lettered
+    LEAD_BUFFER_MAX_ATTEMPTS: int = int(_env("LEAD_BUFFER_MAX_ATTEMPTS", "3") or 3)
+    LEAD_JOURNAL_DIR: str | None = _env("LEAD_JOURNAL_DIR", "instance/lead_journal") or None
+    # Lead retention (see app/services/lead_retention.py)
+    LEAD_ARCHIVE_ENABLED: bool = (_env("LEAD_ARCHIVE_ENABLED", "false") or "").lower() in ("1", "true", "yes")
+    LEAD_RETENTION_DAYS: int = int(_env("LEAD_RETENTION_DAYS", "90") or 90)
+    LEAD_ARCHIVE_STATUSES: list[str] = field(default_factory=list)
+    LEAD_ARCHIVE_BATCH_SIZE: int = int(_env("LEAD_ARCHIVE_BATCH_SIZE", "1000") or 1000)
+    # Per run; 0 = until no eligible leads are left
+    LEAD_ARCHIVE_MAX_BATCHES: int = int(_env("LEAD_ARCHIVE_MAX_BATCHES", "0") or 0)
+    LEAD_ARCHIVE_PAUSE_SECONDS: float = float(_env("LEAD_ARCHIVE_PAUSE_SECONDS", "0.1") or 0)
+    LEAD_ARCHIVE_INTERVAL_SECONDS: float = float(_env("LEAD_ARCHIVE_INTERVAL_SECONDS", "3600") or 3600)
+    # Opt-in SQL profiling (see app/services/query_profiler.py)
+    SQL_PROFILING: bool = (_env("SQL_PROFILING", "false") or "").lower() in ("1", "true", "yes")
+    SQL_SLOW_QUERY_MS: float = float(_env("SQL_SLOW_QUERY_MS", "200") or 200)
+    SQL_REQUEST_QUERY_WARN: int = int(_env("SQL_REQUEST_QUERY_WARN", "50") or 50)
+    SQL_REPEAT_WARN: int = int(_env("SQL_REPEAT_WARN", "10") or 10)
+    SQL_PROFILE_MAX_FINGERPRINTS: int = int(_env("SQL_PROFILE_MAX_FINGERPRINTS", "1000") or 1000)
+    # On-demand sampling profiler (see app/services/sampling_profiler.py)
+    PROFILER_DIR: str = _env("PROFILER_DIR", "instance/profiles") or "instance/profiles"
+    PROFILER_MAX_SECONDS: float = float(_env("PROFILER_MAX_SECONDS", "60") or 60)
+    PROFILER_MIN_INTERVAL_MS: float = float(_env("PROFILER_MIN_INTERVAL_MS", "5") or 5)
+    PROFILER_MAX_OVERHEAD: float = float(_env("PROFILER_MAX_OVERHEAD", "0.02") or 0.02)
+    PROFILER_MAX_STACKS: int = int(_env("PROFILER_MAX_STACKS", "20000") or 20000)
+    # Opt-in watcher thread that joins scope "all" profiles; enable it for the web workers
+    PROFILER_WATCH: bool = (_env("PROFILER_WATCH", "false") or "").lower() in ("1", "true", "yes")
+    PROFILER_POLL_SECONDS: float = float(_env("PROFILER_POLL_SECONDS", "2") or 2)
+    # Admin stats snapshot (see app/services/stats_service.py)
+    STATS_REFRESH_SECONDS: float = float(_env("STATS_REFRESH_SECONDS", "30") or 30)
+    STATS_RECONCILE_SECONDS: float = float(_env("STATS_RECONCILE_SECONDS", "900") or 900)
+    STATS_BUCKET_DAYS: int = int(_env("STATS_BUCKET_DAYS", "7") or 7)
+    # Rebuild of every closed bucket; the first reconcile after deploy backfills history
+    STATS_FULL_RECONCILE_SECONDS: float = float(_env("STATS_FULL_RECONCILE_SECONDS", "86400") or 86400)
+    # Streaming admin exports (see app/services/export_service.py)
+    EXPORT_YIELD_PER: int = int(_env("EXPORT_YIELD_PER", "1000") or 1000)
+    # Concurrent exports per process; more get 429
+    EXPORT_MAX_CONCURRENT: int = int(_env("EXPORT_MAX_CONCURRENT", "2") or 2)
 
     def __post_init__(self) -> None:
-        """Populate SALES_AGENTS safely (avoid mutable default at class level)."""
+        """Populate list/dict settings safely (avoid mutable defaults at class level)."""
         sales_agents_env = _env("SALES_AGENTS")
         if sales_agents_env:
             self.SALES_AGENTS = [a.strip() for a in sales_agents_env.split(",") if a.strip()]
         else:
             self.SALES_AGENTS = ["agent1", "agent2", "agent3"]
 
+        for item in (_env("SALES_AGENT_WEIGHTS") or "").split(","):
+            agent, _, weight = item.partition("=")
+            if agent.strip() and weight.strip():
+                self.SALES_AGENT_WEIGHTS[agent.strip()] = float(weight)
+
+        for item in (_env("CHASSIS_BULK_API_KEYS") or "").split(","):
+            fleet, _, key = item.partition("=")
+            if fleet.strip() and key.strip():
+                self.CHASSIS_BULK_API_KEYS[fleet.strip()] = key.strip()
+
+        # Closed statuses the retention job may archive
+        self.LEAD_ARCHIVE_STATUSES = [
+            s.strip() for s in (_env("LEAD_ARCHIVE_STATUSES", "responded") or "").split(",") if s.strip()
+        ]
+
+        self.SQLALCHEMY_ENGINE_OPTIONS = {
+            "pool_pre_ping": self.DB_POOL_PRE_PING,
+            "pool_recycle": self.DB_POOL_RECYCLE,
+        }
+        if not self.SQLALCHEMY_DATABASE_URI.startswith("sqlite"):
+            self.SQLALCHEMY_ENGINE_OPTIONS.update(
+                pool_size=self.DB_POOL_SIZE,
+                max_overflow=self.DB_MAX_OVERFLOW,
+                pool_timeout=self.DB_POOL_TIMEOUT,
+            )
+
+        self.DATABASE_REPLICA_URLS = [u.strip() for u in (_env("DATABASE_REPLICA_URLS") or "").split(",") if u.strip()]
+        self.SQLALCHEMY_BINDS = {f"replica_{i}": url for i, url in enumerate(self.DATABASE_REPLICA_URLS)}
+
 
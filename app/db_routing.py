@@ -0,0 +1,185 @@
+"""
+Read-replica routing for search queries.
+
+Replicas are configured with DATABASE_REPLICA_URLS and become Flask-SQLAlchemy
+binds named replica_0, replica_1, ... (no models are mapped to them). Code
+that only reads opts in with read_from_replica(), as a decorator or a with
+block. Inside it, db.session sends SELECTs, including lazy loads, to a replica.
+Everything else stays on the primary: flushes, SELECT ... FOR UPDATE, and all
+queries outside the block (lead recording, imports, admin). Long reads that
+run on their own connection (admin exports) take an engine from read_engine().
+
+Before a replica is used, its lag is checked at most every
+DB_REPLICA_LAG_CHECK_SECONDS:
+  * MySQL: SHOW REPLICA STATUS (needs REPLICATION CLIENT);
+  * PostgreSQL: now() - pg_last_xact_replay_timestamp();
+  * DB_REPLICA_LAG_QUERY: any query returning seconds, e.g. over a
+    pt-heartbeat table;
+  * SQLite (tests/dev): always 0.
+Replicas lagging more than DB_REPLICA_MAX_LAG_SECONDS, or failing the check,
+are skipped until the next check. The others take turns. With none usable,
+reads go to the primary.
+
+Read-your-writes is not guaranteed inside the block: a row the same request
+just committed on the primary may not be on the replica yet.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+# Inside read_from_replica(): the engine picked for the block, once its first read needs one
+_replica_reads: ContextVar[dict[str, Engine | None] | None] = ContextVar("replica_reads", default=None)
+
+
+@contextmanager
+def read_from_replica() -> Iterator[None]:
+    """Route this block's SELECTs to one healthy replica, when any are configured."""
+    token = _replica_reads.set({})
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """Tracks replica lag and picks the replica for the next read."""
+
+    def __init__(self, bind_keys: list[str], max_lag: float = 5, check_interval: float = 5, lag_query: str | None = None):
+        self.bind_keys = bind_keys
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_query = lag_query
+        self._lock = threading.Lock()
+        # bind key -> (checked at, lag seconds or None when unusable, error)
+        self._health: dict[str, tuple[float, float | None, str | None]] = {}
+        self._turn = itertools.count()
+
+    def pick(self, engines: dict[str | None, Engine]) -> Engine | None:
+        healthy = [key for key in self.bind_keys if self._usable(key, engines[key])]
+        if not healthy:
+            return None
+        return engines[healthy[next(self._turn) % len(healthy)]]
+
+    def status(self, engines: dict[str | None, Engine]) -> list[dict[str, Any]]:
+        out = []
+        for key in self.bind_keys:
+            usable = self._usable(key, engines[key])
+            checked_at, lag, error = self._health[key]
+            out.append({
+                "bind": key,
+                "url": engines[key].url.render_as_string(hide_password=True),
+                "usable": usable,
+                "lag_seconds": lag,
+                "checked_at": checked_at,
+                "error": error,
+            })
+        return out
+
+    # ---- Internal helpers
+
+    def _usable(self, key: str, engine: Engine) -> bool:
+        checked = self._health.get(key)
+        if checked is None or time.time() - checked[0] >= self.check_interval:
+            # One thread re-checks; the rest keep using the previous result
+            if self._lock.acquire(blocking=checked is None):
+                try:
+                    checked = self._health.get(key)
+                    if checked is None or time.time() - checked[0] >= self.check_interval:
+                        checked = self._health[key] = self._check(engine)
+                finally:
+                    self._lock.release()
+        lag = checked[1]
+        return lag is not None and lag <= self.max_lag
+
+    def _check(self, engine: Engine) -> tuple[float, float | None, str | None]:
+        try:
+            with engine.connect() as conn:
+                lag = _replica_lag(conn, self.lag_query)
+        except Exception as e:
+            logger.warning(f"Replica {engine.url.host or engine.url.database} lag check failed: {e}")
+            return time.time(), None, str(e)
+        if lag is None:
+            return time.time(), None, "replication is not running"
+        if lag > self.max_lag:
+            logger.warning(f"Replica {engine.url.host or engine.url.database} is {lag:.1f}s behind; reading from primary")
+        return time.time(), lag, None
+
+
+def read_engine() -> Engine:
+    """
+    Engine for a long read on its own connection, outside db.session (e.g.
+    streaming exports): a healthy replica when any are configured, else the
+    primary.
+    """
+    from .extensions import db
+
+    router: ReplicaRouter | None = current_app.extensions.get("replica_router")
+    engine = router.pick(db.engines) if router is not None else None
+    return engine if engine is not None else db.engine
+
+
+def _replica_lag(conn, lag_query: str | None) -> float | None:
+    if lag_query:
+        value = conn.execute(text(lag_query)).scalar()
+        return float(value) if value is not None else None
+    dialect = conn.dialect.name
+    if dialect == "mysql":
+        row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+        if row is None:
+            return None
+        value = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return float(value) if value is not None else None
+    if dialect == "postgresql":
+        value = conn.execute(text(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+        )).scalar()
+        return float(value) if value is not None else None
+    return 0.0
+
+
+class RoutingSession(Session):
+    """db.session class: sends reads inside read_from_replica() to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        block = _replica_reads.get()
+        if bind is None and block is not None and not self._flushing and _is_plain_select(clause):
+            if "engine" not in block:
+                router: ReplicaRouter | None = current_app.extensions.get("replica_router")
+                # One replica per block, so its reads see one consistent point in time
+                block["engine"] = router.pick(self._db.engines) if router is not None else None
+            if block["engine"] is not None:
+                return block["engine"]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_plain_select(clause) -> bool:
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+def init_replica_routing(app) -> ReplicaRouter | None:
+    bind_keys = sorted(key for key in app.config.get("SQLALCHEMY_BINDS", {}) if key.startswith("replica_"))
+    if not bind_keys:
+        return None
+    router = ReplicaRouter(
+        bind_keys,
+        max_lag=float(app.config.get("DB_REPLICA_MAX_LAG_SECONDS", 5)),
+        check_interval=float(app.config.get("DB_REPLICA_LAG_CHECK_SECONDS", 5)),
+        lag_query=app.config.get("DB_REPLICA_LAG_QUERY"),
+    )
+    app.extensions["replica_router"] = router
+    return router
@@ -32,6 +32,13 @@ class Part(db.Model, TimestampMixin):
     vehicle_id = db.Column(db.Integer, db.ForeignKey("vehicles.id"), nullable=True)
     vehicle = db.relationship("Vehicle", back_populates="parts")
 
+    # SHA-1 of name/price/quantity_min, used by the catalog sync import
+    content_hash = db.Column(db.String(40), nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_parts_sync_key", "part_number", "brand", "vehicle_id"),
+    )
+
 
 class Lead(db.Model, TimestampMixin):
     __tablename__ = "leads"
@@ -44,4 +51,63 @@ class Lead(db.Model, TimestampMixin):
     assigned_agent = db.Column(db.String(128), nullable=True)
     status = db.Column(db.String(32), default="new", nullable=False)
 
+    __table_args__ = (
+        # Agent counters (GROUP BY assigned_agent) and an agent's leads by status, newest first
+        db.Index("ix_leads_agent_status_created", "assigned_agent", "status", "created_at"),
+        # Status filters and the archiving job (closed statuses older than the cutoff)
+        db.Index("ix_leads_status_created", "status", "created_at"),
+        # Time windows: stats reconcile, exports
+        db.Index("ix_leads_created_at", "created_at"),
+    )
+
+
+class LeadArchive(db.Model):
+    """Closed leads moved out of the hot leads table by the retention job; ids are kept."""
+
+    __tablename__ = "leads_archive"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    whatsapp_user_id = db.Column(db.String(64), index=True, nullable=False)
+    user_locale = db.Column(db.String(16), nullable=True)
+    intent = db.Column(db.String(64), nullable=True)
+    query_text = db.Column(db.Text, nullable=True)
+    assigned_agent = db.Column(db.String(128), nullable=True)
+    status = db.Column(db.String(32), nullable=False)
+    created_at = db.Column(db.DateTime, index=True, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AgentLoad(db.Model, TimestampMixin):
+    """Per-agent lead counter read by lead assignment instead of counting leads."""
+
+    __tablename__ = "agent_loads"
+
+    agent = db.Column(db.String(128), primary_key=True)
+    lead_count = db.Column(db.Integer, default=0, nullable=False)
+    # Share of new leads relative to other agents (weighted strategy); 0 stops assignment
+    weight = db.Column(db.Float, default=1.0, nullable=False)
+    available = db.Column(db.Boolean, default=True, nullable=False)
+
+
+class LeadStatBucket(db.Model):
+    """Leads per hour, intent, agent and status; maintained as leads are recorded."""
+
+    __tablename__ = "lead_stat_buckets"
+
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    # "" instead of NULL so the columns can be part of the primary key
+    intent = db.Column(db.String(64), primary_key=True, default="")
+    agent = db.Column(db.String(128), primary_key=True, default="")
+    status = db.Column(db.String(32), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class StatValue(db.Model):
+    """Named counters recomputed by the stats reconcile (catalog sizes, reconcile lease)."""
+
+    __tablename__ = "stat_values"
 
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
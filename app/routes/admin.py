@@ -1,7 +1,7 @@
 """
 Admin API endpoints for configuration management.
 """
-from flask import Blueprint, current_app, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request
 from functools import wraps
 
 
@@ -41,15 +41,223 @@ def get_config():
 @admin_bp.get("/stats")
 @require_admin_token
 def get_stats():
-    """Get basic statistics."""
+    """Get basic statistics (served from the in-memory snapshot; see as_of / stale_seconds)."""
+    from ..services.stats_service import get_stats_service
+
+    return jsonify(get_stats_service(current_app._get_current_object()).summary())
+
+
+@admin_bp.get("/stats/leads")
+@require_admin_token
+def get_lead_stats():
+    """Leads per hour or day (?hours=24&bucket=hour|day), split by intent and agent."""
+    from ..services.stats_service import get_stats_service
+
+    bucket = request.args.get("bucket", "hour")
+    if bucket not in ("hour", "day"):
+        return jsonify({"error": "bucket must be hour or day"}), 400
+    try:
+        hours = int(request.args.get("hours", 24))
+    except ValueError:
+        return jsonify({"error": "hours must be an integer"}), 400
+    max_hours = int(current_app.config.get("STATS_BUCKET_DAYS", 7)) * 24
+    hours = min(max(hours, 1), max_hours)
+
+    service = get_stats_service(current_app._get_current_object())
+    return jsonify({
+        "hours": hours,
+        "bucket": bucket,
+        "buckets": service.lead_buckets(hours, bucket),
+        "as_of": service.summary()["as_of"],
+    })
+
+
+@admin_bp.get("/metrics")
+@require_admin_token
+def get_metrics():
+    """Per-stage message pipeline latency and errors (Prometheus text format, this process only)."""
+    from ..services.metrics import registry
+
+    return Response(registry.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@admin_bp.get("/queries")
+@require_admin_token
+def get_query_profile():
+    """Top SQL fingerprints (?top=20&sort=total|mean|max|count|rows) and queries per endpoint."""
+    from ..services.query_profiler import SORT_KEYS
+
+    profiler = current_app.extensions.get("query_profiler")
+    if profiler is None:
+        return jsonify({"error": "SQL profiling is disabled (set SQL_PROFILING=true)"}), 404
+    sort = request.args.get("sort", "total")
+    if sort not in SORT_KEYS:
+        return jsonify({"error": f"sort must be one of {', '.join(SORT_KEYS)}"}), 400
+    try:
+        top = max(1, int(request.args.get("top", 20)))
+    except ValueError:
+        return jsonify({"error": "top must be an integer"}), 400
+
+    return jsonify({
+        "since": profiler.since(),
+        "slow_query_ms": profiler.slow_ms,
+        "queries": profiler.top(top, sort),
+        "endpoints": profiler.endpoints(),
+    })
+
+
+@admin_bp.post("/queries/reset")
+@require_admin_token
+def reset_query_profile():
+    """Start a fresh profiling window."""
+    profiler = current_app.extensions.get("query_profiler")
+    if profiler is None:
+        return jsonify({"error": "SQL profiling is disabled (set SQL_PROFILING=true)"}), 404
+    profiler.reset()
+    return jsonify({"status": "ok"})
+
+
+@admin_bp.post("/profile")
+@require_admin_token
+def start_profile():
+    """
+    Start a stack-sampling profile: {"seconds": 10, "interval_ms": 10, "scope": "worker" | "all"}.
+    Duration and rate are capped by the PROFILER_* settings.
+    """
+    from ..services.sampling_profiler import ProfileBusy
+
+    data = request.get_json(silent=True) or {}
+    scope = data.get("scope", "worker")
+    if scope not in ("worker", "all"):
+        return jsonify({"error": "scope must be worker or all"}), 400
+    seconds = data.get("seconds", 10)
+    interval_ms = data.get("interval_ms", 10)
+    for name, value in (("seconds", seconds), ("interval_ms", interval_ms)):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            return jsonify({"error": f"{name} must be a positive number"}), 400
+
+    profiler = current_app.extensions["sampling_profiler"]
+    if scope == "all" and not profiler.watching:
+        return jsonify({"error": "scope all needs the profiler watcher (set PROFILER_WATCH=true)"}), 400
+    try:
+        spec = profiler.request(seconds, interval_ms, scope)
+    except ProfileBusy as e:
+        return jsonify({"error": f"profile {e} is already running in this worker"}), 409
+    return jsonify(spec), 202
+
+
+@admin_bp.get("/profile/<profile_id>")
+@require_admin_token
+def get_profile(profile_id: str):
+    """Per-worker state of a profile (running / done / skipped / failed)."""
+    status = current_app.extensions["sampling_profiler"].status(profile_id)
+    if status is None:
+        return jsonify({"error": "Unknown profile"}), 404
+    return jsonify(status)
+
+
+@admin_bp.get("/profile/<profile_id>/collapsed")
+@require_admin_token
+def download_profile(profile_id: str):
+    """Collapsed stacks merged over finished workers (?per_worker=1 keeps them apart)."""
+    per_worker = request.args.get("per_worker", "").lower() in ("1", "true", "yes")
+    collapsed = current_app.extensions["sampling_profiler"].collapsed(profile_id, per_worker)
+    if collapsed is None:
+        return jsonify({"error": "Unknown profile"}), 404
+    return Response(
+        collapsed,
+        mimetype="text/plain",
+        headers={"Content-Disposition": f"attachment; filename=profile-{profile_id}.collapsed"},
+    )
+
+
+@admin_bp.get("/replicas")
+@require_admin_token
+def get_replicas():
+    """Read replicas with their last lag check and whether searches currently use them."""
     from ..extensions import db
-    from ..models import Lead, Part, Vehicle
 
+    router = current_app.extensions.get("replica_router")
     return jsonify({
-        "total_parts": db.session.query(Part).count(),
-        "total_vehicles": db.session.query(Vehicle).count(),
-        "total_leads": db.session.query(Lead).count(),
-        "new_leads": db.session.query(Lead).filter_by(status="new").count(),
-        "assigned_leads": db.session.query(Lead).filter_by(status="assigned").count(),
+        "max_lag_seconds": current_app.config.get("DB_REPLICA_MAX_LAG_SECONDS"),
+        "replicas": router.status(db.engines) if router is not None else [],
     })
 
+
+@admin_bp.get("/export/<kind>")
+@require_admin_token
+def export_data(kind: str):
+    """
+    Stream leads, parts or vehicles as CSV or NDJSON
+    (?format=csv|ndjson&since=&until=&status=&archived=exclude|include|only&gzip=1).
+    """
+    from ..db_routing import read_engine
+    from ..services.export_service import KINDS, get_export_slots, parse_export_request, stream_export
+
+    if kind not in KINDS:
+        return jsonify({"error": f"Unknown export; use one of {', '.join(KINDS)}"}), 404
+    try:
+        export = parse_export_request(kind, request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    slots = get_export_slots(current_app._get_current_object())
+    if not slots.acquire(blocking=False):
+        return jsonify({"error": "Too many exports running; try again later"}), 429
+    try:
+        body = stream_export(export, read_engine(), int(current_app.config.get("EXPORT_YIELD_PER", 1000)))
+        response = Response(
+            body,
+            mimetype=export.mimetype,
+            headers={
+                "Content-Disposition": f"attachment; filename={export.filename}",
+                # Let proxies pass chunks through instead of buffering the whole file
+                "X-Accel-Buffering": "no",
+            },
+        )
+    except Exception:
+        slots.release()
+        raise
+    # Released when the download ends or the client goes away, even if it never started
+    response.call_on_close(slots.release)
+    return response
+
+
+@admin_bp.get("/agents")
+@require_admin_token
+def list_agents():
+    """Sales agents with their lead counters, weight and availability."""
+    from ..services.lead_service import LeadService
+
+    return jsonify({
+        "strategy": current_app.config.get("LEAD_ASSIGNMENT_STRATEGY", "least_loaded"),
+        "agents": LeadService().agent_loads(),
+    })
+
+
+@admin_bp.patch("/agents/<agent>")
+@require_admin_token
+def update_agent(agent: str):
+    """Set an agent's availability ({"available": false}) and/or weight ({"weight": 2})."""
+    from ..services.lead_service import LeadService
+
+    data = request.get_json(silent=True) or {}
+    available = data.get("available")
+    weight = data.get("weight")
+    if available is not None and not isinstance(available, bool):
+        return jsonify({"error": "available must be true or false"}), 400
+    if weight is not None and (isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight < 0):
+        return jsonify({"error": "weight must be a non-negative number"}), 400
+
+    if not LeadService().update_agent(agent, available=available, weight=weight):
+        return jsonify({"error": "Unknown agent"}), 404
+    return jsonify({"agent": agent, "available": available, "weight": weight})
+
+
+@admin_bp.post("/agents/rebuild")
+@require_admin_token
+def rebuild_agent_counters():
+    """Recount every agent's leads from the leads table."""
+    from ..services.lead_service import LeadService
+
+    return jsonify({"agents": LeadService().rebuild_agent_loads()})
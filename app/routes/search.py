@@ -1,14 +1,20 @@
-from flask import Blueprint, jsonify, request
+import hmac
+import json
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from sqlalchemy import or_, and_
+from ..db_routing import read_from_replica
 from ..extensions import db
 from ..models import Part, Vehicle
 from ..services.carparts_dubai_service import CarPartsDubaiService
+from ..services.chassis_service import ChassisService
+from ..services.stats_service import consume_quota
 
 
 search_bp = Blueprint("search", __name__)
 
 
 @search_bp.get("/part-number")
+@read_from_replica()
 def search_by_part_number():
     part_number = request.args.get("q", type=str)
     if not part_number:
@@ -30,6 +36,7 @@ def search_by_part_number():
 
 
 @search_bp.get("/chassis")
+@read_from_replica()
 def search_by_chassis_number():
     chassis = request.args.get("q", type=str)
     if not chassis:
@@ -46,7 +53,46 @@ def search_by_chassis_number():
     })
 
 
+@search_bp.post("/chassis/bulk")
+def bulk_resolve_chassis():
+    """
+    Resolve a fleet's chassis numbers in one request.
+    Auth: "Authorization: Bearer <fleet key>" (CHASSIS_BULK_API_KEYS).
+    Body: {"chassis_numbers": ["VIN1", "VIN2", ...]}
+    Streams NDJSON events (result / progress / summary), one per line.
+    Each fleet may submit CHASSIS_BULK_QUOTA_PER_HOUR distinct numbers per hour.
+    """
+    fleet = _bulk_fleet()
+    if fleet is None:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    payload = request.get_json(silent=True) or {}
+    chassis_numbers = payload.get("chassis_numbers")
+    if not isinstance(chassis_numbers, list) or not chassis_numbers:
+        return jsonify({"error": "Missing 'chassis_numbers' list"}), 400
+    if not all(isinstance(c, str) for c in chassis_numbers):
+        return jsonify({"error": "'chassis_numbers' must contain only strings"}), 400
+
+    max_items = current_app.config.get("CHASSIS_BULK_MAX_ITEMS", 2000)
+    if len(chassis_numbers) > max_items:
+        return jsonify({"error": f"Too many chassis numbers (max {max_items})"}), 400
+
+    quota = current_app.config.get("CHASSIS_BULK_QUOTA_PER_HOUR", 5000)
+    distinct = len({c.strip().upper() for c in chassis_numbers if c.strip()})
+    if not consume_quota(f"chassis_bulk_quota:{fleet}", distinct, quota, 3600):
+        return jsonify({"error": f"Hourly quota of {quota} chassis numbers exceeded"}), 429
+
+    service = ChassisService()
+
+    def generate():
+        for event in service.lookup_many(chassis_numbers):
+            yield json.dumps(event) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 @search_bp.get("/car-part")
+@read_from_replica()
 def search_by_car_and_part():
     car = request.args.get("car", type=str)
     part = request.args.get("part", type=str)
@@ -75,6 +121,17 @@ def search_by_car_and_part():
     return jsonify([_serialize_part(p) for p in parts])
 
 
+def _bulk_fleet() -> str | None:
+    """Fleet whose API key the request carries, or None."""
+    token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not token:
+        return None
+    for fleet, key in current_app.config.get("CHASSIS_BULK_API_KEYS", {}).items():
+        if hmac.compare_digest(token.encode(), key.encode()):
+            return fleet
+    return None
+
+
 def _serialize_part(p: Part) -> dict:
     return {
         "id": p.id,
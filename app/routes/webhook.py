@@ -1,19 +1,27 @@
 import hmac
 import json
+import asyncio
 import hashlib
-from typing import Any
+from typing import Any, Awaitable, Iterator, TypeVar
 from flask import Blueprint, current_app, jsonify, request
+import httpx
 import requests
+from ..db_routing import read_from_replica
 from ..extensions import db
-from ..models import Lead, Part, Vehicle
-from ..services.gpt_service import GPTService
-from ..services.chassis_service import ChassisService
-from ..services.lead_service import LeadService
-from ..services.carparts_dubai_service import CarPartsDubaiService
+from ..models import Part, Vehicle
+from ..services.async_utils import run_in_app_context
+from ..services.gpt_service import AsyncGPTService, GPTService
+from ..services.chassis_service import AsyncChassisService, ChassisService
+from ..services.lead_buffer import record_lead_event
+from ..services.lead_service import LeadEvent
+from ..services.metrics import stage_failed, stage_timer
+from ..services.carparts_dubai_service import AsyncCarPartsDubaiService, CarPartsDubaiService
 from sqlalchemy import or_, and_
 
 whatsapp_bp = Blueprint("whatsapp", __name__)
 
+T = TypeVar("T")
+
 @whatsapp_bp.get("")
 def verify_webhook():
     mode = request.args.get("hub.mode")
@@ -29,6 +37,19 @@ def verify_webhook():
 def receive_message():
     payload: dict[str, Any] = request.get_json(silent=True) or {}
 
+    for user_id, text in _iter_text_messages(payload):
+        with stage_timer("message"):
+            # Process message with GPT and search
+            response_text = _process_user_message(user_id, text)
+
+            # Send response
+            _send_whatsapp_text(user_id, response_text)
+
+    return jsonify({"status": "ok"})
+
+
+def _iter_text_messages(payload: dict[str, Any]) -> Iterator[tuple[str, str]]:
+    """Yield (wa_id, text) for every inbound text message in a Meta webhook payload."""
     entries = payload.get("entry", [])
     for entry in entries:
         for change in entry.get("changes", []):
@@ -43,149 +64,262 @@ def receive_message():
                     text = msg.get("text", {}).get("body")
 
                 if user_id and text:
-                    # Process message with GPT and search
-                    response_text = _process_user_message(user_id, text)
-
-                    # Send response
-                    _send_whatsapp_text(user_id, response_text)
-
-    return jsonify({"status": "ok"})
+                    yield user_id, text
 
 
 def _process_user_message(user_id: str, message: str) -> str:
     """Process user message: extract intent, search, format response."""
+    lead: LeadEvent | None = None
     try:
         # Initialize services
         gpt_service = GPTService()
         chassis_service = ChassisService()
-        lead_service = LeadService()
 
         # Extract intent using GPT
-        intent_data = gpt_service.extract_intent(message)
+        with stage_timer("intent"):
+            intent_data = gpt_service.extract_intent(message)
         intent = intent_data.get("intent", "unknown")
         entities = intent_data.get("entities", {})
         language = intent_data.get("language", "en")
 
-        # Create lead
-        lead = lead_service.create_lead(user_id, message, intent)
+        # The lead (creation, assignment, final status) is written once, on the way out
+        lead = LeadEvent(user_id, message, intent)
 
         # Handle greetings
         if intent == "greeting":
-            if language == "ar":
-                return "مرحباً! كيف يمكنني مساعدتك في البحث عن قطع الغيار اليوم؟"
-            return "Hello! How can I help you find car parts today?"
+            return gpt_service.translation_service.phrase("greeting", language)
 
         # Search based on intent
         search_results = []
 
         if intent == "part_number":
             part_number = entities.get("part_number") or message.strip()
-            parts = (
-                db.session.query(Part)
-                .filter(Part.part_number.ilike(f"%{part_number}%"))
-                .limit(10)
-                .all()
-            )
-            search_results = [_serialize_part(p) for p in parts]
+            with stage_timer("search"):
+                search_results = _search_part_number(part_number)
             if not search_results:
                 external_service = CarPartsDubaiService()
-                search_results = external_service.find_by_part_number(part_number)
+                with stage_timer("carparts_dubai"):
+                    search_results = external_service.find_by_part_number(part_number)
 
         elif intent == "chassis":
             chassis_number = entities.get("chassis") or message.strip()
             # Lookup vehicle via external API
-            vehicle_data = chassis_service.lookup_vehicle(chassis_number)
+            with stage_timer("chassis"):
+                vehicle_data = chassis_service.lookup_vehicle(chassis_number)
 
             if vehicle_data:
                 # Find parts for this vehicle
-                vehicle = (
-                    db.session.query(Vehicle)
-                    .filter_by(chassis_number=vehicle_data["chassis_number"])
-                    .first()
-                )
-                if vehicle:
-                    parts = (
-                        db.session.query(Part)
-                        .filter(Part.vehicle_id == vehicle.id)
-                        .limit(10)
-                        .all()
-                    )
-                    search_results = [_serialize_part(p) for p in parts]
+                with stage_timer("search"):
+                    search_results = _search_vehicle_parts(vehicle_data["chassis_number"])
             else:
                 # No vehicle found
-                if language == "ar":
-                    return "عذراً، لم نتمكن من العثور على معلومات السيارة لهذا الرقم. يرجى التحقق من الرقم والمحاولة مرة أخرى."
-                return "Sorry, we couldn't find vehicle information for this chassis number. Please verify the number and try again."
+                return gpt_service.translation_service.phrase("chassis_not_found", language)
 
         elif intent == "car_part":
-            car_make = entities.get("car_make", "")
-            car_model = entities.get("car_model", "")
-            part_name = entities.get("part_name", "")
-
-            # Build search query
-            if car_make or car_model:
-                car_query = f"{car_make} {car_model}".strip()
-            else:
-                # Try to extract from message
-                car_query = message
-
-            if not part_name:
-                # Try to extract part name from message
-                part_name = message
-
-            # Search
-            make_model = [s.strip() for s in car_query.split(" ") if s.strip()]
-            vehicle_filters = []
-            if make_model:
-                vehicle_filters.append(
-                    or_(
-                        Vehicle.make.ilike(f"%{make_model[0]}%"),
-                        Vehicle.model.ilike(f"%{make_model[0]}%"),
-                    )
-                )
-            if len(make_model) > 1:
-                vehicle_filters.append(
-                    or_(
-                        Vehicle.make.ilike(f"%{make_model[1]}%"),
-                        Vehicle.model.ilike(f"%{make_model[1]}%"),
-                    )
-                )
-
-            vehicles = (
-                db.session.query(Vehicle).filter(and_(*vehicle_filters))
-                if vehicle_filters
-                else db.session.query(Vehicle)
-            )
-
-            parts = (
-                db.session.query(Part)
-                .join(Vehicle, Part.vehicle_id == Vehicle.id, isouter=True)
-                .filter(
-                    and_(
-                        Part.name.ilike(f"%{part_name}%"),
-                        or_(
-                            Vehicle.id.in_([v.id for v in vehicles.all()]),
-                            Vehicle.id.is_(None),
-                        ),
-                    )
-                )
-                .limit(10)
-                .all()
-            )
-            search_results = [_serialize_part(p) for p in parts]
+            car_query, part_name = _car_part_query(message, entities)
+            with stage_timer("search"):
+                search_results = _search_car_part(car_query, part_name)
 
         # Format response using GPT
-        response = gpt_service.format_response(search_results, intent, language)
+        with stage_timer("format"):
+            response = gpt_service.format_response(search_results, intent, language)
 
         # Update lead with results
-        lead.status = "responded"
-        db.session.commit()
+        lead.responded = True
 
         return response
 
     except Exception as e:
         current_app.logger.error(f"Error processing message: {e}")
+        stage_failed()
         return "Sorry, we encountered an error. Please try again later."
+    finally:
+        if lead is not None:
+            _record_lead(lead)
+
+
+def _record_lead(lead: LeadEvent) -> None:
+    with stage_timer("lead"):
+        try:
+            record_lead_event(current_app._get_current_object(), lead)
+        except Exception as e:
+            current_app.logger.error(f"Error recording lead: {e}")
+            stage_failed()
+
+
+async def _timed(stage: str, awaitable: Awaitable[T]) -> T:
+    """Await under stage_timer(); for work started as a task."""
+    with stage_timer(stage):
+        return await awaitable
+
+
+async def _process_user_message_async(
+    user_id: str, message: str, client: httpx.AsyncClient
+) -> str:
+    """
+    asyncio version of _process_user_message used by the ASGI entry point.
+    For part numbers the local catalog query and the CarPartsDubai stock
+    probe run concurrently; the lead is recorded once, with its final status.
+    """
+    app = current_app._get_current_object()
+    try:
+        gpt_service = AsyncGPTService()
+
+        with stage_timer("intent"):
+            intent_data = await gpt_service.extract_intent(message)
+        intent = intent_data.get("intent", "unknown")
+        entities = intent_data.get("entities", {})
+        language = intent_data.get("language", "en")
+
+        lead = LeadEvent(user_id, message, intent)
+        try:
+            if intent == "greeting":
+                # phrase() can hit the translation cache and API; keep it off the event loop
+                return await asyncio.to_thread(gpt_service.translation_service.phrase, "greeting", language)
+
+            search_results = []
+
+            if intent == "part_number":
+                part_number = entities.get("part_number") or message.strip()
+                local_task = asyncio.create_task(
+                    _timed("search", run_in_app_context(app, _search_part_number, part_number))
+                )
+                external_task = asyncio.create_task(
+                    _timed("carparts_dubai", AsyncCarPartsDubaiService(client).find_by_part_number(part_number))
+                )
+                try:
+                    search_results = await local_task
+                    if not search_results:
+                        search_results = await external_task
+                finally:
+                    # Not needed after a local hit, and must not outlive a failed local search
+                    external_task.cancel()
+
+            elif intent == "chassis":
+                chassis_number = entities.get("chassis") or message.strip()
+                with stage_timer("chassis"):
+                    vehicle_data = await AsyncChassisService(client).lookup_vehicle(chassis_number)
+                if not vehicle_data:
+                    return await asyncio.to_thread(
+                        gpt_service.translation_service.phrase, "chassis_not_found", language
+                    )
+                with stage_timer("search"):
+                    search_results = await run_in_app_context(
+                        app, _search_vehicle_parts, vehicle_data["chassis_number"]
+                    )
+
+            elif intent == "car_part":
+                car_query, part_name = _car_part_query(message, entities)
+                with stage_timer("search"):
+                    search_results = await run_in_app_context(app, _search_car_part, car_query, part_name)
+
+            with stage_timer("format"):
+                response = await gpt_service.format_response(search_results, intent, language)
+            lead.responded = True
+            return response
+        finally:
+            # Early returns and failed searches still record the lead before replying
+            await run_in_app_context(app, _record_lead, lead)
+
+    except Exception as e:
+        current_app.logger.error(f"Error processing message: {e}")
+        stage_failed()
+        return "Sorry, we encountered an error. Please try again later."
+
+
+@read_from_replica()
+def _search_part_number(part_number: str, limit: int = 10) -> list[dict]:
+    """Local catalog lookup by (partial) part number."""
+    parts = (
+        db.session.query(Part)
+        .filter(Part.part_number.ilike(f"%{part_number}%"))
+        .limit(limit)
+        .all()
+    )
+    return [_serialize_part(p) for p in parts]
+
+
+@read_from_replica()
+def _search_vehicle_parts(chassis_number: str, limit: int = 10) -> list[dict]:
+    """Parts linked to the vehicle stored under this chassis number."""
+    vehicle = (
+        db.session.query(Vehicle)
+        .filter_by(chassis_number=chassis_number)
+        .first()
+    )
+    if not vehicle:
+        return []
+    parts = (
+        db.session.query(Part)
+        .filter(Part.vehicle_id == vehicle.id)
+        .limit(limit)
+        .all()
+    )
+    return [_serialize_part(p) for p in parts]
+
+
+def _car_part_query(message: str, entities: dict[str, Any]) -> tuple[str, str]:
+    """Derive (car query, part name) from GPT entities, falling back to the raw message."""
+    car_make = entities.get("car_make", "")
+    car_model = entities.get("car_model", "")
+    part_name = entities.get("part_name", "")
+
+    # Build search query
+    if car_make or car_model:
+        car_query = f"{car_make} {car_model}".strip()
+    else:
+        # Try to extract from message
+        car_query = message
+
+    if not part_name:
+        # Try to extract part name from message
+        part_name = message
+
+    return car_query, part_name
+
+
+@read_from_replica()
+def _search_car_part(car_query: str, part_name: str, limit: int = 10) -> list[dict]:
+    """Parts whose name matches part_name for vehicles matching the first two words of car_query."""
+    make_model = [s.strip() for s in car_query.split(" ") if s.strip()]
+    vehicle_filters = []
+    if make_model:
+        vehicle_filters.append(
+            or_(
+                Vehicle.make.ilike(f"%{make_model[0]}%"),
+                Vehicle.model.ilike(f"%{make_model[0]}%"),
+            )
+        )
+    if len(make_model) > 1:
+        vehicle_filters.append(
+            or_(
+                Vehicle.make.ilike(f"%{make_model[1]}%"),
+                Vehicle.model.ilike(f"%{make_model[1]}%"),
+            )
+        )
+
+    vehicles = (
+        db.session.query(Vehicle).filter(and_(*vehicle_filters))
+        if vehicle_filters
+        else db.session.query(Vehicle)
+    )
+
+    parts = (
+        db.session.query(Part)
+        .join(Vehicle, Part.vehicle_id == Vehicle.id, isouter=True)
+        .filter(
+            and_(
+                Part.name.ilike(f"%{part_name}%"),
+                or_(
+                    Vehicle.id.in_([v.id for v in vehicles.all()]),
+                    Vehicle.id.is_(None),
+                ),
+            )
+        )
+        .limit(limit)
+        .all()
+    )
+    return [_serialize_part(p) for p in parts]
 
 
 def _serialize_part(p: Part) -> dict:
@@ -214,13 +348,18 @@ def _serialize_vehicle(v: Vehicle | None) -> dict | None:
     }
 
 
+def _graph_messages_url(phone_id: str) -> str:
+    base_url = current_app.config.get("META_GRAPH_API_URL", "https://graph.facebook.com/v18.0")
+    return f"{base_url.rstrip('/')}/{phone_id}/messages"
+
+
 def _send_whatsapp_text(wa_id: str, text: str) -> None:
     token = current_app.config.get("META_ACCESS_TOKEN")
     phone_id = current_app.config.get("META_PHONE_NUMBER_ID")
     if not token or not phone_id:
         return
 
-    url = f"https://graph.facebook.com/v18.0/{phone_id}/messages"
+    url = _graph_messages_url(phone_id)
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
@@ -231,9 +370,36 @@ def _send_whatsapp_text(wa_id: str, text: str) -> None:
         "type": "text",
         "text": {"body": text},
     }
-    try:
-        requests.post(url, headers=headers, json=data, timeout=10)
-    except Exception:
-        pass
+    with stage_timer("send"):
+        try:
+            response = requests.post(url, headers=headers, json=data, timeout=10)
+            if response.status_code >= 400:
+                stage_failed()
+        except Exception:
+            stage_failed()
+
 
+async def _send_whatsapp_text_async(client: httpx.AsyncClient, wa_id: str, text: str) -> None:
+    token = current_app.config.get("META_ACCESS_TOKEN")
+    phone_id = current_app.config.get("META_PHONE_NUMBER_ID")
+    if not token or not phone_id:
+        return
 
+    url = _graph_messages_url(phone_id)
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    }
+    data = {
+        "messaging_product": "whatsapp",
+        "to": wa_id,
+        "type": "text",
+        "text": {"body": text},
+    }
+    with stage_timer("send"):
+        try:
+            response = await client.post(url, headers=headers, json=data, timeout=10)
+            if response.status_code >= 400:
+                stage_failed()
+        except Exception:
+            stage_failed()
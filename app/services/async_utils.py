@@ -0,0 +1,34 @@
+"""
+Helpers shared by the asyncio service variants used behind the ASGI entry point.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable, TypeVar
+
+import httpx
+from flask import Flask
+
+T = TypeVar("T")
+
+
+async def run_in_app_context(app: Flask, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run blocking (DB) work on a worker thread inside a fresh app context.
+    Each call gets its own SQLAlchemy session, so concurrent calls never share one;
+    pass and return plain values rather than ORM objects.
+    """
+
+    def call() -> T:
+        with app.app_context():
+            return fn(*args, **kwargs)
+
+    return await asyncio.to_thread(call)
+
+
+def create_async_http_client(timeout: float = 10) -> httpx.AsyncClient:
+    """Pooled client for outbound calls; create one per event loop and close it on shutdown."""
+    return httpx.AsyncClient(
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
@@ -8,9 +8,12 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Iterable, List, Optional
 
+import httpx
 import requests
 from flask import current_app
 
+from .metrics import stage_failed
+
 
 @dataclass(slots=True)
 class ExternalPart:
@@ -83,6 +86,7 @@ class CarPartsDubaiService:
             )
         except requests.RequestException as exc:
             current_app.logger.warning("CarPartsDubai request failed: %s", exc)
+            stage_failed()
             return None
 
         if response.status_code == 404:
@@ -93,9 +97,11 @@ class CarPartsDubaiService:
             data = response.json()
         except requests.RequestException as exc:
             current_app.logger.warning("CarPartsDubai HTTP error: %s", exc)
+            stage_failed()
             return None
         except ValueError:
             current_app.logger.warning("CarPartsDubai returned non-JSON payload")
+            stage_failed()
             return None
 
         if isinstance(data, dict) and data.get("error"):
@@ -211,5 +217,63 @@ class CarPartsDubaiService:
             return None
 
 
+class AsyncCarPartsDubaiService(CarPartsDubaiService):
+    """
+    asyncio variant of CarPartsDubaiService for the ASGI entry point,
+    calling the stock endpoint on a shared httpx.AsyncClient.
+    """
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self._client = client
+
+    async def find_by_part_number(self, part_number: str) -> list[dict[str, Any]]:
+        """Async find_by_part_number; same normalized output."""
+        part_number = (part_number or "").strip()
+        if not part_number:
+            return []
+
+        raw_payload = await self._fetch_payload_async(part_number)
+        if not raw_payload:
+            return []
+
+        external_parts = self._normalize_payload(raw_payload, fallback_number=part_number)
+        return [part.to_dict() for part in external_parts]
+
+    async def _fetch_payload_async(self, part_number: str) -> Any | None:
+        base_url = current_app.config.get(
+            "CARPARTSDUBAI_STOCK_URL",
+            self.DEFAULT_BASE_URL,
+        )
+        timeout = current_app.config.get("CARPARTSDUBAI_TIMEOUT", 10)
+
+        try:
+            response = await self._client.get(
+                base_url,
+                params={"part_number": part_number},
+                headers={"Accept": "application/json"},
+                timeout=timeout,
+            )
+        except httpx.HTTPError as exc:
+            current_app.logger.warning("CarPartsDubai request failed: %s", exc)
+            stage_failed()
+            return None
+
+        if response.status_code == 404:
+            return None
+
+        try:
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPError as exc:
+            current_app.logger.warning("CarPartsDubai HTTP error: %s", exc)
+            stage_failed()
+            return None
+        except ValueError:
+            current_app.logger.warning("CarPartsDubai returned non-JSON payload")
+            stage_failed()
+            return None
 
+        if isinstance(data, dict) and data.get("error"):
+            return None
 
+        return data
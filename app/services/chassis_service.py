@@ -2,11 +2,137 @@
 External chassis-to-vehicle API integration service.
 Converts chassis numbers to vehicle details (make, model, year).
 """
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, Iterator
+
+import httpx
 import requests
-from typing import Any
 from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from ..extensions import db
 from ..models import Vehicle
+from .async_utils import run_in_app_context
+from .metrics import stage_failed
+
+
+class _NegativeCache:
+    """Bounded, thread-safe set of chassis numbers the API reported as unknown."""
+
+    def __init__(self, maxsize: int = 10000) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: str, ttl: float) -> None:
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = time.monotonic() + ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class _SingleFlight:
+    """
+    Coalesce concurrent calls for the same key so only one of them runs.
+    Callers that arrive while a call is in flight wait for and share its result,
+    or its exception. A caller that gives up waiting gets a TimeoutError.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: float | None = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight call for {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+
+class _AsyncSingleFlight:
+    """asyncio counterpart of _SingleFlight (one event loop per process)."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here so an exception nobody else awaited is not logged by asyncio
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            self._calls.pop(key, None)
+        return result
+
+
+# Shared by every ChassisService instance in this process.
+_negative_cache = _NegativeCache()
+_inflight = _SingleFlight()
+_async_inflight = _AsyncSingleFlight()
 
 
 class ChassisService:
@@ -21,19 +147,20 @@ class ChassisService:
             'year': str,
             'chassis_number': str
         } or None if not found
+
+        Unknown chassis numbers are remembered for CHASSIS_NEGATIVE_CACHE_TTL
+        seconds, and concurrent lookups of the same number share one API call.
         """
         # Normalize chassis number
         chassis_clean = chassis_number.strip().upper()
 
         # Check if we already have it in DB
-        existing = db.session.query(Vehicle).filter_by(chassis_number=chassis_clean).first()
+        existing = self._find_in_db(chassis_clean)
         if existing:
-            return {
-                "make": existing.make,
-                "model": existing.model,
-                "year": existing.year,
-                "chassis_number": existing.chassis_number,
-            }
+            return existing
+
+        if chassis_clean in _negative_cache:
+            return None
 
         # Call external API
         api_url = current_app.config.get("CHASSIS_API_BASE_URL")
@@ -43,41 +170,322 @@ class ChassisService:
             # No external API configured - return None
             return None
 
+        timeout = current_app.config.get("CHASSIS_API_TIMEOUT", 10)
         try:
-            # Example API call structure (adjust based on your actual API)
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            }
-            params = {"chassis": chassis_clean}
-
-            response = requests.get(
-                f"{api_url}/lookup", headers=headers, params=params, timeout=10
+            return _inflight.do(
+                chassis_clean,
+                lambda: self._resolve_remote(chassis_clean, api_url, api_key, timeout),
+                # Followers never wait longer than the leader's own HTTP timeout allows
+                timeout=timeout * 2,
             )
-            response.raise_for_status()
-            data = response.json()
-
-            # Extract vehicle info (adjust based on your API response format)
-            vehicle_data = {
-                "make": data.get("make") or data.get("manufacturer"),
-                "model": data.get("model"),
-                "year": str(data.get("year") or data.get("year_of_manufacture", "")),
-                "chassis_number": chassis_clean,
-            }
-
-            # Save to DB for future lookups
-            vehicle = Vehicle(
-                make=vehicle_data["make"],
-                model=vehicle_data["model"],
-                year=vehicle_data["year"],
-                chassis_number=chassis_clean,
+        except Exception as e:
+            # Log error but don't fail - return None (transient errors are not cached)
+            current_app.logger.error(f"Chassis API error: {e}")
+            stage_failed()
+            return None
+
+    def lookup_many(self, chassis_numbers: Iterable[str]) -> Iterator[dict[str, Any]]:
+        """
+        Resolve a list of chassis numbers, yielding events as work completes:
+          {'event': 'result', 'chassis_number': str,
+           'status': 'found' | 'resolved' | 'not_found' | 'error', 'vehicle': dict | None}
+          {'event': 'progress', 'done': int, 'total': int}
+          {'event': 'summary', 'total': int, 'found': int, ...}
+
+        Input is normalized and deduplicated. Known numbers are loaded with one
+        IN query per CHASSIS_BULK_QUERY_CHUNK numbers, the rest are fetched from
+        the external API on a pool of CHASSIS_BULK_WORKERS threads, and new
+        vehicles are inserted in batches of CHASSIS_BULK_INSERT_BATCH rows.
+        """
+        unique = list(dict.fromkeys(
+            c.strip().upper() for c in chassis_numbers if c and c.strip()
+        ))
+        total = len(unique)
+        counts = {"found": 0, "resolved": 0, "not_found": 0, "error": 0}
+        done = 0
+
+        def result(chassis: str, status: str, vehicle: dict[str, Any] | None) -> dict[str, Any]:
+            nonlocal done
+            done += 1
+            counts[status] += 1
+            return {"event": "result", "chassis_number": chassis, "status": status, "vehicle": vehicle}
+
+        # 1) Known vehicles
+        chunk = current_app.config.get("CHASSIS_BULK_QUERY_CHUNK", 500)
+        known: dict[str, dict[str, Any]] = {}
+        for start in range(0, total, chunk):
+            rows = (
+                db.session.query(Vehicle)
+                .filter(Vehicle.chassis_number.in_(unique[start:start + chunk]))
+                .all()
             )
-            db.session.add(vehicle)
+            for v in rows:
+                known[v.chassis_number] = {
+                    "make": v.make,
+                    "model": v.model,
+                    "year": v.year,
+                    "chassis_number": v.chassis_number,
+                }
+        for chassis in unique:
+            if chassis in known:
+                yield result(chassis, "found", known[chassis])
+        yield {"event": "progress", "done": done, "total": total}
+
+        pending = [c for c in unique if c not in known]
+        for chassis in [c for c in pending if c in _negative_cache]:
+            yield result(chassis, "not_found", None)
+        pending = [c for c in pending if c not in _negative_cache]
+
+        api_url = current_app.config.get("CHASSIS_API_BASE_URL")
+        api_key = current_app.config.get("CHASSIS_API_KEY")
+        if pending and (not api_url or not api_key):
+            for chassis in pending:
+                yield result(chassis, "not_found", None)
+            pending = []
+
+        # 2) Unknown vehicles: external API in parallel, inserts in batches
+        if pending:
+            timeout = current_app.config.get("CHASSIS_API_TIMEOUT", 10)
+            workers = current_app.config.get("CHASSIS_BULK_WORKERS", 8)
+            batch_size = current_app.config.get("CHASSIS_BULK_INSERT_BATCH", 100)
+            negative_ttl = current_app.config.get("CHASSIS_NEGATIVE_CACHE_TTL", 3600)
+            logger = current_app.logger
+
+            def fetch(chassis: str) -> dict[str, Any] | None:
+                return _inflight.do(
+                    chassis,
+                    lambda: self._fetch_remote(chassis, api_url, api_key, timeout),
+                    timeout=timeout * 2,
+                )
+
+            batch: list[dict[str, Any]] = []
+            pool = ThreadPoolExecutor(max_workers=workers)
+            try:
+                futures = {pool.submit(fetch, c): c for c in pending}
+                for future in as_completed(futures):
+                    chassis = futures[future]
+                    try:
+                        vehicle_data = future.result()
+                    except Exception as e:
+                        logger.error(f"Chassis API error for {chassis}: {e}")
+                        yield result(chassis, "error", None)
+                        continue
+                    if vehicle_data is None:
+                        _negative_cache.add(chassis, negative_ttl)
+                        yield result(chassis, "not_found", None)
+                        continue
+                    batch.append(vehicle_data)
+                    if len(batch) >= batch_size:
+                        yield from self._flush_batch(batch, result)
+                        yield {"event": "progress", "done": done, "total": total}
+                        batch = []
+            finally:
+                # Stop issuing API calls if the consumer goes away mid-stream
+                pool.shutdown(wait=False, cancel_futures=True)
+            if batch:
+                yield from self._flush_batch(batch, result)
+
+        yield {"event": "progress", "done": done, "total": total}
+        yield {"event": "summary", "total": total, **counts}
+
+    # --------------------------------------------------------------------- #
+    # Internal helpers
+    # --------------------------------------------------------------------- #
+    def _find_in_db(self, chassis_clean: str, lock: bool = False) -> dict[str, Any] | None:
+        query = db.session.query(Vehicle).filter_by(chassis_number=chassis_clean)
+        if lock:
+            # Locking reads see the latest committed row, not the transaction's
+            # REPEATABLE READ snapshot (InnoDB); SQLite ignores the clause
+            query = query.with_for_update(read=True)
+        existing = query.first()
+        if not existing:
+            return None
+        return {
+            "make": existing.make,
+            "model": existing.model,
+            "year": existing.year,
+            "chassis_number": existing.chassis_number,
+        }
+
+    def _resolve_remote(
+        self, chassis_clean: str, api_url: str, api_key: str, timeout: float
+    ) -> dict[str, Any] | None:
+        """Fetch and store one vehicle; None only when the API does not know it, raises otherwise."""
+        # A previous flight may have finished between our DB check and now
+        existing = self._find_in_db(chassis_clean)
+        if existing:
+            return existing
+        if chassis_clean in _negative_cache:
+            return None
+
+        _negative_cache.maxsize = current_app.config.get("CHASSIS_NEGATIVE_CACHE_SIZE", 10000)
+        negative_ttl = current_app.config.get("CHASSIS_NEGATIVE_CACHE_TTL", 3600)
+
+        vehicle_data = self._fetch_remote(chassis_clean, api_url, api_key, timeout)
+        if vehicle_data is None:
+            _negative_cache.add(chassis_clean, negative_ttl)
+            return None
+
+        # Save to DB for future lookups
+        return self._save_vehicle(vehicle_data)
+
+    @staticmethod
+    def _fetch_remote(
+        chassis_clean: str, api_url: str, api_key: str, timeout: float
+    ) -> dict[str, Any] | None:
+        """
+        Call the external API. Returns None when the chassis number is unknown
+        and raises on transient failures. Safe to call outside an app context.
+        """
+        # Example API call structure (adjust based on your actual API)
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        }
+        params = {"chassis": chassis_clean}
+
+        response = requests.get(
+            f"{api_url}/lookup", headers=headers, params=params, timeout=timeout
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return ChassisService._vehicle_from_response(chassis_clean, response.json())
+
+    @staticmethod
+    def _vehicle_from_response(chassis_clean: str, data: dict[str, Any]) -> dict[str, Any] | None:
+        # Extract vehicle info (adjust based on your API response format)
+        vehicle_data = {
+            "make": data.get("make") or data.get("manufacturer"),
+            "model": data.get("model"),
+            "year": str(data.get("year") or data.get("year_of_manufacture", "")),
+            "chassis_number": chassis_clean,
+        }
+        if not vehicle_data["make"] or not vehicle_data["model"]:
+            return None
+        return vehicle_data
+
+    def _flush_batch(
+        self,
+        batch: list[dict[str, Any]],
+        result: Callable[[str, str, dict[str, Any] | None], dict[str, Any]],
+    ) -> Iterator[dict[str, Any]]:
+        """Insert a batch of resolved vehicles, skipping chassis numbers stored meanwhile."""
+        db.session.execute(_insert_ignore(Vehicle.__table__), batch)
+        db.session.commit()
+        for vehicle_data in batch:
+            yield result(vehicle_data["chassis_number"], "resolved", vehicle_data)
+
+    def _save_vehicle(self, vehicle_data: dict[str, Any]) -> dict[str, Any]:
+        """
+        Insert the vehicle, tolerating a concurrent insert of the same chassis
+        number from another worker process: the unique-key violation rolls back
+        only the savepoint, the rest of the session's transaction is kept, and
+        the stored row wins. It is re-read with a shared lock because the
+        other worker's row is not in this transaction's snapshot.
+        """
+        vehicle = Vehicle(
+            make=vehicle_data["make"],
+            model=vehicle_data["model"],
+            year=vehicle_data["year"],
+            chassis_number=vehicle_data["chassis_number"],
+        )
+        try:
+            with db.session.begin_nested():
+                db.session.add(vehicle)
+        except IntegrityError:
+            existing = self._find_in_db(vehicle_data["chassis_number"], lock=True)
+            if not existing:
+                raise
+            # Ends the transaction like the insert path, releasing the shared lock
             db.session.commit()
+            return existing
+        db.session.commit()
+        return vehicle_data
+
+
+def _insert_ignore(table):
+    """INSERT that silently skips rows violating a unique key (MySQL/SQLite/PostgreSQL)."""
+    stmt = insert(table)
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "mysql":
+        return stmt.prefix_with("IGNORE")
+    if dialect == "sqlite":
+        return stmt.prefix_with("OR IGNORE")
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table).on_conflict_do_nothing()
+    return stmt
+
+
+class AsyncChassisService(ChassisService):
+    """
+    asyncio variant of ChassisService for the ASGI entry point. The external
+    API is called on a shared httpx.AsyncClient; DB work runs on a thread.
+    Shares the negative cache with the synchronous service.
+    """
 
-            return vehicle_data
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self._client = client
+
+    async def lookup_vehicle(self, chassis_number: str) -> dict[str, Any] | None:
+        """Async lookup_vehicle; same return value and caching behaviour."""
+        app = current_app._get_current_object()
+        chassis_clean = chassis_number.strip().upper()
+
+        existing = await run_in_app_context(app, self._find_in_db, chassis_clean)
+        if existing:
+            return existing
+
+        if chassis_clean in _negative_cache:
+            return None
+
+        api_url = current_app.config.get("CHASSIS_API_BASE_URL")
+        api_key = current_app.config.get("CHASSIS_API_KEY")
+        if not api_url or not api_key:
+            return None
+
+        try:
+            return await _async_inflight.do(
+                chassis_clean,
+                lambda: self._resolve_remote_async(app, chassis_clean, api_url, api_key),
+            )
         except Exception as e:
-            # Log error but don't fail - return None
-            current_app.logger.error(f"Chassis API error: {e}")
+            # Log error but don't fail - return None (transient errors are not cached)
+            app.logger.error(f"Chassis API error: {e}")
+            stage_failed()
+            return None
+
+    async def _resolve_remote_async(
+        self, app, chassis_clean: str, api_url: str, api_key: str
+    ) -> dict[str, Any] | None:
+        """Async _resolve_remote: None only when the API does not know the number, raises otherwise."""
+        existing = await run_in_app_context(app, self._find_in_db, chassis_clean)
+        if existing:
+            return existing
+        if chassis_clean in _negative_cache:
+            return None
+
+        _negative_cache.maxsize = app.config.get("CHASSIS_NEGATIVE_CACHE_SIZE", 10000)
+        negative_ttl = app.config.get("CHASSIS_NEGATIVE_CACHE_TTL", 3600)
+        timeout = app.config.get("CHASSIS_API_TIMEOUT", 10)
+
+        response = await self._client.get(
+            f"{api_url}/lookup",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json",
+            },
+            params={"chassis": chassis_clean},
+            timeout=timeout,
+        )
+        if response.status_code == 404:
+            _negative_cache.add(chassis_clean, negative_ttl)
+            return None
+        response.raise_for_status()
+        vehicle_data = self._vehicle_from_response(chassis_clean, response.json())
+        if vehicle_data is None:
+            _negative_cache.add(chassis_clean, negative_ttl)
             return None
 
+        return await run_in_app_context(app, self._save_vehicle, vehicle_data)
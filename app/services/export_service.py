@@ -0,0 +1,243 @@
+"""
+Streaming exports of leads and the catalog for the admin API.
+
+An export is one SELECT read through a server-side cursor (yield_per rows at
+a time) on its own connection, from a replica when one is usable (see
+db_routing.read_engine()). Rows are encoded as CSV or NDJSON into chunks of
+about 64 KiB, optionally gzip-compressed as they go, and handed to the
+response as they are produced. Memory stays flat whatever the row count, and
+no db.session transaction is held open while the client downloads.
+
+Filters:
+  * since / until (until exclusive): leads by created_at, catalog by updated_at;
+  * status (leads only): one or more statuses;
+  * archived (leads only): exclude (default), include or only rows moved to
+    leads_archive by the retention job.
+
+Each export holds a worker thread and a pool connection for its whole
+download, so at most EXPORT_MAX_CONCURRENT run per process.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import logging
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator, Mapping
+
+from flask import Flask
+from sqlalchemy import null, select
+from sqlalchemy.engine import Engine
+
+from ..models import Lead, LeadArchive, Part, Vehicle
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("leads", "parts", "vehicles")
+FORMATS = ("csv", "ndjson")
+ARCHIVED = ("exclude", "include", "only")
+MIMETYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+_CHUNK_SIZE = 64 * 1024
+_LEAD_COLUMNS = (
+    "id", "created_at", "updated_at", "whatsapp_user_id", "user_locale",
+    "intent", "query_text", "assigned_agent", "status",
+)
+
+
+@dataclass(slots=True)
+class ExportRequest:
+    kind: str
+    format: str = "csv"
+    since: datetime | None = None
+    until: datetime | None = None
+    statuses: list[str] = field(default_factory=list)
+    archived: str = "exclude"
+    compress: bool = False
+
+    @property
+    def filename(self) -> str:
+        return f"{self.kind}-{datetime.utcnow():%Y%m%d-%H%M%S}.{self.format}{'.gz' if self.compress else ''}"
+
+    @property
+    def mimetype(self) -> str:
+        return "application/gzip" if self.compress else MIMETYPES[self.format]
+
+
+def parse_export_request(kind: str, args: Mapping[str, Any]) -> ExportRequest:
+    """Build an ExportRequest from query arguments; raises ValueError with a user-facing message."""
+    req = ExportRequest(kind=kind)
+    req.format = args.get("format", "csv")
+    if req.format not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    req.since = _parse_time(args.get("since"), "since")
+    req.until = _parse_time(args.get("until"), "until")
+    if req.since and req.until and req.since >= req.until:
+        raise ValueError("since must be before until")
+    req.compress = (args.get("gzip") or "").lower() in ("1", "true", "yes")
+
+    getlist = getattr(args, "getlist", None)
+    raw_statuses = getlist("status") if getlist else [args.get("status") or ""]
+    req.statuses = [s.strip() for value in raw_statuses for s in value.split(",") if s.strip()]
+    req.archived = args.get("archived", "exclude")
+    if req.archived not in ARCHIVED:
+        raise ValueError(f"archived must be one of {', '.join(ARCHIVED)}")
+    if kind != "leads" and (req.statuses or req.archived != "exclude"):
+        raise ValueError("status and archived only apply to leads")
+    return req
+
+
+def stream_export(req: ExportRequest, engine: Engine, yield_per: int = 1000) -> Iterator[bytes]:
+    """Encoded (and optionally gzipped) export body, produced chunk by chunk."""
+    columns, statements = _statements(req)
+    buffer = io.StringIO()
+    write_rows = _csv_writer(buffer, columns) if req.format == "csv" else _ndjson_writer(buffer, columns)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if req.compress else None
+    rows = 0
+    sent = 0
+    started = time.perf_counter()
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor is not None else data
+
+    try:
+        with engine.connect() as conn:
+            for statement in statements:
+                result = conn.execution_options(yield_per=yield_per).execute(statement)
+                for partition in result.partitions():
+                    write_rows(partition)
+                    rows += len(partition)
+                    if buffer.tell() >= _CHUNK_SIZE:
+                        chunk = drain()
+                        if chunk:
+                            sent += len(chunk)
+                            yield chunk
+        chunk = drain() + (compressor.flush() if compressor is not None else b"")
+        sent += len(chunk)
+        yield chunk
+    except GeneratorExit:
+        logger.info(f"Export of {req.kind} cancelled by the client after {rows} rows")
+        raise
+    logger.info(
+        f"Exported {rows} {req.kind} as {req.format}{' (gzip)' if req.compress else ''}: "
+        f"{sent} bytes in {time.perf_counter() - started:.1f}s"
+    )
+
+
+_slots_lock = threading.Lock()
+
+
+def get_export_slots(app: Flask) -> threading.BoundedSemaphore:
+    """Per-process limit on concurrent exports (EXPORT_MAX_CONCURRENT)."""
+    with _slots_lock:
+        slots = app.extensions.get("export_slots")
+        if slots is None:
+            slots = threading.BoundedSemaphore(max(1, int(app.config.get("EXPORT_MAX_CONCURRENT", 2))))
+            app.extensions["export_slots"] = slots
+        return slots
+
+
+# ---- Internal helpers
+
+
+def _parse_time(value: str | None, name: str) -> datetime | None:
+    """ISO date or datetime (UTC, optional trailing Z)."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.removesuffix("Z"))
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime, e.g. 2024-01-31 or 2024-01-31T12:00:00") from None
+    return parsed.replace(tzinfo=None)
+
+
+def _statements(req: ExportRequest) -> tuple[list[str], list]:
+    if req.kind == "leads":
+        return _lead_statements(req)
+    if req.kind == "parts":
+        columns = [
+            Part.id, Part.part_number, Part.name, Part.brand, Part.price, Part.quantity_min, Part.vehicle_id,
+            Vehicle.make, Vehicle.model, Vehicle.year, Vehicle.chassis_number, Part.updated_at,
+        ]
+        statement = select(*columns).join(Vehicle, Part.vehicle_id == Vehicle.id, isouter=True)
+        statement = _time_range(statement, Part.updated_at, req).order_by(Part.id)
+        names = [
+            "id", "part_number", "name", "brand", "price", "quantity_min", "vehicle_id",
+            "make", "model", "year", "chassis_number", "updated_at",
+        ]
+        return names, [statement]
+    columns = [
+        Vehicle.id, Vehicle.make, Vehicle.model, Vehicle.year, Vehicle.chassis_number,
+        Vehicle.created_at, Vehicle.updated_at,
+    ]
+    statement = _time_range(select(*columns), Vehicle.updated_at, req).order_by(Vehicle.id)
+    return [c.key for c in columns], [statement]
+
+
+def _lead_statements(req: ExportRequest) -> tuple[list[str], list]:
+    statements = []
+    for model, archived in ((Lead, False), (LeadArchive, True)):
+        if (req.archived == "exclude" and archived) or (req.archived == "only" and not archived):
+            continue
+        columns = [getattr(model, name) for name in _LEAD_COLUMNS]
+        if req.archived != "exclude":
+            columns.append(model.archived_at if archived else null().label("archived_at"))
+        statement = _time_range(select(*columns), model.created_at, req)
+        if req.statuses:
+            statement = statement.where(model.status.in_(req.statuses))
+        # Walks ix_leads_created_at / ix_leads_status_created in order
+        statements.append(statement.order_by(model.created_at, model.id))
+    names = list(_LEAD_COLUMNS) + (["archived_at"] if req.archived != "exclude" else [])
+    return names, statements
+
+
+def _time_range(statement, column, req: ExportRequest):
+    if req.since:
+        statement = statement.where(column >= req.since)
+    if req.until:
+        statement = statement.where(column < req.until)
+    return statement
+
+
+def _csv_writer(buffer: io.StringIO, columns: list[str]):
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    def write_rows(rows) -> None:
+        writer.writerows([_csv_value(v) for v in row] for row in rows)
+
+    return write_rows
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_writer(buffer: io.StringIO, columns: list[str]):
+    def write_rows(rows) -> None:
+        for row in rows:
+            buffer.write(json.dumps(dict(zip(columns, row)), default=_json_value, ensure_ascii=False))
+            buffer.write("\n")
+
+    return write_rows
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
@@ -4,11 +4,35 @@ Handles multilingual queries and generates conversational responses.
 """
 
 from typing import Any
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from flask import current_app
+from .metrics import stage_failed
 from .translation_service import TranslationService
+import asyncio
 import json
 import re
+from functools import lru_cache
+
+INTENT_SYSTEM_PROMPT = """You are a car parts assistant. Analyze user messages and extract:
+1. Intent: one of: 'part_number', 'chassis', 'car_part', 'greeting', 'unknown'
+2. Entities:
+   - part_number: if user mentions a part number/SKU
+   - chassis: if user mentions chassis/VIN number
+   - car_make: car manufacturer (Toyota, Nissan, etc.)
+   - car_model: car model name
+   - part_name: name of the part (alternator, brake pad, etc.)
+3. Language: detected language code (en, ar, etc.)
+
+Respond ONLY with valid JSON in this format:
+{
+  "intent": "...",
+  "entities": {...},
+  "language": "..."
+}
+"""
+
+FORMAT_SYSTEM_PROMPT = "You are a helpful car parts assistant. Respond naturally and conversationally."
+
 
 class GPTService:
     """Service for GPT-based natural language understanding and response generation."""
@@ -17,8 +41,10 @@ class GPTService:
         self.client = None
         api_key = current_app.config.get("OPENAI_API_KEY")
         if api_key:
-            self.client = OpenAI(api_key=api_key)
-        self.translation_service = TranslationService()
+            self.client = OpenAI(api_key=api_key, base_url=current_app.config.get("OPENAI_BASE_URL"))
+        self.translation_service = TranslationService(
+            cache_path=current_app.config.get("TRANSLATION_CACHE_PATH")
+        )
 
     def extract_intent(self, user_message: str) -> dict[str, Any]:
         """
@@ -34,29 +60,11 @@ class GPTService:
 
         model = current_app.config.get("OPENAI_MODEL", "gpt-4o-mini")
 
-        system_prompt = """You are a car parts assistant. Analyze user messages and extract:
-1. Intent: one of: 'part_number', 'chassis', 'car_part', 'greeting', 'unknown'
-2. Entities:
-   - part_number: if user mentions a part number/SKU
-   - chassis: if user mentions chassis/VIN number
-   - car_make: car manufacturer (Toyota, Nissan, etc.)
-   - car_model: car model name
-   - part_name: name of the part (alternator, brake pad, etc.)
-3. Language: detected language code (en, ar, etc.)
-
-Respond ONLY with valid JSON in this format:
-{
-  "intent": "...",
-  "entities": {...},
-  "language": "..."
-}
-"""
-
         try:
             response = self.client.chat.completions.create(
                 model=model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": INTENT_SYSTEM_PROMPT},
                     {"role": "user", "content": user_message},
                 ],
                 temperature=0.3,
@@ -66,6 +74,7 @@ Respond ONLY with valid JSON in this format:
             result = json.loads(response.choices[0].message.content.strip())
             return result
         except Exception:
+            stage_failed()
             return self._fallback_intent(user_message)
 
     def format_response(
@@ -80,6 +89,24 @@ Respond ONLY with valid JSON in this format:
 
         model = current_app.config.get("OPENAI_MODEL", "gpt-4o-mini")
 
+        user_prompt = self._format_prompt(search_results, language)
+
+        try:
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": FORMAT_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=0.7,
+                max_tokens=500,
+            )
+            return response.choices[0].message.content.strip()
+        except Exception:
+            stage_failed()
+            return self._fallback_response(search_results, language)
+
+    def _format_prompt(self, search_results: list[dict], language: str) -> str:
         # Build context about results
         results_text = ""
         if search_results:
@@ -106,23 +133,7 @@ Provide a helpful response that:
 - Suggests next steps if needed
 - Is appropriate for the detected language
 """
-
-        try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful car parts assistant. Respond naturally and conversationally.",
-                    },
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.7,
-                max_tokens=500,
-            )
-            return response.choices[0].message.content.strip()
-        except Exception:
-            return self._fallback_response(search_results, language)
+        return user_prompt
 
     def _fallback_intent(self, message: str) -> dict[str, Any]:
         """Fallback intent extraction without GPT."""
@@ -145,28 +156,88 @@ Provide a helpful response that:
         return {"intent": "car_part", "entities": {}, "language": language or "en"}
 
     def _fallback_response(self, results: list[dict], language: str) -> str:
-        """Fallback response formatting without GPT."""
+        """Fallback response formatting without GPT, built from localized static phrases."""
         base_language = language or "en"
+        phrase = self.translation_service.phrase
         if not results:
-            fallback = "Sorry, we couldn't find any parts matching your query. Please try again with different keywords."
-            return self._translate_if_needed(fallback, base_language)
+            return phrase("no_results", base_language)
 
-        msg = f"Found {len(results)} part(s):\n\n"
+        msg = phrase("found_parts", base_language, count=len(results)) + "\n\n"
         for r in results[:5]:
-            msg += f"{r.get('name', 'N/A')} - Part #{r.get('part_number', 'N/A')}"
+            msg += phrase(
+                "part_line",
+                base_language,
+                name=r.get("name", "N/A"),
+                part_number=r.get("part_number", "N/A"),
+            )
             if r.get("price"):
-                msg += f" | Price: {r.get('price')} AED"
+                msg += phrase("price", base_language, price=r.get("price"))
             if r.get("brand"):
-                msg += f" | Brand: {r.get('brand')}"
+                msg += phrase("brand", base_language, brand=r.get("brand"))
             msg += "\n"
 
         if len(results) > 5:
-            msg += f"\n... and {len(results) - 5} more. Please contact us for details."
+            msg += "\n" + phrase("more_results", base_language, count=len(results) - 5)
+
+        return msg
+
+
+class AsyncGPTService(GPTService):
+    """asyncio variant of GPTService for the ASGI entry point (AsyncOpenAI client)."""
+
+    def __init__(self):
+        api_key = current_app.config.get("OPENAI_API_KEY")
+        self.client = _get_async_client(api_key, current_app.config.get("OPENAI_BASE_URL")) if api_key else None
+        self.translation_service = TranslationService(
+            cache_path=current_app.config.get("TRANSLATION_CACHE_PATH")
+        )
+
+    async def extract_intent(self, user_message: str) -> dict[str, Any]:
+        """Async extract_intent; same result shape."""
+        if not self.client:
+            return self._fallback_intent(user_message)
 
-        return self._translate_if_needed(msg, base_language)
+        model = current_app.config.get("OPENAI_MODEL", "gpt-4o-mini")
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_message},
+                ],
+                temperature=0.3,
+                max_tokens=200,
+            )
+            return json.loads(response.choices[0].message.content.strip())
+        except Exception:
+            stage_failed()
+            return self._fallback_intent(user_message)
+
+    async def format_response(
+        self, search_results: list[dict], intent: str, language: str = "en"
+    ) -> str:
+        """Async format_response; the fallback may translate, so it runs on a thread."""
+        if not self.client:
+            return await asyncio.to_thread(self._fallback_response, search_results, language)
+
+        model = current_app.config.get("OPENAI_MODEL", "gpt-4o-mini")
+        try:
+            response = await self.client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": FORMAT_SYSTEM_PROMPT},
+                    {"role": "user", "content": self._format_prompt(search_results, language)},
+                ],
+                temperature=0.7,
+                max_tokens=500,
+            )
+            return response.choices[0].message.content.strip()
+        except Exception:
+            stage_failed()
+            return await asyncio.to_thread(self._fallback_response, search_results, language)
 
-    def _translate_if_needed(self, text: str, target_language: str) -> str:
-        if not target_language or target_language.lower().startswith("en"):
-            return text
-        return self.translation_service.translate(text, target_language)
 
+@lru_cache(maxsize=4)
+def _get_async_client(api_key: str, base_url: str | None = None) -> AsyncOpenAI:
+    # One pooled client per key and endpoint, reused across messages
+    return AsyncOpenAI(api_key=api_key, base_url=base_url)
@@ -0,0 +1,257 @@
+"""
+Offline language identification for incoming chat messages.
+Classifies by Unicode script first (Arabic, Cyrillic, Devanagari, ...) and,
+for Latin-script text, with a compact character-trigram naive Bayes model.
+No I/O: a short message is classified in tens of microseconds.
+"""
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+@dataclass(slots=True)
+class DetectedLanguage:
+    """Detected ISO 639-1 code with a confidence in [0, 1]."""
+
+    language: str
+    confidence: float
+
+
+# First/last code point of each script block mapped to a default language.
+_SCRIPT_RANGES: tuple[tuple[int, int, str], ...] = (
+    (0x0600, 0x06FF, "ar"),
+    (0x0750, 0x077F, "ar"),
+    (0x08A0, 0x08FF, "ar"),
+    (0xFB50, 0xFDFF, "ar"),
+    (0xFE70, 0xFEFF, "ar"),
+    (0x0400, 0x04FF, "ru"),
+    (0x0900, 0x097F, "hi"),
+    (0x0980, 0x09FF, "bn"),
+    (0x0B80, 0x0BFF, "ta"),
+    (0x0D00, 0x0D7F, "ml"),
+    (0x0370, 0x03FF, "el"),
+    (0x0590, 0x05FF, "he"),
+    (0x0E00, 0x0E7F, "th"),
+    (0x3040, 0x30FF, "ja"),
+    (0xAC00, 0xD7AF, "ko"),
+    (0x4E00, 0x9FFF, "zh"),
+)
+
+# Letters that only Urdu / Persian add to the Arabic script.
+_URDU_LETTERS = frozenset("ٹڈڑںےۓھ")
+_PERSIAN_LETTERS = frozenset("پچژگ")
+
+# Share of letters a non-Latin script needs before it wins over Latin text;
+# Latin words in Arabic messages are usually brand names or part numbers.
+_SCRIPT_MIN_SHARE = 0.3
+
+# Seed text for the Latin-script trigram profiles: everyday chat plus the
+# vocabulary customers use when asking for parts.
+_LATIN_SAMPLES: dict[str, str] = {
+    "en": (
+        "hello i am looking for a brake pad for my car. do you have the front bumper "
+        "and the headlight in stock? what is the price of this part and when can you "
+        "deliver it. please send me the oil filter and the air filter for the engine. "
+        "thank you very much, how much does the alternator cost with shipping. "
+        "i need the spark plugs and the water pump for this model. the battery is "
+        "not working and the radiator is leaking, which shock absorbers fit the rear "
+        "wheels. can you check the chassis number and tell me the right gearbox."
+    ),
+    "fr": (
+        "bonjour je cherche des plaquettes de frein pour ma voiture. avez-vous le "
+        "pare-chocs avant et le phare en stock? quel est le prix de cette pièce et "
+        "quand pouvez-vous la livrer. merci de m'envoyer le filtre à huile et le "
+        "filtre à air pour le moteur. combien coûte l'alternateur avec la livraison. "
+        "j'ai besoin des bougies et de la pompe à eau pour ce modèle. la batterie ne "
+        "fonctionne pas et le radiateur fuit, quels amortisseurs pour les roues "
+        "arrière. pouvez-vous vérifier le numéro de châssis et la boîte de vitesses."
+    ),
+    "es": (
+        "hola estoy buscando pastillas de freno para mi coche. tienen el parachoques "
+        "delantero y el faro en stock? cuál es el precio de esta pieza y cuándo "
+        "pueden entregarla. por favor envíenme el filtro de aceite y el filtro de "
+        "aire para el motor. gracias, cuánto cuesta el alternador con el envío. "
+        "necesito las bujías y la bomba de agua para este modelo. la batería no "
+        "funciona y el radiador tiene una fuga, qué amortiguadores sirven para las "
+        "ruedas traseras. pueden revisar el número de chasis y la caja de cambios."
+    ),
+    "pt": (
+        "olá estou procurando pastilhas de freio para o meu carro. vocês têm o "
+        "para-choque dianteiro e o farol em estoque? qual é o preço desta peça e "
+        "quando podem entregar. por favor me enviem o filtro de óleo e o filtro de "
+        "ar do motor. obrigado, quanto custa o alternador com o frete. preciso das "
+        "velas de ignição e da bomba de água para este modelo. a bateria não "
+        "funciona e o radiador está vazando, quais amortecedores servem nas rodas "
+        "traseiras. podem verificar o número do chassi e a caixa de câmbio."
+    ),
+    "it": (
+        "ciao sto cercando le pastiglie dei freni per la mia macchina. avete il "
+        "paraurti anteriore e il faro disponibili? qual è il prezzo di questo pezzo "
+        "e quando potete consegnarlo. per favore mandatemi il filtro dell'olio e il "
+        "filtro dell'aria per il motore. grazie mille, quanto costa l'alternatore con "
+        "la spedizione. ho bisogno delle candele e della pompa dell'acqua per questo "
+        "modello. la batteria non funziona e il radiatore perde, quali ammortizzatori "
+        "vanno sulle ruote posteriori. potete controllare il numero di telaio."
+    ),
+    "de": (
+        "hallo ich suche bremsbeläge für mein auto. haben sie die vordere "
+        "stoßstange und den scheinwerfer auf lager? wie viel kostet dieses teil und "
+        "wann können sie es liefern. bitte schicken sie mir den ölfilter und den "
+        "luftfilter für den motor. vielen dank, was kostet die lichtmaschine mit "
+        "versand. ich brauche die zündkerzen und die wasserpumpe für dieses modell. "
+        "die batterie funktioniert nicht und der kühler ist undicht, welche "
+        "stoßdämpfer passen hinten. können sie die fahrgestellnummer prüfen."
+    ),
+    "nl": (
+        "hallo ik zoek remblokken voor mijn auto. hebben jullie de voorbumper en de "
+        "koplamp op voorraad? wat is de prijs van dit onderdeel en wanneer kunnen "
+        "jullie het leveren. stuur mij alstublieft het oliefilter en het "
+        "luchtfilter voor de motor. bedankt, hoeveel kost de dynamo met verzending. "
+        "ik heb de bougies en de waterpomp nodig voor dit model. de accu werkt niet "
+        "en de radiateur lekt, welke schokdempers passen op de achterwielen. kunnen "
+        "jullie het chassisnummer controleren en de juiste versnellingsbak zeggen."
+    ),
+    "tr": (
+        "merhaba arabam için fren balatası arıyorum. ön tampon ve far stokta var "
+        "mı? bu parçanın fiyatı nedir ve ne zaman teslim edebilirsiniz. lütfen "
+        "motor için yağ filtresi ve hava filtresi gönderin. çok teşekkürler, kargo "
+        "ile alternatör ne kadar. bu model için bujiler ve su pompası lazım. akü "
+        "çalışmıyor ve radyatör sızdırıyor, arka tekerlere hangi amortisörler "
+        "uyar. şasi numarasını kontrol edip doğru şanzımanı söyleyebilir misiniz."
+    ),
+    "id": (
+        "halo saya sedang mencari kampas rem untuk mobil saya. apakah ada bemper "
+        "depan dan lampu depan yang tersedia? berapa harga suku cadang ini dan "
+        "kapan bisa dikirim. tolong kirimkan saya filter oli dan filter udara untuk "
+        "mesin. terima kasih banyak, berapa harga alternator dengan ongkos kirim. "
+        "saya butuh busi dan pompa air untuk model ini. akinya tidak berfungsi dan "
+        "radiatornya bocor, peredam kejut mana yang cocok untuk roda belakang. "
+        "bisakah anda memeriksa nomor rangka dan memberitahu girboks yang tepat."
+    ),
+}
+
+# Naive Bayes log-likelihoods are overconfident because trigrams overlap;
+# scores are tempered by this factor before normalizing into a posterior.
+_LOG_ODDS_SCALE = 0.5
+
+_WORD_RE = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+class _TrigramModel:
+    """Naive Bayes over padded character trigrams with add-one smoothing."""
+
+    def __init__(self, samples: dict[str, str]) -> None:
+        self.languages = tuple(samples)
+        counts: dict[str, dict[str, int]] = {}
+        vocabulary: set[str] = set()
+        for language, text in samples.items():
+            lang_counts: dict[str, int] = {}
+            for gram in _trigrams(text):
+                lang_counts[gram] = lang_counts.get(gram, 0) + 1
+            counts[language] = lang_counts
+            vocabulary.update(lang_counts)
+
+        vocab_size = len(vocabulary) + 1
+        # Per language: {trigram: log P(trigram | language)} plus the unseen log-prob.
+        self._log_probs: dict[str, dict[str, float]] = {}
+        self._unseen: dict[str, float] = {}
+        for language, lang_counts in counts.items():
+            denominator = sum(lang_counts.values()) + vocab_size
+            self._log_probs[language] = {
+                gram: math.log((count + 1) / denominator) for gram, count in lang_counts.items()
+            }
+            self._unseen[language] = math.log(1 / denominator)
+
+    def classify(self, text: str) -> DetectedLanguage | None:
+        grams = _trigrams(text)
+        if not grams:
+            return None
+        scores = {}
+        for language in self.languages:
+            table = self._log_probs[language]
+            unseen = self._unseen[language]
+            scores[language] = sum(table.get(gram, unseen) for gram in grams)
+
+        best = max(scores, key=scores.get)
+        top = scores[best]
+        total = sum(math.exp((score - top) * _LOG_ODDS_SCALE) for score in scores.values())
+        return DetectedLanguage(best, 1 / total)
+
+
+class LanguageDetector:
+    """Script-ratio plus trigram language identifier. Stateless after construction."""
+
+    def __init__(self) -> None:
+        self._latin_model = _TrigramModel(_LATIN_SAMPLES)
+
+    def detect(self, text: str) -> DetectedLanguage:
+        """Return the most likely language of text; empty or letterless text is 'en' with 0 confidence."""
+        script_counts: dict[str, int] = {}
+        latin = 0
+        arabic_letters: list[str] = []
+        for ch in text:
+            if not ch.isalpha():
+                continue
+            code = ord(ch)
+            if code < 0x0250:
+                latin += 1
+                continue
+            language = _script_language(code)
+            if language is None:
+                continue
+            script_counts[language] = script_counts.get(language, 0) + 1
+            if language == "ar":
+                arabic_letters.append(ch)
+
+        letters = latin + sum(script_counts.values())
+        if letters == 0:
+            return DetectedLanguage("en", 0.0)
+
+        if script_counts:
+            language = max(script_counts, key=script_counts.get)
+            share = script_counts[language] / letters
+            if share >= _SCRIPT_MIN_SHARE:
+                if language == "ar":
+                    language = _arabic_script_language(arabic_letters)
+                # Script-determined: 0.5 at the minimum share, 1.0 when the whole text is in it
+                confidence = 0.5 + 0.5 * (share - _SCRIPT_MIN_SHARE) / (1 - _SCRIPT_MIN_SHARE)
+                return DetectedLanguage(language, round(confidence, 3))
+
+        result = self._latin_model.classify(text)
+        if result is None:
+            return DetectedLanguage("en", 0.0)
+        result.confidence = round(result.confidence * latin / letters, 3)
+        return result
+
+
+def _script_language(code: int) -> str | None:
+    for start, end, language in _SCRIPT_RANGES:
+        if start <= code <= end:
+            return language
+    return None
+
+
+def _arabic_script_language(letters: list[str]) -> str:
+    if any(ch in _URDU_LETTERS for ch in letters):
+        return "ur"
+    if any(ch in _PERSIAN_LETTERS for ch in letters):
+        return "fa"
+    return "ar"
+
+
+def _trigrams(text: str) -> list[str]:
+    grams: list[str] = []
+    for word in _WORD_RE.findall(unicodedata.normalize("NFC", text.lower())):
+        padded = f" {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+@lru_cache(maxsize=1)
+def get_language_detector() -> LanguageDetector:
+    """Process-wide detector (the trigram tables are built once, on first use)."""
+    return LanguageDetector()
@@ -0,0 +1,326 @@
+"""
+Write-behind buffering for lead recording.
+
+With LEAD_WRITE_BEHIND enabled, the webhook hands lead events to a per-process
+LeadWriteBehind instead of writing them itself. A background thread records
+them with LeadService.record_leads(), one transaction per batch, as soon as
+LEAD_BUFFER_MAX_SIZE events are waiting or the oldest has waited
+LEAD_BUFFER_MAX_DELAY seconds. A batch that fails to commit is kept and retried
+with the next one. After LEAD_BUFFER_MAX_ATTEMPTS failures it is written one
+event at a time, so a single bad event (e.g. a DataError from an over-long
+field) cannot hold up the others: events the database rejects are appended to
+a .rejected NDJSON file next to the journal (logged when there is no journal),
+while a connection error stops the pass and leaves the rest for a retry.
+At most LEAD_BUFFER_MAX_PENDING events wait in memory; once the buffer is
+full, add() refuses new events and record_lead_event() records them
+synchronously instead.
+
+Crash behaviour:
+  * Clean shutdown (atexit, SIGTERM handled by the server) flushes the buffer.
+  * Without a journal, a killed process loses the events still buffered: at
+    most LEAD_BUFFER_MAX_SIZE events / LEAD_BUFFER_MAX_DELAY seconds' worth.
+  * With LEAD_JOURNAL_DIR set, every event is appended to a journal file
+    owned by the process (flock'ed) before add() returns. When the next
+    process starts, it replays the journals of processes that are gone.
+    Writes are flushed to the OS but not fsync'ed. They survive a process
+    crash but not a power loss. Replay is at-least-once: a crash between a
+    batch's commit and the removal of its journal segment records that batch
+    twice.
+  * Journals need fcntl (POSIX); elsewhere journaling is disabled with a warning.
+
+Under a pre-forking server, start the buffer in each worker (create_app runs
+per worker unless the app is preloaded); a thread started before fork does not
+survive in the children.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from flask import Flask
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from .lead_service import LeadEvent, LeadService
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Pause between retries while the database is refusing writes
+_RETRY_DELAY = 1.0
+
+
+class _LeadJournal:
+    """
+    Append-only NDJSON journal of buffered events, split into segments.
+    The active segment collects new events; rotate() seals it when a batch is
+    taken, and release() deletes sealed segments once their batch committed.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._prefix = f"leads-{os.getpid()}-{time.time_ns()}"
+        # Held for the life of the process; a lock that can be taken means its owner is gone.
+        # Locked before it gets its final name so no other process sees it unlocked.
+        pending_lock = self._dir / f"{self._prefix}.lock.tmp"
+        self._lock_file = open(pending_lock, "w")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        pending_lock.rename(self._dir / f"{self._prefix}.lock")
+        self._segment = 0
+        self._sealed: list[Path] = []
+        self._file = open(self._segment_path(), "a", encoding="utf-8")
+
+    def _segment_path(self) -> Path:
+        return self._dir / f"{self._prefix}.{self._segment:06d}.jsonl"
+
+    def append(self, event: LeadEvent) -> None:
+        self._file.write(json.dumps(event.to_json()) + "\n")
+        self._file.flush()
+
+    def rotate(self) -> None:
+        if self._file.tell() == 0:
+            # Nothing new since the last rotation (e.g. a retried batch)
+            return
+        self._file.close()
+        self._sealed.append(self._segment_path())
+        self._segment += 1
+        self._file = open(self._segment_path(), "a", encoding="utf-8")
+
+    def reject(self, event: LeadEvent, error: Exception) -> None:
+        """Keep an event the database refused, for someone to look at; never replayed."""
+        with open(self._dir / f"{self._prefix}.rejected", "a", encoding="utf-8") as f:
+            f.write(json.dumps({"event": event.to_json(), "error": str(error)}) + "\n")
+
+    def release(self) -> None:
+        for path in self._sealed:
+            path.unlink(missing_ok=True)
+        self._sealed = []
+
+    def close(self) -> None:
+        self._file.close()
+        if self._segment_path().stat().st_size == 0 and not self._sealed:
+            self._segment_path().unlink(missing_ok=True)
+            self._lock_file.close()
+            (self._dir / f"{self._prefix}.lock").unlink(missing_ok=True)
+        else:
+            # Unwritten events stay on disk for the next process to replay
+            self._lock_file.close()
+
+    @staticmethod
+    def orphaned(directory: str) -> list[tuple[Path, Any, list[Path]]]:
+        """
+        (lock path, open locked handle, segments) for journals whose owning
+        process is gone. The caller keeps the handle open while replaying.
+        """
+        found = []
+        for lock_path in sorted(Path(directory).glob("leads-*.lock")):
+            lock_file = open(lock_path, "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            prefix = lock_path.name[: -len(".lock")]
+            found.append((lock_path, lock_file, sorted(Path(directory).glob(f"{prefix}.*.jsonl"))))
+        return found
+
+
+class LeadWriteBehind:
+    """Per-process lead buffer flushed in batches by a background thread."""
+
+    def __init__(
+        self,
+        app: Flask,
+        max_size: int = 100,
+        max_delay: float = 2.0,
+        journal_dir: str | None = None,
+        max_pending: int = 10000,
+        max_attempts: int = 3,
+    ) -> None:
+        self._app = app
+        self.max_size = max(1, max_size)
+        self.max_delay = max_delay
+        self.max_pending = max(self.max_size, max_pending)
+        self.max_attempts = max(1, max_attempts)
+        self.overflowed = 0
+        self._cond = threading.Condition()
+        self._events: list[LeadEvent] = []
+        # Events taken by the flusher and not yet written; they count against max_pending
+        self._in_flight = 0
+        self._oldest = 0.0
+        self._closed = False
+        self._journal_dir = journal_dir if journal_dir and fcntl is not None else None
+        if journal_dir and fcntl is None:
+            logger.warning("LEAD_JOURNAL_DIR needs fcntl; lead journaling is disabled on this platform")
+        self._journal = _LeadJournal(self._journal_dir) if self._journal_dir else None
+        self._thread = threading.Thread(target=self._run, name="lead-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def add(self, event: LeadEvent) -> bool:
+        """Buffer the event; False when the buffer is full and the caller must record it itself."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("lead buffer is closed")
+            if len(self._events) + self._in_flight >= self.max_pending:
+                if not self.overflowed:
+                    logger.warning(f"Lead buffer full ({self.max_pending} events); recording leads synchronously")
+                self.overflowed += 1
+                return False
+            if self._journal is not None:
+                self._journal.append(event)
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.append(event)
+            if len(self._events) >= self.max_size:
+                self._cond.notify()
+            return True
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._events)
+
+    def close(self, timeout: float | None = 30) -> None:
+        """Flush what is buffered and stop the flusher thread."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        with self._cond:
+            if self._events:
+                logger.error(f"{len(self._events)} lead events were not recorded at shutdown")
+            if self._journal is not None:
+                self._journal.close()
+
+    # ---- Internal helpers
+
+    def _run(self) -> None:
+        if self._journal_dir:
+            self._replay_orphans()
+        failures = 0
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    timeout = self._oldest + self.max_delay - time.monotonic() if self._events else None
+                    self._cond.wait(timeout)
+                if not self._events:
+                    return
+                batch, self._events = self._events, []
+                self._in_flight = len(batch)
+                if self._journal is not None:
+                    self._journal.rotate()
+            if failures >= self.max_attempts:
+                # Isolate the events the database keeps refusing
+                batch = self._write_each(batch)
+            elif self._write(batch):
+                batch = []
+            if not batch:
+                failures = 0
+                with self._cond:
+                    self._in_flight = 0
+                    if self._journal is not None:
+                        self._journal.release()
+            else:
+                failures += 1
+                with self._cond:
+                    self._in_flight = 0
+                    # Keep order: the failed batch goes ahead of anything added meanwhile
+                    self._events[:0] = batch
+                    self._oldest = time.monotonic()
+                    if self._closed:
+                        return
+                time.sleep(_RETRY_DELAY)
+
+    def _due(self) -> bool:
+        return bool(self._events) and (
+            len(self._events) >= self.max_size or time.monotonic() - self._oldest >= self.max_delay
+        )
+
+    def _write(self, batch: list[LeadEvent]) -> bool:
+        try:
+            with self._app.app_context():
+                LeadService().record_leads(batch)
+            return True
+        except Exception as e:
+            logger.error(f"Recording {len(batch)} buffered leads failed: {e}")
+            return False
+
+    def _write_each(self, batch: list[LeadEvent]) -> list[LeadEvent]:
+        """
+        Record events one per transaction and dead-letter the ones that fail.
+        Stops at a connection error and returns the events not yet written.
+        """
+        for i, event in enumerate(batch):
+            try:
+                with self._app.app_context():
+                    LeadService().record_leads([event])
+            except (OperationalError, InterfaceError) as e:
+                logger.error(f"Recording buffered leads failed: {e}")
+                return batch[i:]
+            except Exception as e:
+                logger.error(f"Lead event from {event.whatsapp_user_id} rejected: {e}")
+                self._reject(event, e)
+        return []
+
+    def _reject(self, event: LeadEvent, error: Exception) -> None:
+        if self._journal is not None:
+            with self._cond:
+                self._journal.reject(event, error)
+        else:
+            logger.error(f"Dropped lead event: {json.dumps(event.to_json())}")
+
+    def _replay_orphans(self) -> None:
+        for lock_path, lock_file, segments in _LeadJournal.orphaned(self._journal_dir):
+            events: list[LeadEvent] = []
+            for segment in segments:
+                with open(segment, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            try:
+                                events.append(LeadEvent.from_json(json.loads(line)))
+                            except (ValueError, TypeError):
+                                # A line cut short by the crash
+                                continue
+            if events and not self._write(events) and self._write_each(events):
+                # Left for the next process to try
+                lock_file.close()
+                continue
+            for segment in segments:
+                segment.unlink(missing_ok=True)
+            lock_path.unlink(missing_ok=True)
+            lock_file.close()
+            if events:
+                logger.warning(f"Recovered {len(events)} lead events from {lock_path.name}")
+
+
+def init_lead_write_behind(app: Flask) -> LeadWriteBehind:
+    buffer = LeadWriteBehind(
+        app,
+        max_size=int(app.config.get("LEAD_BUFFER_MAX_SIZE", 100)),
+        max_delay=float(app.config.get("LEAD_BUFFER_MAX_DELAY", 2.0)),
+        journal_dir=app.config.get("LEAD_JOURNAL_DIR"),
+        max_pending=int(app.config.get("LEAD_BUFFER_MAX_PENDING", 10000)),
+        max_attempts=int(app.config.get("LEAD_BUFFER_MAX_ATTEMPTS", 3)),
+    )
+    app.extensions["lead_write_behind"] = buffer
+    return buffer
+
+
+def record_lead_event(app: Flask, event: LeadEvent) -> Any:
+    """Buffer the event when write-behind is on, otherwise record it now (one commit)."""
+    buffer: LeadWriteBehind | None = app.extensions.get("lead_write_behind")
+    if buffer is not None and buffer.add(event):
+        return None
+    return LeadService().record_lead(event).id
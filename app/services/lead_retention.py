@@ -0,0 +1,180 @@
+"""
+Lead retention: moves closed leads out of the hot leads table.
+
+Leads whose status is one of LEAD_ARCHIVE_STATUSES and that were created more
+than LEAD_RETENTION_DAYS ago are copied to leads_archive and deleted from
+leads, LEAD_ARCHIVE_BATCH_SIZE rows per transaction, oldest first. Each batch
+is locked with FOR UPDATE SKIP LOCKED where the database supports it, so
+batches never wait on rows a request is updating. There is a short pause
+(LEAD_ARCHIVE_PAUSE_SECONDS) between batches so replicas keep up and
+foreground writes get the table. Every batch also takes its leads off the
+agents' counters, which keeps agent_loads equal to a GROUP BY over the hot
+table (what rebuild_agent_loads() computes). Admin stats buckets are rebuilt
+from leads and leads_archive together (see stats_service), so they keep
+counting archived leads.
+
+With LEAD_ARCHIVE_ENABLED the job runs on a background thread every
+LEAD_ARCHIVE_INTERVAL_SECONDS, in one process at a time (lease row in
+stat_values). scripts/archive_leads.py runs it once, e.g. from cron.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from flask import Flask, current_app
+from sqlalchemy import case, delete, func, insert, literal, select, update
+
+from ..extensions import db
+from ..models import AgentLoad, Lead, LeadArchive
+from .stats_service import claim_lease
+
+logger = logging.getLogger(__name__)
+
+_ARCHIVE_LEASE = "lead_archive_lease"
+_COLUMNS = (
+    "id", "whatsapp_user_id", "user_locale", "intent", "query_text",
+    "assigned_agent", "status", "created_at", "updated_at",
+)
+
+
+@dataclass(slots=True)
+class ArchiveResult:
+    cutoff: datetime
+    archived: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    complete: bool = True
+
+    def to_json(self) -> dict:
+        return {
+            "cutoff": self.cutoff.isoformat() + "Z",
+            "archived": self.archived,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "complete": self.complete,
+        }
+
+
+def archive_leads(
+    days: int,
+    statuses: list[str],
+    batch_size: int = 1000,
+    max_batches: int | None = None,
+    pause: float = 0.0,
+    dry_run: bool = False,
+    now: datetime | None = None,
+) -> ArchiveResult:
+    """
+    Move closed leads older than `days` to leads_archive in batches. Stops
+    after `max_batches` (complete=False) so one run has bounded cost. With
+    dry_run, only counts what would move.
+    """
+    started = time.perf_counter()
+    result = ArchiveResult(cutoff=(now or datetime.utcnow()) - timedelta(days=days))
+    eligible = (Lead.status.in_(statuses), Lead.created_at < result.cutoff)
+
+    if dry_run:
+        result.archived = db.session.scalar(select(func.count()).select_from(Lead).where(*eligible)) or 0
+        db.session.rollback()
+        result.seconds = time.perf_counter() - started
+        return result
+
+    while max_batches is None or result.batches < max_batches:
+        moved = _archive_batch(eligible, batch_size)
+        if not moved:
+            break
+        result.archived += moved
+        result.batches += 1
+        if moved < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    else:
+        result.complete = False
+
+    result.seconds = time.perf_counter() - started
+    if result.archived:
+        logger.info(
+            f"Archived {result.archived} leads older than {result.cutoff:%Y-%m-%d} "
+            f"in {result.batches} batches ({result.seconds:.1f}s)"
+        )
+    return result
+
+
+def _archive_batch(eligible, batch_size: int) -> int:
+    rows = db.session.execute(
+        select(Lead.id, Lead.assigned_agent)
+        .where(*eligible)
+        .order_by(Lead.created_at, Lead.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not rows:
+        db.session.rollback()
+        return 0
+    ids = [row.id for row in rows]
+
+    source = Lead.__table__
+    db.session.execute(
+        insert(LeadArchive.__table__).from_select(
+            [*_COLUMNS, "archived_at"],
+            select(*(source.c[name] for name in _COLUMNS), literal(datetime.utcnow())).where(source.c.id.in_(ids)),
+        )
+    )
+    db.session.execute(delete(source).where(source.c.id.in_(ids)))
+    for agent, count in Counter(row.assigned_agent for row in rows if row.assigned_agent).items():
+        db.session.execute(
+            update(AgentLoad)
+            .where(AgentLoad.agent == agent)
+            .values(lead_count=case((AgentLoad.lead_count > count, AgentLoad.lead_count - count), else_=0))
+        )
+    db.session.commit()
+    return len(ids)
+
+
+class LeadArchiver:
+    """Background thread running archive_leads() on an interval, one process at a time."""
+
+    def __init__(self, app: Flask) -> None:
+        self._app = app
+        self.interval = float(app.config.get("LEAD_ARCHIVE_INTERVAL_SECONDS", 3600))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lead-archiver", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with self._app.app_context():
+                    if claim_lease(_ARCHIVE_LEASE, self.interval * 0.9):
+                        run_configured_archive()
+            except Exception as e:
+                # The app context's teardown rolls back the unfinished batch
+                logger.error(f"Lead archiving failed: {e}")
+
+
+def run_configured_archive(dry_run: bool = False, max_batches: int | None = None) -> ArchiveResult:
+    """archive_leads() with the LEAD_* settings of the current app."""
+    config = current_app.config
+    return archive_leads(
+        days=int(config.get("LEAD_RETENTION_DAYS", 90)),
+        statuses=list(config.get("LEAD_ARCHIVE_STATUSES", ["responded"])),
+        batch_size=int(config.get("LEAD_ARCHIVE_BATCH_SIZE", 1000)),
+        max_batches=max_batches if max_batches is not None else config.get("LEAD_ARCHIVE_MAX_BATCHES") or None,
+        pause=float(config.get("LEAD_ARCHIVE_PAUSE_SECONDS", 0.1)),
+        dry_run=dry_run,
+    )
+
+
+def init_lead_archiver(app: Flask) -> LeadArchiver:
+    archiver = LeadArchiver(app)
+    app.extensions["lead_archiver"] = archiver
+    return archiver
@@ -1,56 +1,210 @@
 """
 Lead management and auto-assignment service.
 Handles lead assignment to sales agents.
+
+Assignment reads one counter row per agent (agent_loads) instead of counting
+leads, so its cost does not grow with the leads table. The counter rows are
+locked (SELECT ... FOR UPDATE) while an agent is picked and incremented in the
+same transaction as the lead update, so concurrent messages in any worker
+process never pick from the same counts. Counters are (re)built from a single
+GROUP BY over leads when an agent is first seen and on demand.
+
+record_lead()/record_leads() write a lead (or a batch of them) together with
+its assignment and final status in a single commit; app.services.lead_buffer
+builds write-behind batching on top of record_leads().
 """
-from typing import Any
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, NamedTuple
 from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
 from ..extensions import db
-from ..models import Lead
+from ..models import AgentLoad, Lead
+from .stats_service import bump_lead_buckets
+
+STRATEGIES = ("least_loaded", "weighted")
+
+# SQLite has no row locks (FOR UPDATE is dropped); serialize assignment in-process there
+_assign_lock = threading.Lock()
+
+
+@dataclass(slots=True)
+class LeadEvent:
+    """An inbound message to record as a lead; responded marks that a search reply was sent."""
+
+    whatsapp_user_id: str
+    query_text: str
+    intent: str | None = None
+    responded: bool = False
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    def to_json(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["created_at"] = self.created_at.isoformat()
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "LeadEvent":
+        return cls(**{**data, "created_at": datetime.fromisoformat(data["created_at"])})
+
+
+class AgentState(NamedTuple):
+    lead_count: int
+    weight: float
+    available: bool
+
+
+def pick_agent(loads: dict[str, AgentState], agents: list[str], strategy: str = "least_loaded") -> str | None:
+    """
+    Choose among available agents with a positive weight: fewest leads
+    (least_loaded) or fewest leads per unit of weight (weighted). Ties go to
+    the agent listed first.
+    """
+    best: str | None = None
+    best_score = 0.0
+    for agent in agents:
+        state = loads.get(agent)
+        if state is None or not state.available or state.weight <= 0:
+            continue
+        score = state.lead_count / state.weight if strategy == "weighted" else float(state.lead_count)
+        if best is None or score < best_score:
+            best, best_score = agent, score
+    return best
 
 
 class LeadService:
     """Service for managing leads and auto-assignment to sales agents."""
 
-    def assign_lead(self, lead: Lead) -> str | None:
+    def record_lead(self, event: LeadEvent) -> Lead:
+        """Insert, auto-assign and set the final status of one lead in a single commit."""
+        return self.record_leads([event])[0]
+
+    def record_leads(self, events: list[LeadEvent]) -> list[Lead]:
         """
-        Auto-assign a lead to a sales agent using round-robin or availability.
-        Returns assigned agent name/ID.
+        Record a batch of leads in one transaction: the agent counters are
+        locked once, each lead is assigned in order as if recorded one by one,
+        and every touched counter gets a single increment.
         """
-        # Get list of available agents from config (can be enhanced with DB later)
-        agents = current_app.config.get("SALES_AGENTS", ["agent1", "agent2", "agent3"])
-
-        if not agents:
-            return None
-
-        # Simple round-robin: get count of leads assigned to each agent
-        agent_counts = {}
-        for agent in agents:
-            count = db.session.query(Lead).filter_by(assigned_agent=agent).count()
-            agent_counts[agent] = count
-
-        # Assign to agent with least leads
-        assigned_agent = min(agent_counts, key=agent_counts.get)
-        lead.assigned_agent = assigned_agent
-        lead.status = "assigned"
+        agents = self._agents()
+        strategy = self._strategy()
+        with _assign_lock:
+            loads = self._locked_loads(agents) if agents else {}
+            added: Counter[str] = Counter()
+            leads = []
+            for event in events:
+                agent = pick_agent(loads, agents, strategy)
+                if agent is not None:
+                    loads[agent] = loads[agent]._replace(lead_count=loads[agent].lead_count + 1)
+                    added[agent] += 1
+                leads.append(Lead(
+                    whatsapp_user_id=event.whatsapp_user_id,
+                    query_text=event.query_text,
+                    intent=event.intent,
+                    assigned_agent=agent,
+                    status="responded" if event.responded else ("assigned" if agent else "new"),
+                    created_at=event.created_at,
+                    updated_at=event.created_at,
+                ))
+            db.session.add_all(leads)
+            for agent, count in added.items():
+                db.session.execute(
+                    update(AgentLoad)
+                    .where(AgentLoad.agent == agent)
+                    .values(lead_count=AgentLoad.lead_count + count)
+                )
+            bump_lead_buckets(leads)
+            db.session.commit()
+        return leads
+
+    def agent_loads(self) -> list[dict[str, Any]]:
+        """Counter rows of the configured agents (created on first call)."""
+        agents = self._agents()
+        loads = self._locked_loads(agents)
         db.session.commit()
+        return [
+            {"agent": agent, **loads[agent]._asdict()}
+            for agent in agents
+            if agent in loads
+        ]
 
-        return assigned_agent
-
-    def create_lead(
-        self, whatsapp_user_id: str, query_text: str, intent: str | None = None
-    ) -> Lead:
-        """Create a new lead from WhatsApp message."""
-        lead = Lead(
-            whatsapp_user_id=whatsapp_user_id,
-            query_text=query_text,
-            intent=intent,
-            status="new",
-        )
-        db.session.add(lead)
+    def update_agent(self, agent: str, available: bool | None = None, weight: float | None = None) -> bool:
+        """Change an agent's availability or weight; False if the agent is unknown."""
+        if agent in self._agents():
+            # Configured agents get their counter row on first use
+            self._locked_loads([agent])
+        load = db.session.get(AgentLoad, agent)
+        if load is None:
+            db.session.rollback()
+            return False
+        if available is not None:
+            load.available = available
+        if weight is not None:
+            load.weight = weight
         db.session.commit()
+        return True
 
-        # Auto-assign
-        self.assign_lead(lead)
+    def rebuild_agent_loads(self) -> dict[str, int]:
+        """Reset every counter from one GROUP BY over leads (after manual reassignment, archiving, ...)."""
+        with _assign_lock:
+            self._locked_loads(self._agents())
+            counts = self._lead_counts()
+            stored = db.session.scalars(select(AgentLoad.agent).with_for_update()).all()
+            for agent in stored:
+                db.session.execute(
+                    update(AgentLoad).where(AgentLoad.agent == agent).values(lead_count=counts.get(agent, 0))
+                )
+            db.session.commit()
+        return {agent: counts.get(agent, 0) for agent in stored}
+
+    # ---- Internal helpers
+
+    @staticmethod
+    def _agents() -> list[str]:
+        return list(current_app.config.get("SALES_AGENTS", ["agent1", "agent2", "agent3"]))
+
+    @staticmethod
+    def _strategy() -> str:
+        strategy = current_app.config.get("LEAD_ASSIGNMENT_STRATEGY", "least_loaded")
+        if strategy not in STRATEGIES:
+            current_app.logger.warning(f"Unknown LEAD_ASSIGNMENT_STRATEGY {strategy!r}, using least_loaded")
+            return "least_loaded"
+        return strategy
+
+    def _locked_loads(self, agents: list[str]) -> dict[str, AgentState]:
+        """Lock and read the agents' counter rows, creating missing ones first."""
+        query = (
+            select(AgentLoad.agent, AgentLoad.lead_count, AgentLoad.weight, AgentLoad.available)
+            .where(AgentLoad.agent.in_(agents))
+            .with_for_update()
+        )
+        loads = {row.agent: AgentState(row.lead_count, row.weight, row.available) for row in db.session.execute(query)}
+        missing = [agent for agent in agents if agent not in loads]
+        if missing:
+            self._add_agents(missing)
+            loads = {
+                row.agent: AgentState(row.lead_count, row.weight, row.available) for row in db.session.execute(query)
+            }
+        return loads
 
-        return lead
+    def _add_agents(self, agents: list[str]) -> None:
+        counts = self._lead_counts(agents)
+        weights = current_app.config.get("SALES_AGENT_WEIGHTS", {})
+        try:
+            with db.session.begin_nested():
+                db.session.add_all(
+                    AgentLoad(agent=agent, lead_count=counts.get(agent, 0), weight=weights.get(agent, 1.0), available=True)
+                    for agent in agents
+                )
+        except IntegrityError:
+            # Another worker created them first; its rows are as good as ours
+            pass
 
+    @staticmethod
+    def _lead_counts(agents: list[str] | None = None) -> dict[str, int]:
+        query = select(Lead.assigned_agent, func.count()).where(Lead.assigned_agent.is_not(None))
+        if agents is not None:
+            query = query.where(Lead.assigned_agent.in_(agents))
+        return dict(db.session.execute(query.group_by(Lead.assigned_agent)).all())
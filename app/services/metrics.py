@@ -0,0 +1,160 @@
+"""
+In-process latency metrics for the WhatsApp message pipeline.
+
+Each stage of a message (intent, search, carparts_dubai, chassis, lead,
+format, send, and message for the whole round trip) is timed with
+stage_timer() and recorded into a histogram with a call count and an error
+count. Services that swallow failures and fall back (GPT, CarPartsDubai, the
+chassis API, Meta's send endpoint) call stage_failed() so those calls count
+as errors even though no exception reaches the timer.
+
+Recording takes no lock: every thread writes to its own shard, and only
+/api/admin/metrics, which merges the shards, takes the registry lock. Shards
+of finished threads are kept, so counts are cumulative for the process.
+Metrics are per process; scrape every worker (or run one) for totals.
+
+Exposed in Prometheus text format as:
+  carparts_stage_duration_seconds{stage=...}  histogram (_bucket/_sum/_count)
+  carparts_stage_errors_total{stage=...}      counter; error rate = errors / _count
+"""
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+STAGES = ("message", "intent", "search", "carparts_dubai", "chassis", "lead", "format", "send")
+
+# Seconds; GPT and the external APIs live in the upper half
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Failure flag of the innermost running stage in this thread / task
+_current_stage: ContextVar[list[bool] | None] = ContextVar("current_stage", default=None)
+
+
+class _Series:
+    """One stage's histogram within one thread's shard."""
+
+    __slots__ = ("buckets", "total", "errors")
+
+    def __init__(self, size: int) -> None:
+        # One slot per upper bound plus the +Inf overflow slot; not cumulative
+        self.buckets = [0] * (size + 1)
+        self.total = 0.0
+        self.errors = 0
+
+
+class MetricsRegistry:
+    """Per-stage latency histograms, written lock-free through thread-local shards."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards: list[dict[str, _Series]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, error: bool = False) -> None:
+        shard = self._shard()
+        series = shard.get(stage)
+        if series is None:
+            series = shard[stage] = _Series(len(self.buckets))
+        series.buckets[bisect_left(self.buckets, seconds)] += 1
+        series.total += seconds
+        if error:
+            series.errors += 1
+
+    def snapshot(self) -> dict[str, dict]:
+        """Merged {stage: {"buckets": [...], "count", "sum", "errors"}} across threads."""
+        merged: dict[str, dict] = {}
+        with self._lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for stage, series in list(shard.items()):
+                entry = merged.setdefault(
+                    stage, {"buckets": [0] * (len(self.buckets) + 1), "count": 0, "sum": 0.0, "errors": 0}
+                )
+                counts = list(series.buckets)
+                for i, n in enumerate(counts):
+                    entry["buckets"][i] += n
+                entry["count"] += sum(counts)
+                entry["sum"] += series.total
+                entry["errors"] += series.errors
+        return merged
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        snapshot = self.snapshot()
+        stages = [s for s in STAGES if s in snapshot] + sorted(s for s in snapshot if s not in STAGES)
+        lines = [
+            "# HELP carparts_stage_duration_seconds Time spent in each message pipeline stage.",
+            "# TYPE carparts_stage_duration_seconds histogram",
+        ]
+        for stage in stages:
+            entry = snapshot[stage]
+            cumulative = 0
+            for bound, n in zip(self.buckets, entry["buckets"]):
+                cumulative += n
+                lines.append(f'carparts_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'carparts_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {entry["count"]}')
+            lines.append(f'carparts_stage_duration_seconds_sum{{stage="{stage}"}} {entry["sum"]:.6f}')
+            lines.append(f'carparts_stage_duration_seconds_count{{stage="{stage}"}} {entry["count"]}')
+        lines += [
+            "# HELP carparts_stage_errors_total Pipeline stage calls that failed or fell back.",
+            "# TYPE carparts_stage_errors_total counter",
+        ]
+        for stage in stages:
+            lines.append(f'carparts_stage_errors_total{{stage="{stage}"}} {snapshot[stage]["errors"]}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                shard.clear()
+
+    # ---- Internal helpers
+
+    def _shard(self) -> dict[str, _Series]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """
+    Time a pipeline stage. An exception escaping the block, or stage_failed()
+    inside it, counts as an error; a cancelled task (e.g. the CarPartsDubai
+    probe dropped after a local hit) is not recorded at all.
+    """
+    failed = [False]
+    token = _current_stage.set(failed)
+    started = time.perf_counter()
+    cancelled = False
+    try:
+        yield
+    except Exception:
+        failed[0] = True
+        raise
+    except BaseException:
+        cancelled = True
+        raise
+    finally:
+        _current_stage.reset(token)
+        if not cancelled:
+            registry.observe(stage, time.perf_counter() - started, failed[0])
+
+
+def stage_failed() -> None:
+    """Mark the stage currently being timed as failed; a no-op outside stage_timer()."""
+    failed = _current_stage.get()
+    if failed is not None:
+        failed[0] = True
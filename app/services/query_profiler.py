@@ -0,0 +1,235 @@
+"""
+Opt-in SQL query profiler (SQL_PROFILING=true).
+
+Hooks the SQLAlchemy engine events of every configured engine and aggregates
+each statement under a fingerprint: whitespace collapsed, literals replaced by
+"?" and expanded IN lists folded to "IN (...)", so one ORM query is one row
+however its parameters vary. Per fingerprint it keeps the call count, total /
+max time and rows (cursor.rowcount where the driver reports it; SQLite does
+not for SELECTs, so those stay at 0).
+
+Per Flask request it counts queries and repeats of one fingerprint. Requests
+issuing more than SQL_REQUEST_QUERY_WARN queries, or the same statement more
+than SQL_REPEAT_WARN times (the N+1 shape, e.g. part.vehicle loaded per row in
+_serialize_part), are logged. The X-Query-Count response header carries the
+count. Work outside a request (ASGI webhook tasks, scripts) still feeds the
+fingerprint table.
+
+Statements slower than SQL_SLOW_QUERY_MS are logged without their parameters
+(they carry phone numbers and message text). GET /api/admin/queries returns
+the top fingerprints and the per-endpoint query counts of this process.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from flask import Flask, request
+from sqlalchemy import event
+
+from ..extensions import db
+
+logger = logging.getLogger(__name__)
+
+SORT_KEYS = ("total", "mean", "max", "count", "rows")
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_IN_LIST_RE = re.compile(rf"\bIN\s*\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+# Stand-in for fingerprints beyond SQL_PROFILE_MAX_FINGERPRINTS
+_OVERFLOW = "(other statements)"
+
+
+def fingerprint(statement: str) -> str:
+    """Normalized statement text used as the aggregation key."""
+    text = _STRING_RE.sub("?", statement)
+    text = _NUMBER_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("IN (...)", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+@dataclass(slots=True)
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    errors: int = 0
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "errors": self.errors,
+        }
+
+
+@dataclass(slots=True)
+class _RequestQueries:
+    count: int = 0
+    total_ms: float = 0.0
+    by_fingerprint: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class EndpointStats:
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    total_ms: float = 0.0
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "queries_per_request": round(self.queries / self.requests, 2) if self.requests else 0.0,
+            "max_queries": self.max_queries,
+            "sql_ms_per_request": round(self.total_ms / self.requests, 3) if self.requests else 0.0,
+        }
+
+
+_request_queries: ContextVar[_RequestQueries | None] = ContextVar("request_queries", default=None)
+
+
+class QueryProfiler:
+    """Aggregates statement timings from engine events; one per app."""
+
+    def __init__(
+        self,
+        slow_ms: float = 200,
+        request_query_warn: int = 50,
+        repeat_warn: int = 10,
+        max_fingerprints: int = 1000,
+    ) -> None:
+        self.slow_ms = slow_ms
+        self.request_query_warn = request_query_warn
+        self.repeat_warn = repeat_warn
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._queries: dict[str, QueryStats] = {}
+        self._endpoints: dict[str, EndpointStats] = {}
+        self._since = time.time()
+
+    def attach(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine, "handle_error", self._on_error)
+
+    def top(self, limit: int = 20, sort: str = "total") -> list[dict[str, Any]]:
+        with self._lock:
+            items = [(key, stats.to_json()) for key, stats in self._queries.items()]
+        field_name = {"total": "total_ms", "mean": "mean_ms", "max": "max_ms"}.get(sort, sort)
+        items.sort(key=lambda item: item[1][field_name], reverse=True)
+        return [{"fingerprint": key, **stats} for key, stats in items[:limit]]
+
+    def endpoints(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {name: stats.to_json() for name, stats in sorted(self._endpoints.items())}
+
+    def since(self) -> float:
+        return self._since
+
+    def reset(self) -> None:
+        with self._lock:
+            self._queries.clear()
+            self._endpoints.clear()
+            self._since = time.time()
+
+    # ---- Request hooks
+
+    def start_request(self) -> None:
+        _request_queries.set(_RequestQueries())
+
+    def finish_request(self, response):
+        current = _request_queries.get()
+        if current is None:
+            return response
+        _request_queries.set(None)
+        endpoint = request.endpoint or request.path
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.queries += current.count
+            stats.max_queries = max(stats.max_queries, current.count)
+            stats.total_ms += current.total_ms
+        repeated = {key: n for key, n in current.by_fingerprint.items() if n > self.repeat_warn}
+        if current.count > self.request_query_warn or repeated:
+            worst = max(current.by_fingerprint.items(), key=lambda item: item[1])
+            logger.warning(
+                f"{request.method} {request.path} ran {current.count} queries ({current.total_ms:.1f} ms); "
+                f"most repeated x{worst[1]}: {worst[0][:300]}"
+            )
+        response.headers["X-Query-Count"] = str(current.count)
+        return response
+
+    # ---- Engine events
+
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.get("query_started")
+        if not started:
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        self._record(statement, elapsed_ms, rows, error=False)
+
+    def _on_error(self, exception_context) -> None:
+        conn = exception_context.connection
+        started = conn.info.get("query_started") if conn is not None else None
+        if not started or exception_context.statement is None:
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        self._record(exception_context.statement, elapsed_ms, 0, error=True)
+
+    def _record(self, statement: str, elapsed_ms: float, rows: int, error: bool) -> None:
+        key = fingerprint(statement)
+        with self._lock:
+            stats = self._queries.get(key)
+            if stats is None:
+                if len(self._queries) >= self.max_fingerprints:
+                    key = _OVERFLOW
+                stats = self._queries.setdefault(key, QueryStats())
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.rows += rows
+            if error:
+                stats.errors += 1
+
+        current = _request_queries.get()
+        if current is not None:
+            current.count += 1
+            current.total_ms += elapsed_ms
+            current.by_fingerprint[key] = current.by_fingerprint.get(key, 0) + 1
+
+        if elapsed_ms >= self.slow_ms:
+            logger.warning(f"Slow query ({elapsed_ms:.1f} ms, {rows} rows): {key[:1000]}")
+
+
+def init_query_profiler(app: Flask) -> QueryProfiler:
+    profiler = QueryProfiler(
+        slow_ms=float(app.config.get("SQL_SLOW_QUERY_MS", 200)),
+        request_query_warn=int(app.config.get("SQL_REQUEST_QUERY_WARN", 50)),
+        repeat_warn=int(app.config.get("SQL_REPEAT_WARN", 10)),
+        max_fingerprints=int(app.config.get("SQL_PROFILE_MAX_FINGERPRINTS", 1000)),
+    )
+    with app.app_context():
+        for engine in db.engines.values():
+            profiler.attach(engine)
+    app.before_request(profiler.start_request)
+    app.after_request(profiler.finish_request)
+    app.extensions["query_profiler"] = profiler
+    return profiler
@@ -0,0 +1,282 @@
+"""
+On-demand stack-sampling profiler for live workers.
+
+An admin starts a profile for a bounded window (POST /api/admin/profile).
+While it runs, a daemon thread reads every other thread's stack through
+sys._current_frames() at a fixed interval and counts identical stacks. The
+result is in "collapsed stack" format: one line per distinct stack, frames
+root-first and separated by ";", then the sample count. flamegraph.pl,
+speedscope and inferno read it directly.
+
+Safety limits, enforced whatever the request asks for:
+  * duration is capped at PROFILER_MAX_SECONDS and the interval at
+    PROFILER_MIN_INTERVAL_MS;
+  * the sampler times its own work and, whenever it exceeds
+    PROFILER_MAX_OVERHEAD of the wall clock, doubles its interval;
+  * stacks are cut at 64 frames and at most PROFILER_MAX_STACKS distinct
+    stacks are kept (the rest are counted under "[other]");
+  * one profile per process at a time.
+
+Sampling only sees Python frames and, under the GIL, takes a sample between
+bytecodes, so time in C code shows on the calling Python frame.
+
+Scope "all" reaches every worker process on this host: the request is written
+to PROFILER_DIR, each worker's watcher thread (started when PROFILER_WATCH is
+set, polling every PROFILER_POLL_SECONDS) picks it up, and every worker writes <pid>.collapsed
+next to it. The download merges the worker files. Workers on other hosts need
+their own request.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 64
+_OTHER = "[other]"
+# Profile directories older than this are removed when a new profile starts
+_KEEP_SECONDS = 24 * 3600
+
+
+class ProfileBusy(RuntimeError):
+    """A profile is already running in this process."""
+
+
+class SamplingProfiler:
+    """Samples this process's thread stacks for one bounded window at a time."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_seconds: float = 60,
+        min_interval_ms: float = 5,
+        max_overhead: float = 0.02,
+        max_stacks: int = 20000,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_seconds = max_seconds
+        self.min_interval_ms = min_interval_ms
+        self.max_overhead = max_overhead
+        self.max_stacks = max_stacks
+        self._lock = threading.Lock()
+        self._running: str | None = None
+        self._seen: set[str] = set()
+        self._ignore_threads: set[int] = set()
+        self.watching = False
+
+    def clamp(self, seconds: float, interval_ms: float) -> tuple[float, float]:
+        return min(max(seconds, 0.1), self.max_seconds), max(interval_ms, self.min_interval_ms)
+
+    def request(self, seconds: float, interval_ms: float, scope: str = "worker") -> dict[str, Any]:
+        """
+        Start a profile. "worker" samples this process only; "all" also asks
+        every watching worker on this host. Returns the profile description.
+        """
+        seconds, interval_ms = self.clamp(seconds, interval_ms)
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        spec = {
+            "id": profile_id,
+            "scope": scope,
+            "seconds": seconds,
+            "interval_ms": interval_ms,
+            "requested_at": time.time(),
+            "requested_by": os.getpid(),
+        }
+        self._cleanup()
+        profile_dir = self.directory / profile_id
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        self._start(spec)
+        if scope == "all":
+            # Written last, once this worker already holds the profile, so its watcher skips it
+            _write_json(profile_dir / "request.json", spec)
+        return spec
+
+    def status(self, profile_id: str) -> dict[str, Any] | None:
+        profile_dir = self._profile_dir(profile_id)
+        if profile_dir is None:
+            return None
+        workers = {}
+        for path in sorted(profile_dir.glob("*.json")):
+            if path.name != "request.json":
+                workers[path.stem] = json.loads(path.read_text(encoding="utf-8"))
+        return {"id": profile_id, "workers": workers, "running": any(w["state"] == "running" for w in workers.values())}
+
+    def collapsed(self, profile_id: str, per_worker: bool = False) -> str | None:
+        """Merged collapsed stacks of the finished workers; per_worker prefixes each stack with its pid."""
+        profile_dir = self._profile_dir(profile_id)
+        if profile_dir is None:
+            return None
+        merged: Counter[str] = Counter()
+        for path in sorted(profile_dir.glob("*.collapsed")):
+            for line in path.read_text(encoding="utf-8").splitlines():
+                stack, _, count = line.rpartition(" ")
+                if stack and count.isdigit():
+                    merged[f"pid-{path.stem};{stack}" if per_worker else stack] += int(count)
+        return "".join(f"{stack} {count}\n" for stack, count in merged.most_common())
+
+    def watch(self, poll_seconds: float) -> None:
+        """Pick up "all"-scope requests from the shared directory; runs on its own thread."""
+        self._ignore_threads.add(threading.get_ident())
+        while True:
+            time.sleep(poll_seconds)
+            try:
+                self._poll()
+            except Exception as e:
+                logger.error(f"Profiler watcher failed: {e}")
+
+    # ---- Internal helpers
+
+    def _profile_dir(self, profile_id: str) -> Path | None:
+        # Ids come from URLs; only accept names this class generates
+        if not profile_id.replace("-", "").isalnum():
+            return None
+        profile_dir = self.directory / profile_id
+        return profile_dir if profile_dir.is_dir() else None
+
+    def _poll(self) -> None:
+        if not self.directory.is_dir():
+            return
+        now = time.time()
+        for request_path in self.directory.glob("*/request.json"):
+            profile_id = request_path.parent.name
+            if profile_id in self._seen:
+                continue
+            spec = json.loads(request_path.read_text(encoding="utf-8"))
+            self._seen.add(profile_id)
+            if now > spec["requested_at"] + spec["seconds"]:
+                # Window already over; joining late would profile a different moment
+                continue
+            try:
+                self._start(spec, seconds=spec["requested_at"] + spec["seconds"] - now)
+            except ProfileBusy:
+                _write_json(self._state_path(profile_id), {"state": "skipped", "reason": "busy"})
+
+    def _state_path(self, profile_id: str) -> Path:
+        return self.directory / profile_id / f"{os.getpid()}.json"
+
+    def _start(self, spec: dict[str, Any], seconds: float | None = None) -> None:
+        with self._lock:
+            if self._running is not None:
+                raise ProfileBusy(self._running)
+            self._running = spec["id"]
+            self._seen.add(spec["id"])
+        seconds, interval_ms = self.clamp(seconds or spec["seconds"], spec["interval_ms"])
+        _write_json(self._state_path(spec["id"]), {"state": "running", "started_at": time.time()})
+        thread = threading.Thread(
+            target=self._run, args=(spec["id"], seconds, interval_ms), name="sampling-profiler", daemon=True
+        )
+        thread.start()
+
+    def _run(self, profile_id: str, seconds: float, interval_ms: float) -> None:
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks: Counter[str] = Counter()
+        samples = 0
+        cost = 0.0
+        interval = interval_ms / 1000
+        started = time.perf_counter()
+        deadline = started + seconds
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                for ident, frame in sys._current_frames().items():
+                    if ident == me or ident in self._ignore_threads:
+                        continue
+                    if ident not in names:
+                        names = {t.ident: t.name for t in threading.enumerate()}
+                    stack = _collapse(frame, names.get(ident, str(ident)))
+                    if stack in stacks or len(stacks) < self.max_stacks:
+                        stacks[stack] += 1
+                    else:
+                        stacks[_OTHER] += 1
+                samples += 1
+                cost += time.perf_counter() - now
+                # Judged after a few samples; the first ones alone always look expensive
+                if samples >= 20 and cost > self.max_overhead * (time.perf_counter() - started) and interval < 1.0:
+                    interval = min(interval * 2, 1.0)
+                time.sleep(max(0.0, min(interval, deadline - time.perf_counter())))
+            elapsed = time.perf_counter() - started
+            path = self.directory / profile_id / f"{os.getpid()}.collapsed"
+            path.write_text("".join(f"{s} {n}\n" for s, n in stacks.most_common()), encoding="utf-8")
+            _write_json(self._state_path(profile_id), {
+                "state": "done",
+                "seconds": round(elapsed, 3),
+                "samples": samples,
+                "final_interval_ms": round(interval * 1000, 3),
+                "overhead": round(cost / elapsed, 5) if elapsed else 0.0,
+                "distinct_stacks": len(stacks),
+            })
+        except Exception as e:
+            logger.error(f"Sampling profile {profile_id} failed: {e}")
+            _write_json(self._state_path(profile_id), {"state": "failed", "error": str(e)})
+        finally:
+            with self._lock:
+                self._running = None
+
+    def _cleanup(self) -> None:
+        if not self.directory.is_dir():
+            return
+        cutoff = time.time() - _KEEP_SECONDS
+        for path in self.directory.iterdir():
+            if path.is_dir() and path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _collapse(frame, thread_name: str) -> str:
+    frames = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    if frame is not None:
+        frames.append("[truncated]")
+    frames.append(thread_name.replace(";", ":"))
+    return ";".join(reversed(frames))
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    """Path relative to the longest sys.path entry containing it (module-like, stable across hosts)."""
+    best = ""
+    for entry in sys.path:
+        entry = os.path.abspath(entry or ".")
+        if filename.startswith(entry + os.sep) and len(entry) > len(best):
+            best = entry
+    return filename[len(best) + 1:] if best else filename
+
+
+def _write_json(path: Path, data: dict[str, Any]) -> None:
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    tmp.replace(path)
+
+
+def init_sampling_profiler(app: Flask) -> SamplingProfiler:
+    profiler = SamplingProfiler(
+        app.config.get("PROFILER_DIR") or "instance/profiles",
+        max_seconds=float(app.config.get("PROFILER_MAX_SECONDS", 60)),
+        min_interval_ms=float(app.config.get("PROFILER_MIN_INTERVAL_MS", 5)),
+        max_overhead=float(app.config.get("PROFILER_MAX_OVERHEAD", 0.02)),
+        max_stacks=int(app.config.get("PROFILER_MAX_STACKS", 20000)),
+    )
+    if app.config.get("PROFILER_WATCH"):
+        poll_seconds = float(app.config.get("PROFILER_POLL_SECONDS") or 2)
+        profiler.watching = True
+        threading.Thread(target=profiler.watch, args=(poll_seconds,), name="profiler-watch", daemon=True).start()
+    app.extensions["sampling_profiler"] = profiler
+    return profiler
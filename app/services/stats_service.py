@@ -0,0 +1,333 @@
+"""
+Admin statistics served from memory.
+
+Lead counts are kept in lead_stat_buckets (leads per hour, intent, agent and
+status), incremented in the same transaction that records the leads, so no
+query ever counts the leads table on a dashboard poll. Catalog sizes (parts,
+vehicles) change in bulk imports and are recounted by the reconcile.
+
+Each process keeps a snapshot in memory and serves it with its as_of time. A
+background thread, started on first use, re-reads the small bucket table every
+STATS_REFRESH_SECONDS. Every STATS_RECONCILE_SECONDS one process, holding a
+lease row in stat_values, recounts the catalog and rebuilds the closed hourly
+buckets of the last STATS_BUCKET_DAYS from a GROUP BY over leads and
+leads_archive, so archived leads keep counting. That repairs any drift, e.g.
+from leads edited or deleted outside LeadService. Every
+STATS_FULL_RECONCILE_SECONDS (under a second lease) the rebuild covers all
+closed buckets instead: the first one after deploy backfills history into the
+initially empty bucket table, later ones repair status changes on older leads.
+The current and previous hour are left to the incremental counters, so the
+rebuild does not race live writes.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+from flask import Flask
+from sqlalchemy import case, delete, func, insert, literal_column, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models import Lead, LeadArchive, LeadStatBucket, Part, StatValue, Vehicle
+
+logger = logging.getLogger(__name__)
+
+_RECONCILE_LEASE = "reconcile_lease"
+_FULL_RECONCILE_LEASE = "full_reconcile_lease"
+
+
+def bucket_start(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def claim_lease(name: str, seconds: float) -> bool:
+    """
+    Take the stat_values row `name` as a lease if nobody took it within the
+    last `seconds`; lets one process out of many run a periodic job. Commits.
+    """
+    now = datetime.utcnow()
+    expired = now - timedelta(seconds=seconds)
+    claimed = db.session.execute(
+        update(StatValue).where(StatValue.name == name, StatValue.updated_at < expired).values(updated_at=now)
+    ).rowcount
+    if not claimed and db.session.get(StatValue, name) is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(StatValue(name=name, value=0, updated_at=now))
+            claimed = 1
+        except IntegrityError:
+            claimed = 0
+    db.session.commit()
+    return bool(claimed)
+
+
+def consume_quota(name: str, amount: int, limit: int, window_seconds: float) -> bool:
+    """
+    Add `amount` to the stat_values counter `name` unless that would take it
+    past `limit` in the current fixed window of `window_seconds`; the counter
+    restarts with each window. Shared by every process. Commits.
+    """
+    if amount > limit:
+        return False
+    now = datetime.utcnow()
+    window_start = now - timedelta(seconds=(now - datetime(1970, 1, 1)).total_seconds() % window_seconds)
+    expired = StatValue.updated_at < window_start
+    # value first: MySQL assigns left to right and the CASE must see the old updated_at
+    take = (
+        update(StatValue)
+        .where(StatValue.name == name, or_(expired, StatValue.value + amount <= limit))
+        .ordered_values(
+            (StatValue.value, case((expired, amount), else_=StatValue.value + amount)),
+            (StatValue.updated_at, window_start),
+        )
+    )
+    taken = db.session.execute(take).rowcount
+    if not taken and db.session.get(StatValue, name) is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(StatValue(name=name, value=amount, updated_at=window_start))
+            taken = 1
+        except IntegrityError:
+            # Another process created the counter in between
+            taken = db.session.execute(take).rowcount
+    db.session.commit()
+    return bool(taken)
+
+
+def bump_lead_buckets(leads: Iterable[Lead]) -> None:
+    """Add leads to their hourly buckets; call inside the transaction that inserts them."""
+    increments: dict[tuple[datetime, str, str, str], int] = defaultdict(int)
+    for lead in leads:
+        key = (bucket_start(lead.created_at), lead.intent or "", lead.assigned_agent or "", lead.status)
+        increments[key] += 1
+
+    table = LeadStatBucket.__table__
+    for (start, intent, agent, status), count in increments.items():
+        match = (
+            (table.c.bucket_start == start)
+            & (table.c.intent == intent)
+            & (table.c.agent == agent)
+            & (table.c.status == status)
+        )
+        if db.session.execute(update(table).where(match).values(count=table.c.count + count)).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(
+                    insert(table).values(bucket_start=start, intent=intent, agent=agent, status=status, count=count)
+                )
+        except IntegrityError:
+            # Another transaction created the bucket in between
+            db.session.execute(update(table).where(match).values(count=table.c.count + count))
+
+
+class StatsService:
+    """Per-process stats snapshot with background refresh and shared reconcile."""
+
+    def __init__(
+        self,
+        app: Flask,
+        refresh_seconds: float = 30,
+        reconcile_seconds: float = 900,
+        bucket_days: int = 7,
+        full_reconcile_seconds: float = 86400,
+    ) -> None:
+        self._app = app
+        self.refresh_seconds = refresh_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self.bucket_days = bucket_days
+        self.full_reconcile_seconds = full_reconcile_seconds
+        self._lock = threading.Lock()
+        self._snapshot: dict[str, Any] | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def snapshot(self) -> dict[str, Any]:
+        """Latest snapshot; the first call builds it synchronously and starts the refresher."""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._build(reconcile_due=True)
+                self._thread = threading.Thread(target=self._run, name="stats-refresh", daemon=True)
+                self._thread.start()
+            return self._snapshot
+
+    def summary(self) -> dict[str, Any]:
+        snap = self.snapshot()
+        by_status = snap["leads_by_status"]
+        return {
+            "total_parts": snap["total_parts"],
+            "total_vehicles": snap["total_vehicles"],
+            "total_leads": sum(by_status.values()),
+            "new_leads": by_status.get("new", 0),
+            "assigned_leads": by_status.get("assigned", 0),
+            "responded_leads": by_status.get("responded", 0),
+            "as_of": snap["as_of"].isoformat() + "Z",
+            "stale_seconds": round((datetime.utcnow() - snap["as_of"]).total_seconds(), 1),
+            "catalog_as_of": snap["catalog_as_of"].isoformat() + "Z" if snap["catalog_as_of"] else None,
+        }
+
+    def lead_buckets(self, hours: int = 24, bucket: str = "hour") -> list[dict[str, Any]]:
+        """Leads per hour (or day) over the last `hours`, split by intent and agent."""
+        snap = self.snapshot()
+        since = bucket_start(datetime.utcnow()) - timedelta(hours=max(hours, 1) - 1)
+        merged: dict[datetime, dict[str, Any]] = {}
+        for start, intent, agent, _status, count in snap["recent_buckets"]:
+            if start < since:
+                continue
+            key = start.replace(hour=0) if bucket == "day" else start
+            entry = merged.setdefault(key, {"total": 0, "by_intent": defaultdict(int), "by_agent": defaultdict(int)})
+            entry["total"] += count
+            entry["by_intent"][intent or "unknown"] += count
+            entry["by_agent"][agent or "unassigned"] += count
+        return [
+            {
+                "bucket_start": start.isoformat() + "Z",
+                "total": entry["total"],
+                "by_intent": dict(entry["by_intent"]),
+                "by_agent": dict(entry["by_agent"]),
+            }
+            for start, entry in sorted(merged.items())
+        ]
+
+    def close(self) -> None:
+        self._stop.set()
+
+    # ---- Internal helpers
+
+    def _run(self) -> None:
+        last_reconcile_check = time.monotonic()
+        while not self._stop.wait(self.refresh_seconds):
+            due = time.monotonic() - last_reconcile_check >= self.reconcile_seconds
+            if due:
+                last_reconcile_check = time.monotonic()
+            try:
+                snap = self._build(reconcile_due=due)
+            except Exception as e:
+                logger.error(f"Refreshing admin stats failed: {e}")
+                continue
+            with self._lock:
+                self._snapshot = snap
+
+    def _build(self, reconcile_due: bool) -> dict[str, Any]:
+        with self._app.app_context():
+            if reconcile_due and self._claim_reconcile():
+                self._reconcile(full=claim_lease(_FULL_RECONCILE_LEASE, self.full_reconcile_seconds))
+            table = LeadStatBucket.__table__
+            by_status = dict(
+                db.session.execute(select(table.c.status, func.sum(table.c.count)).group_by(table.c.status)).all()
+            )
+            since = bucket_start(datetime.utcnow()) - timedelta(days=self.bucket_days)
+            recent = [
+                tuple(row)
+                for row in db.session.execute(
+                    select(table.c.bucket_start, table.c.intent, table.c.agent, table.c.status, table.c.count)
+                    .where(table.c.bucket_start >= since)
+                )
+            ]
+            values = {
+                row.name: row for row in db.session.execute(select(StatValue.name, StatValue.value, StatValue.updated_at))
+            }
+            db.session.commit()
+
+        parts = values.get("total_parts")
+        vehicles = values.get("total_vehicles")
+        return {
+            "as_of": datetime.utcnow(),
+            "leads_by_status": {status: int(count or 0) for status, count in by_status.items()},
+            "recent_buckets": recent,
+            "total_parts": parts.value if parts else 0,
+            "total_vehicles": vehicles.value if vehicles else 0,
+            "catalog_as_of": parts.updated_at if parts else None,
+        }
+
+    def _claim_reconcile(self) -> bool:
+        return claim_lease(_RECONCILE_LEASE, self.reconcile_seconds)
+
+    def _reconcile(self, full: bool = False) -> None:
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        self._set_value("total_parts", db.session.scalar(select(func.count()).select_from(Part)) or 0, now)
+        self._set_value("total_vehicles", db.session.scalar(select(func.count()).select_from(Vehicle)) or 0, now)
+
+        # Closed buckets only; the live ones belong to the incremental counters
+        cutoff = bucket_start(now) - timedelta(hours=1)
+        window_start = None if full else bucket_start(now) - timedelta(days=self.bucket_days)
+        dialect = db.engine.dialect.name
+        merged: dict[tuple, int] = defaultdict(int)
+        for model in (Lead, LeadArchive):
+            query = select(
+                _hour_expr(dialect, model.created_at).label("bucket"),
+                func.coalesce(model.intent, ""),
+                func.coalesce(model.assigned_agent, ""),
+                model.status,
+                func.count(),
+            ).where(model.created_at < cutoff)
+            if window_start is not None:
+                query = query.where(model.created_at >= window_start)
+            rows = db.session.execute(
+                query.group_by(literal_column("bucket"), model.intent, model.assigned_agent, model.status)
+            )
+            for bucket, intent, agent, status, count in rows:
+                start = bucket if isinstance(bucket, datetime) else datetime.fromisoformat(str(bucket))
+                merged[(start, intent, agent, status)] += count
+
+        table = LeadStatBucket.__table__
+        stale = delete(table).where(table.c.bucket_start < cutoff)
+        if window_start is not None:
+            stale = stale.where(table.c.bucket_start >= window_start)
+        db.session.execute(stale)
+        if merged:
+            db.session.execute(
+                insert(table),
+                [
+                    {"bucket_start": start, "intent": intent, "agent": agent, "status": status, "count": count}
+                    for (start, intent, agent, status), count in merged.items()
+                ],
+            )
+        db.session.commit()
+        logger.info(
+            f"Admin stats reconciled{' (full)' if full else ''} in "
+            f"{time.perf_counter() - started:.2f}s ({len(merged)} buckets)"
+        )
+
+    @staticmethod
+    def _set_value(name: str, value: int, now: datetime) -> None:
+        stored = db.session.get(StatValue, name)
+        if stored is None:
+            db.session.add(StatValue(name=name, value=value, updated_at=now))
+        else:
+            stored.value = value
+            stored.updated_at = now
+
+
+def _hour_expr(dialect: str, column):
+    """A timestamp column truncated to the hour, per database."""
+    if dialect == "mysql":
+        return func.date_format(column, "%Y-%m-%d %H:00:00")
+    if dialect == "postgresql":
+        return func.date_trunc("hour", column)
+    return func.strftime("%Y-%m-%d %H:00:00", column)
+
+
+_service_lock = threading.Lock()
+
+
+def get_stats_service(app: Flask) -> StatsService:
+    """The app's StatsService, created on first use."""
+    with _service_lock:
+        service = app.extensions.get("stats_service")
+        if service is None:
+            service = StatsService(
+                app,
+                refresh_seconds=float(app.config.get("STATS_REFRESH_SECONDS", 30)),
+                reconcile_seconds=float(app.config.get("STATS_RECONCILE_SECONDS", 900)),
+                bucket_days=int(app.config.get("STATS_BUCKET_DAYS", 7)),
+                full_reconcile_seconds=float(app.config.get("STATS_FULL_RECONCILE_SECONDS", 86400)),
+            )
+            app.extensions["stats_service"] = service
+        return service
@@ -1,43 +1,190 @@
-# Utility service wrapping googletrans to detect languages and translate text.
+# Utility service wrapping deep-translator (Google backend) to detect languages and translate text.
 
 
 from __future__ import annotations
+import json
+import os
+import sqlite3
+import string
+import threading
+from collections import OrderedDict
 from functools import lru_cache
-from typing import Optional
-from googletrans import Translator
+from pathlib import Path
+from typing import Any, Optional
+from deep_translator import GoogleTranslator, single_detection
+from .language_detector import get_language_detector
+
+
+# Static reply fragments. Localized copies live in phrasebook.json, generated by
+# `python -m scripts.build_phrasebook`, so replies never hit the network for them.
+PHRASES: dict[str, str] = {
+    "greeting": "Hello! How can I help you find car parts today?",
+    "no_results": "Sorry, we couldn't find any parts matching your query. Please try again with different keywords.",
+    "found_parts": "Found {count} part(s):",
+    "part_line": "{name} - Part #{part_number}",
+    "price": " | Price: {price} AED",
+    "brand": " | Brand: {brand}",
+    "more_results": "... and {count} more. Please contact us for details.",
+    "chassis_not_found": "Sorry, we couldn't find vehicle information for this chassis number. Please verify the number and try again.",
+}
+
+PHRASEBOOK_PATH = Path(__file__).with_name("phrasebook.json")
+
+# Detections below this confidence fall back to English.
+DETECT_MIN_CONFIDENCE = 0.6
 
 
 class TranslationService:
-    """Lightweight wrapper to reuse a single Translator instance."""
+    """Lightweight wrapper reusing one translator per target language."""
 
-    def __init__(self) -> None:
-        self._translator = _get_translator()
+    def __init__(self, cache_path: str | None = None) -> None:
+        self._cache = _get_cache(cache_path or os.getenv("TRANSLATION_CACHE_PATH"))
 
     def detect_language(self, text: str) -> str:
-        """Return ISO language code detected for the given text."""
+        """
+        Return ISO language code detected for the given text.
+        Runs offline; low-confidence guesses (short or mixed Latin text such
+        as "toyota corolla alternator") default to English.
+        """
         if not text:
             return "en"
+        result = get_language_detector().detect(text)
+        if result.confidence < DETECT_MIN_CONFIDENCE:
+            return "en"
+        return result.language
+
+    def detect_language_remote(self, text: str) -> str:
+        """
+        Return the language detectlanguage.com reports (network call, needs
+        DETECT_LANGUAGE_API_KEY); kept for comparison.
+        """
+        api_key = os.getenv("DETECT_LANGUAGE_API_KEY")
+        if not text or not api_key:
+            return "en"
         try:
-            result = self._translator.detect(text)
-            if result and getattr(result, "lang", None):
-                return result.lang
+            language = single_detection(text, api_key=api_key)
+            if language:
+                return language
         except Exception:
             pass
         return "en"
 
     def translate(self, text: str, target_language: str) -> str:
-        """Translate text to the target language if needed."""
+        """Translate text to the target language if needed (cached per text and language)."""
         if not text or not target_language:
             return text
+        cached = self._cache.get(text, target_language)
+        if cached is not None:
+            return cached
         try:
-            result = self._translator.translate(text, dest=target_language)
-            if result and getattr(result, "text", None):
-                return result.text
+            translated = _get_translator(target_language).translate(text)
+            if translated:
+                # Failures fall through uncached so they are retried next time
+                self._cache.set(text, target_language, translated)
+                return translated
         except Exception:
             pass
         return text
 
+    def phrase(self, key: str, target_language: str, **values: Any) -> str:
+        """
+        Return a static phrase from PHRASES in the target language, formatted
+        with values. Uses the precomputed phrasebook first; languages missing
+        from it are translated once through the cache.
+        """
+        template = PHRASES[key]
+        language = (target_language or "en").lower()
+        if language.startswith("en"):
+            return template.format(**values)
+
+        localized = _get_phrasebook().get(language, {}).get(key)
+        if localized is None:
+            translated = self.translate(template, language)
+            # Only trust the translated template if its placeholders survived
+            if _placeholders(translated) == _placeholders(template):
+                localized = translated
+            else:
+                return self.translate(template.format(**values), language)
+        return localized.format(**values)
+
+
+class TranslationCache:
+    """
+    Two-level translation cache keyed on (text, target language): an in-process
+    LRU in front of an optional SQLite file shared by all workers on the host.
+    """
+
+    def __init__(self, path: str | None = None, maxsize: int = 4096) -> None:
+        self.maxsize = maxsize
+        self._memory: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " text TEXT NOT NULL, lang TEXT NOT NULL, translated TEXT NOT NULL,"
+                " PRIMARY KEY (text, lang))"
+            )
+
+    def get(self, text: str, language: str) -> str | None:
+        key = (text, language)
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                return value
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT translated FROM translations WHERE text = ? AND lang = ?", key
+            ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def set(self, text: str, language: str, translated: str) -> None:
+        key = (text, language)
+        self._remember(key, translated)
+        if self._db is not None:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO translations (text, lang, translated) VALUES (?, ?, ?)",
+                    (text, language, translated),
+                )
+
+    def _remember(self, key: tuple[str, str], value: str) -> None:
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+
+def _placeholders(template: str) -> set[str]:
+    try:
+        return {field for _, field, _, _ in string.Formatter().parse(template) if field}
+    except ValueError:
+        return {"<invalid>"}
+
+
+@lru_cache(maxsize=32)
+def _get_translator(target_language: str) -> GoogleTranslator:
+    return GoogleTranslator(source="auto", target=target_language)
+
+
+@lru_cache(maxsize=None)
+def _get_cache(path: Optional[str]) -> TranslationCache:
+    return TranslationCache(path)
+
 
 @lru_cache(maxsize=1)
-def _get_translator() -> Translator:
-    return Translator()
+def _get_phrasebook() -> dict[str, dict[str, str]]:
+    try:
+        with open(PHRASEBOOK_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
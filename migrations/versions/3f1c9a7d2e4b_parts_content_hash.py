@@ -0,0 +1,28 @@
+"""parts content hash and sync key index
+
+Revision ID: 3f1c9a7d2e4b
+Revises: b805b54ebc48
+Create Date: 2026-10-19 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2e4b'
+down_revision = 'b805b54ebc48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=40), nullable=True))
+        batch_op.create_index('ix_parts_sync_key', ['part_number', 'brand', 'vehicle_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('parts', schema=None) as batch_op:
+        batch_op.drop_index('ix_parts_sync_key')
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,37 @@
+"""agent lead counters and leads.assigned_agent index
+
+Revision ID: 8d2e6b1f4a90
+Revises: 3f1c9a7d2e4b
+Create Date: 2026-10-19 14:03:18.220541
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e6b1f4a90'
+down_revision = '3f1c9a7d2e4b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('agent_loads',
+    sa.Column('agent', sa.String(length=128), nullable=False),
+    sa.Column('lead_count', sa.Integer(), nullable=False),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.Column('available', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('agent')
+    )
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_leads_assigned_agent'), ['assigned_agent'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_leads_assigned_agent'))
+
+    op.drop_table('agent_loads')
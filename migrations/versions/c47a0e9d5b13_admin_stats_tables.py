@@ -0,0 +1,38 @@
+"""admin stats: lead buckets and stat values
+
+Revision ID: c47a0e9d5b13
+Revises: 8d2e6b1f4a90
+Create Date: 2026-10-19 16:40:02.918377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a0e9d5b13'
+down_revision = '8d2e6b1f4a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('lead_stat_buckets',
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('intent', sa.String(length=64), nullable=False),
+    sa.Column('agent', sa.String(length=128), nullable=False),
+    sa.Column('status', sa.String(length=32), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket_start', 'intent', 'agent', 'status')
+    )
+    op.create_table('stat_values',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('stat_values')
+    op.drop_table('lead_stat_buckets')
@@ -0,0 +1,56 @@
+"""lead access-pattern indexes and leads_archive
+
+Revision ID: e5a9c3f71d28
+Revises: c47a0e9d5b13
+Create Date: 2026-10-19 18:12:44.067315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c3f71d28'
+down_revision = 'c47a0e9d5b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('leads_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('whatsapp_user_id', sa.String(length=64), nullable=False),
+    sa.Column('user_locale', sa.String(length=16), nullable=True),
+    sa.Column('intent', sa.String(length=64), nullable=True),
+    sa.Column('query_text', sa.Text(), nullable=True),
+    sa.Column('assigned_agent', sa.String(length=128), nullable=True),
+    sa.Column('status', sa.String(length=32), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('leads_archive', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_leads_archive_created_at'), ['created_at'], unique=False)
+        batch_op.create_index(batch_op.f('ix_leads_archive_whatsapp_user_id'), ['whatsapp_user_id'], unique=False)
+
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.create_index('ix_leads_agent_status_created', ['assigned_agent', 'status', 'created_at'], unique=False)
+        batch_op.create_index('ix_leads_status_created', ['status', 'created_at'], unique=False)
+        batch_op.create_index('ix_leads_created_at', ['created_at'], unique=False)
+        # Leading column of ix_leads_agent_status_created
+        batch_op.drop_index('ix_leads_assigned_agent')
+
+
+def downgrade():
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.create_index('ix_leads_assigned_agent', ['assigned_agent'], unique=False)
+        batch_op.drop_index('ix_leads_created_at')
+        batch_op.drop_index('ix_leads_status_created')
+        batch_op.drop_index('ix_leads_agent_status_created')
+
+    with op.batch_alter_table('leads_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_leads_archive_whatsapp_user_id'))
+        batch_op.drop_index(batch_op.f('ix_leads_archive_created_at'))
+
+    op.drop_table('leads_archive')
@@ -0,0 +1,40 @@
+"""
+Move closed leads past the retention period to leads_archive, once.
+
+Uses the LEAD_RETENTION_DAYS / LEAD_ARCHIVE_* settings unless overridden.
+Meant for cron when the in-app job (LEAD_ARCHIVE_ENABLED) is off.
+
+Usage:
+  python -m scripts.archive_leads --dry-run
+  python -m scripts.archive_leads --days 180 --batch-size 5000 --max-batches 20
+"""
+import argparse
+import json
+from app import create_app
+from app.services.lead_retention import run_configured_archive
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, help="archive leads created more than this many days ago")
+    parser.add_argument("--statuses", nargs="*", help="closed statuses to archive")
+    parser.add_argument("--batch-size", type=int, help="leads moved per transaction")
+    parser.add_argument("--max-batches", type=int, help="stop after this many batches")
+    parser.add_argument("--dry-run", action="store_true", help="only count the leads that would move")
+    args = parser.parse_args()
+
+    app = create_app()
+    if args.days is not None:
+        app.config["LEAD_RETENTION_DAYS"] = args.days
+    if args.statuses:
+        app.config["LEAD_ARCHIVE_STATUSES"] = args.statuses
+    if args.batch_size:
+        app.config["LEAD_ARCHIVE_BATCH_SIZE"] = args.batch_size
+
+    with app.app_context():
+        result = run_configured_archive(dry_run=args.dry_run, max_batches=args.max_batches)
+    print(json.dumps({"dry_run": args.dry_run, **result.to_json()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compare catalog import modes on a synthetic supplier file.
+
+Generates a CSV (default 1M rows) and imports it once per mode into a scratch
+database, dropping and recreating all tables before each run. Never point
+--database-url at a database whose data you need.
+
+Usage:
+  python -m scripts.bench_import --rows 1000000
+  python -m scripts.bench_import --database-url mysql+pymysql://root:pw@127.0.0.1/carparts_bench
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+MAKES = {
+    "Toyota": ["Corolla", "Camry", "Land Cruiser", "Hilux", "Prado"],
+    "Nissan": ["Patrol", "Sunny", "Altima", "X-Trail"],
+    "Honda": ["Civic", "Accord", "CR-V"],
+    "Hyundai": ["Elantra", "Tucson", "Sonata"],
+    "Mitsubishi": ["Pajero", "Lancer"],
+}
+PARTS = ["Brake Pad", "Oil Filter", "Air Filter", "Alternator", "Radiator", "Headlight", "Shock Absorber", "Spark Plug"]
+BRANDS = ["Denso", "Bosch", "Aisin", "NGK", "KYB", "Valeo", ""]
+
+
+def generate_csv(path: str, rows: int, seed: int = 42) -> None:
+    rng = random.Random(seed)
+    makes = list(MAKES)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["part_number", "name", "brand", "price", "quantity_min", "make", "model", "year"])
+        for i in range(rows):
+            make = rng.choice(makes)
+            writer.writerow([
+                f"{rng.randint(10000, 99999)}-{i:07d}",
+                rng.choice(PARTS),
+                rng.choice(BRANDS),
+                f"{rng.uniform(5, 5000):.2f}" if rng.random() > 0.05 else "",
+                rng.choice(["1", "2", "4", ""]),
+                make,
+                rng.choice(MAKES[make]),
+                str(rng.randint(2005, 2024)),
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--modes", nargs="*", default=["insert", "parallel", "native"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument(
+        "--database-url",
+        help="scratch database (all tables are dropped); default: a temporary SQLite file",
+    )
+    parser.add_argument("--csv", help="reuse an existing synthetic CSV instead of generating one")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_import_")
+    # AppConfig reads DATABASE_URL at import time, so set it before importing the app
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from app import create_app
+    from app.extensions import db
+    from scripts.import_parts import import_csv
+
+    csv_path = args.csv or os.path.join(workdir, "parts.csv")
+    if not args.csv:
+        started = time.perf_counter()
+        generate_csv(csv_path, args.rows)
+        print(f"generated {args.rows} rows in {time.perf_counter() - started:.1f}s -> {csv_path}")
+
+    app = create_app()
+    results = []
+    for mode in args.modes:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+        started = time.perf_counter()
+        if mode == "parallel":
+            stats = import_csv(csv_path, workers=args.workers)
+        else:
+            stats = import_csv(csv_path, mode=mode)
+        elapsed = time.perf_counter() - started
+        results.append((mode, elapsed, stats.rows_read / elapsed if elapsed else 0.0, stats.parts_inserted))
+
+    print()
+    print(f"{'mode':<10} {'seconds':>10} {'rows/s':>12} {'parts':>10}")
+    for mode, elapsed, rate, parts in results:
+        print(f"{mode:<10} {elapsed:>10.1f} {rate:>12,.0f} {parts:>10}")
+
+
+if __name__ == "__main__":
+    main()
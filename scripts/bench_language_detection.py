@@ -0,0 +1,94 @@
+"""
+Benchmark the offline language detector against remote (detectlanguage.com) detection.
+
+Reports per-call latency (mean / p50 / p99) and accuracy on a labelled set of
+customer-style messages. The remote path needs network access and
+DETECT_LANGUAGE_API_KEY, and is only run with --remote.
+
+Usage:
+  python -m scripts.bench_language_detection --repeat 200 --remote
+"""
+import argparse
+import statistics
+import time
+from typing import Callable
+from app.services.translation_service import TranslationService
+
+
+# (message, expected language). Held out from the detector's seed text.
+SAMPLES: list[tuple[str, str]] = [
+    ("Hi, do you have a radiator for a 2015 Nissan Patrol?", "en"),
+    ("I want the price for rear brake discs", "en"),
+    ("Is the clutch kit available today?", "en"),
+    ("Can you send me a quote for four tyres", "en"),
+    ("Looking for a side mirror, left side please", "en"),
+    ("need engine mount for lexus lx570", "en"),
+    ("How long will delivery take to Sharjah?", "en"),
+    ("Toyota Corolla 2018 alternator", "en"),
+    ("04465-33450", "en"),
+    ("JTDBR32E520123456", "en"),
+    ("مرحبا، هل لديكم رديتر لنيسان باترول ٢٠١٥؟", "ar"),
+    ("أريد سعر أقراص الفرامل الخلفية", "ar"),
+    ("هل طقم الكلتش متوفر اليوم؟", "ar"),
+    ("ابحث عن فلتر زيت Toyota Camry", "ar"),
+    ("كم سعر المساعدات الأمامية", "ar"),
+    ("رقم الشاسيه JTDBR32E520123456", "ar"),
+    ("أحتاج مرآة جانبية يسار", "ar"),
+    ("كم يستغرق التوصيل إلى الشارقة؟", "ar"),
+    ("Bonjour, avez-vous un radiateur pour une Peugeot 308 ?", "fr"),
+    ("Je voudrais le prix des disques de frein arrière", "fr"),
+    ("Hola, ¿tienen un radiador para un Nissan Patrol?", "es"),
+    ("Quiero el precio de los discos de freno traseros", "es"),
+    ("Ich brauche einen Kühler für meinen Golf", "de"),
+    ("Haben Sie die Kupplung auf Lager?", "de"),
+    ("Preciso do preço dos discos de freio traseiros", "pt"),
+    ("Avete il radiatore per una Fiat Punto?", "it"),
+    ("Nissan Patrol için radyatör var mı?", "tr"),
+    ("Apakah radiator untuk Nissan Patrol tersedia?", "id"),
+    ("Нужен радиатор для Nissan Patrol", "ru"),
+    ("मुझे निसान पेट्रोल के लिए रेडिएटर चाहिए", "hi"),
+    ("مجھے نسان پیٹرول کے لیے ریڈی ایٹر چاہیے", "ur"),
+]
+
+
+def run(name: str, detect: Callable[[str], str], repeat: int) -> None:
+    latencies: list[float] = []
+    correct = 0
+    routed = 0
+    for text, expected in SAMPLES:
+        detected = "en"
+        for _ in range(repeat):
+            start = time.perf_counter()
+            detected = detect(text)
+            latencies.append(time.perf_counter() - start)
+        correct += detected == expected
+        # What the fallback flow actually needs: Arabic vs everything else
+        routed += (detected == "ar") == (expected == "ar")
+        if detected != expected:
+            print(f"  [{name}] {text!r}: expected {expected}, got {detected}")
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:<12} mean {statistics.mean(latencies) * 1e6:10.1f} us"
+        f"  p50 {statistics.median(latencies) * 1e6:10.1f} us"
+        f"  p99 {p99 * 1e6:10.1f} us"
+        f"  accuracy {correct}/{len(SAMPLES)}"
+        f"  ar-routing {routed}/{len(SAMPLES)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200, help="calls per sample (local)")
+    parser.add_argument("--remote", action="store_true", help="also benchmark remote detection (network)")
+    args = parser.parse_args()
+
+    service = TranslationService()
+    run("local", service.detect_language, args.repeat)
+    if args.remote:
+        run("remote", service.detect_language_remote, 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Show how hot-table lead queries behave as lead history grows, with and
+without the retention job.
+
+Simulates --rounds periods of --days-per-round days, each adding
+--leads-per-day leads, in a scratch database. In the "archive" mode the
+retention job runs after every round (simulated clock), in "keep" mode
+nothing is archived. After each round it times the queries the app runs on
+leads. With archiving, the hot table and the query times level off once the
+retention period is reached. Without it, both keep growing.
+
+The status mix ages like production: most leads end up responded or
+assigned (closed, archivable), a few stay new and are never archived.
+All tables are dropped first; never point --database-url at data you need.
+
+Usage:
+  python -m scripts.bench_leads
+  python -m scripts.bench_leads --rounds 8 --leads-per-day 5000 --retention-days 60
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+AGENTS = ["agent1", "agent2", "agent3", "agent4", "agent5"]
+INTENTS = ["part_number", "chassis", "car_part", "greeting", "unknown"]
+STATUSES = [("responded", 0.85), ("assigned", 0.12), ("new", 0.03)]
+
+
+def generate_day(rng: random.Random, day: datetime, count: int, first_id: int) -> list[dict]:
+    rows = []
+    for i in range(count):
+        status = rng.choices([s for s, _ in STATUSES], [w for _, w in STATUSES])[0]
+        created = day + timedelta(seconds=rng.randint(0, 86399))
+        rows.append({
+            "id": first_id + i,
+            "whatsapp_user_id": f"9715{rng.randint(0, 99_999_999):08d}",
+            "intent": rng.choice(INTENTS),
+            "query_text": "brake pads for corolla 2018",
+            "assigned_agent": None if status == "new" else rng.choice(AGENTS),
+            "status": status,
+            "created_at": created,
+            "updated_at": created,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--days-per-round", type=int, default=30)
+    parser.add_argument("--leads-per-day", type=int, default=2000)
+    parser.add_argument("--retention-days", type=int, default=90)
+    parser.add_argument("--statuses", nargs="*", default=["responded", "assigned"], help="statuses archived")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query (median reported)")
+    parser.add_argument("--modes", nargs="*", default=["keep", "archive"])
+    parser.add_argument(
+        "--database-url",
+        help="scratch database (all tables are dropped); default: a temporary SQLite file",
+    )
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_leads_")
+    # AppConfig reads DATABASE_URL at import time, so set it before importing the app
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import func, insert, select
+    from app import create_app
+    from app.extensions import db
+    from app.models import Lead, LeadArchive
+    from app.services.lead_retention import archive_leads
+
+    def queries(now: datetime) -> dict:
+        week_ago = now - timedelta(days=7)
+        return {
+            # LeadService._lead_counts / rebuild_agent_loads
+            "agent_counts": select(Lead.assigned_agent, func.count())
+            .where(Lead.assigned_agent.is_not(None)).group_by(Lead.assigned_agent),
+            # An agent's open leads, newest first
+            "agent_open": select(Lead.id).where(Lead.assigned_agent == "agent1", Lead.status == "assigned")
+            .order_by(Lead.created_at.desc()).limit(50),
+            # Unassigned leads this week
+            "new_this_week": select(func.count()).select_from(Lead)
+            .where(Lead.status == "new", Lead.created_at >= week_ago),
+            # Stats reconcile window
+            "stats_window": select(Lead.intent, Lead.assigned_agent, Lead.status, func.count())
+            .where(Lead.created_at >= week_ago, Lead.created_at < now)
+            .group_by(Lead.intent, Lead.assigned_agent, Lead.status),
+        }
+
+    app = create_app()
+    total_days = args.rounds * args.days_per_round
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=total_days)
+    results = []
+    for mode in args.modes:
+        rng = random.Random(42)
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            next_id = 1
+            for round_no in range(args.rounds):
+                for d in range(args.days_per_round):
+                    day = start + timedelta(days=round_no * args.days_per_round + d)
+                    rows = generate_day(rng, day, args.leads_per_day, next_id)
+                    next_id += len(rows)
+                    db.session.execute(insert(Lead.__table__), rows)
+                db.session.commit()
+                now = start + timedelta(days=(round_no + 1) * args.days_per_round)
+
+                archive_seconds = 0.0
+                if mode == "archive":
+                    result = archive_leads(
+                        args.retention_days, args.statuses, batch_size=args.batch_size, now=now
+                    )
+                    archive_seconds = result.seconds
+
+                timings = {}
+                for name, query in queries(now).items():
+                    runs = []
+                    for _ in range(args.repeat):
+                        started = time.perf_counter()
+                        db.session.execute(query).all()
+                        runs.append((time.perf_counter() - started) * 1000)
+                    timings[name] = statistics.median(runs)
+                db.session.rollback()
+                hot = db.session.scalar(select(func.count()).select_from(Lead))
+                archived = db.session.scalar(select(func.count()).select_from(LeadArchive))
+                results.append((mode, (round_no + 1) * args.days_per_round, next_id - 1, hot, archived,
+                                archive_seconds, timings))
+
+    names = list(results[0][6]) if results else []
+    print()
+    print(f"{'mode':<8} {'day':>5} {'leads':>10} {'hot':>10} {'archived':>10} {'archive s':>10} "
+          + " ".join(f"{n + ' ms':>16}" for n in names))
+    for mode, day, total, hot, archived, archive_seconds, timings in results:
+        print(f"{mode:<8} {day:>5} {total:>10} {hot:>10} {archived:>10} {archive_seconds:>10.2f} "
+              + " ".join(f"{timings[n]:>16.2f}" for n in names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Pre-translate the static reply phrases into app/services/phrasebook.json.
+
+The WhatsApp fallback replies are assembled from the fixed fragments in
+PHRASES (app/services/translation_service.py); translating them ahead of time
+keeps the translation API off the hot path. Existing entries (e.g.
+hand-reviewed Arabic) are kept unless --refresh is given.
+
+Usage:
+  python -m scripts.build_phrasebook --languages ar fr ur hi ru
+"""
+import argparse
+import json
+import os
+from app.services.translation_service import (
+    PHRASEBOOK_PATH,
+    PHRASES,
+    TranslationService,
+    _placeholders,
+)
+
+
+def build_phrasebook(languages: list[str], refresh: bool = False) -> dict[str, dict[str, str]]:
+    try:
+        with open(PHRASEBOOK_PATH, encoding="utf-8") as f:
+            phrasebook: dict[str, dict[str, str]] = json.load(f)
+    except (OSError, ValueError):
+        phrasebook = {}
+
+    service = TranslationService()
+    for language in languages:
+        language = language.strip().lower()
+        if not language or language.startswith("en"):
+            continue
+        entries = phrasebook.setdefault(language, {})
+        for key, template in PHRASES.items():
+            if key in entries and not refresh:
+                continue
+            translated = service.translate(template, language)
+            if translated == template or _placeholders(translated) != _placeholders(template):
+                print(f"[{language}] skipped {key!r}: translation failed or mangled placeholders")
+                continue
+            entries[key] = translated
+            print(f"[{language}] {key}: {translated}")
+
+    with open(PHRASEBOOK_PATH, "w", encoding="utf-8") as f:
+        json.dump(phrasebook, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    return phrasebook
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--languages",
+        nargs="*",
+        default=(os.getenv("TRANSLATION_LANGUAGES") or "ar").split(","),
+    )
+    parser.add_argument("--refresh", action="store_true", help="re-translate existing entries")
+    args = parser.parse_args()
+    build_phrasebook(args.languages, refresh=args.refresh)
+    print(f"Wrote {PHRASEBOOK_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,17 +7,170 @@ Usage (Windows CMD):
   set PN_BASE_URL=https://login.partsnumber.com
   set OUTPUT_CSV=F:\\Car-Parts-Bot\\data\\parts_pn.csv
   python -m scripts.extract_partsnumber --mode makes --makes Toyota --models Corolla --years 2018
+  python -m scripts.extract_partsnumber --mode makes --makes Toyota Nissan --years 2018 2019 --workers 4
+  python -m scripts.extract_partsnumber --mode makes --makes Toyota Nissan --years 2018 2019 --resume
+  python -m scripts.extract_partsnumber --mode makes --makes Toyota --years 2018 --sink csv --sink db
+
+Try it against the local fixture site first: python -m scripts.pn_fixture_server
 
 First time only:
   python -m playwright install chromium
 """
 import os
-import csv
+import json
 import time
+import queue
+import random
+import sqlite3
 import argparse
+import threading
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 from playwright.sync_api import sync_playwright, BrowserContext
+from scripts.extract_sinks import CsvSink, RowSink, open_sink
+
+# Saved login (cookies/localStorage), reused by later runs and by parallel workers
+STATE_PATH = ".pn_state.json"
+
+# Readiness waits: give up after WAIT_TIMEOUT_MS; the network counts as settled
+# once no document/XHR/fetch request has been in flight for QUIET_MS.
+WAIT_TIMEOUT_MS = 15000
+QUIET_MS = 150
+_POLL_MS = 25
+
+
+class CrawlProfile:
+    """Where crawl time goes: every readiness wait and each combination's total time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits: List[Tuple[Optional[Tuple[str, str, str]], str, float, bool]] = []
+        self._totals: dict = {}
+
+    def record(self, combination, label: str, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self._waits.append((combination, label, seconds, timed_out))
+
+    def finish(self, combination, seconds: float) -> None:
+        with self._lock:
+            self._totals[combination] = seconds
+
+    def report(self, top: int = 10) -> str:
+        with self._lock:
+            waits = list(self._waits)
+            totals = dict(self._totals)
+
+        crawl_time = sum(totals.values())
+        wait_time = sum(seconds for combination, _, seconds, _ in waits if combination is not None)
+        share = f" ({wait_time / crawl_time:.0%})" if crawl_time else ""
+        lines = [
+            f"Crawl profile: {len(totals)} combinations, {crawl_time:.1f}s searching, "
+            f"{wait_time:.1f}s{share} of it waiting for the page",
+            f"{'wait':<24} {'count':>6} {'total s':>9} {'mean ms':>9} {'p95 ms':>9} {'timeouts':>9}",
+        ]
+        by_label: dict = {}
+        for combination, label, seconds, timed_out in waits:
+            if combination is None:
+                label = f"{label} (setup)"
+            by_label.setdefault(label, []).append((seconds, timed_out))
+        for label, samples in sorted(by_label.items(), key=lambda item: -sum(s for s, _ in item[1])):
+            durations = sorted(seconds for seconds, _ in samples)
+            p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+            lines.append(
+                f"{label:<24} {len(durations):>6} {sum(durations):>9.2f} "
+                f"{sum(durations) / len(durations) * 1000:>9.0f} {p95 * 1000:>9.0f} "
+                f"{sum(1 for _, timed_out in samples if timed_out):>9}"
+            )
+
+        if totals:
+            lines.append(f"Slowest combinations (top {min(top, len(totals))}):")
+            for combination, seconds in sorted(totals.items(), key=lambda item: -item[1])[:top]:
+                own = [(label, secs) for c, label, secs, _ in waits if c == combination]
+                slowest = max(own, key=lambda item: item[1], default=None)
+                detail = f"waits {sum(secs for _, secs in own):.2f}s"
+                if slowest:
+                    detail += f", slowest {slowest[0]} {slowest[1]:.2f}s"
+                lines.append(f"  {' / '.join(c for c in combination if c) or '(all)':<32} {seconds:>7.2f}s  ({detail})")
+        return "\n".join(lines)
+
+
+class Readiness:
+    """
+    Waits for a page to actually be ready instead of sleeping a fixed time, and
+    records how long each wait took in an optional CrawlProfile.
+    In-flight document/XHR/fetch requests are tracked per page, so "network
+    quiet" means this page's own traffic has settled; images, fonts and
+    analytics beacons do not hold it up the way networkidle does.
+    """
+
+    _TRACKED_TYPES = ("document", "xhr", "fetch")
+
+    def __init__(self, page, profile: CrawlProfile | None = None):
+        self.page = page
+        self.profile = profile
+        self.combination: Optional[Tuple[str, str, str]] = None
+        self._pending: set = set()
+        self._last_activity = time.monotonic()
+        page.on("request", self._on_request)
+        page.on("requestfinished", self._on_done)
+        page.on("requestfailed", self._on_done)
+
+    def _on_request(self, request) -> None:
+        if request.resource_type not in self._TRACKED_TYPES:
+            return
+        if request.redirected_from is not None:
+            self._pending.discard(request.redirected_from)
+        self._pending.add(request)
+        self._last_activity = time.monotonic()
+
+    def _on_done(self, request) -> None:
+        if request in self._pending:
+            self._pending.discard(request)
+            self._last_activity = time.monotonic()
+
+    def network_quiet(self, label: str, quiet_ms: int = QUIET_MS, timeout_ms: int = WAIT_TIMEOUT_MS) -> bool:
+        """Wait until no tracked request has been in flight for quiet_ms."""
+        started = time.monotonic()
+        # The action before this wait may not have reported its request yet
+        self._last_activity = max(self._last_activity, started)
+        deadline = started + timeout_ms / 1000
+        while True:
+            now = time.monotonic()
+            if not self._pending and now - self._last_activity >= quiet_ms / 1000:
+                return self._record(label, started, True)
+            if now >= deadline:
+                return self._record(label, started, False)
+            # Short sleeps inside Playwright also let it deliver request events
+            self.page.wait_for_timeout(_POLL_MS)
+
+    def load_state(self, label: str, state: str = "domcontentloaded", timeout_ms: int = WAIT_TIMEOUT_MS) -> bool:
+        started = time.monotonic()
+        try:
+            self.page.wait_for_load_state(state, timeout=timeout_ms)
+            return self._record(label, started, True)
+        except Exception:
+            return self._record(label, started, False)
+
+    def selector(self, label: str, selector: str, timeout_ms: int = WAIT_TIMEOUT_MS) -> bool:
+        started = time.monotonic()
+        try:
+            self.page.wait_for_selector(selector, state="attached", timeout=timeout_ms)
+            return self._record(label, started, True)
+        except Exception:
+            return self._record(label, started, False)
+
+    def function(self, label: str, expression: str, arg=None, timeout_ms: int = WAIT_TIMEOUT_MS) -> bool:
+        started = time.monotonic()
+        try:
+            self.page.wait_for_function(expression, arg=arg, timeout=timeout_ms)
+            return self._record(label, started, True)
+        except Exception:
+            return self._record(label, started, False)
+
+    def _record(self, label: str, started: float, ok: bool) -> bool:
+        if self.profile is not None:
+            self.profile.record(self.combination, label, time.monotonic() - started, not ok)
+        return ok
 
 
 def login_and_get_context(pw, headless: bool = True) -> BrowserContext:
@@ -28,15 +181,16 @@ def login_and_get_context(pw, headless: bool = True) -> BrowserContext:
         raise RuntimeError("PN_USERNAME and PN_PASSWORD must be set in environment")
 
     browser = pw.chromium.launch(headless=headless)
-    context = browser.new_context(storage_state=".pn_state.json" if Path(".pn_state.json").exists() else None)
+    context = browser.new_context(storage_state=STATE_PATH if Path(STATE_PATH).exists() else None)
     page = context.new_page()
+    ready = Readiness(page)
     page.goto(base_url, wait_until="load")
 
     # Try to detect and fill login form with retries (handle redirects)
     for _ in range(3):
         try:
-            # Wait briefly for either dashboard or login inputs
-            page.wait_for_timeout(600)
+            # Let client-side redirects settle before looking for the form
+            ready.network_quiet("login:page")
             # Prefer explicit IDs seen in DOM: #username and #password
             login_user = page.locator("#username, input[name='username'], input[type='text']").first
             login_pass = page.locator("#password, input[type='password']").first
@@ -54,8 +208,8 @@ def login_and_get_context(pw, headless: bool = True) -> BrowserContext:
                     btn.click()
                 else:
                     login_pass.press("Enter")
-                page.wait_for_load_state("networkidle")
-                time.sleep(800/1000)
+                ready.network_quiet("login:submit")
+                ready.load_state("login:load", "load")
                 break
             else:
                 # Maybe already signed in
@@ -65,43 +219,149 @@ def login_and_get_context(pw, headless: bool = True) -> BrowserContext:
             continue
 
     # Save session for next runs
-    context.storage_state(path=".pn_state.json")
+    context.storage_state(path=STATE_PATH)
     return context
 
 
 def write_rows(output_csv: str, rows: List[dict]):
-    Path(output_csv).parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = [
-        "part_number",
-        "name",
-        "brand",
-        "price",
-        "quantity_min",
-        "make",
-        "model",
-        "year",
+    CsvSink(output_csv).write(rows)
+
+
+# Declarative selector map for a result listing. "rows" are tried in order
+# until one matches; each field is a CSS selector list evaluated inside a row;
+# "next" is the pagination control. Override per site with --layout file.json.
+DEFAULT_LAYOUT = {
+    "rows": ["table tbody tr", ".result, .part-item, .card, [data-testid='result-card']"],
+    "fields": {
+        "name": ".name, .title, [data-field='name']",
+        "part_number": ".sku, .part-number, [data-field='partNumber']",
+        "brand": ".brand, [data-field='brand']",
+        "price": ".price, [data-field='price'], td:has(.currency)",
+        "quantity_min": ".quantity, .qty, [data-field='minQty']",
+    },
+    "next": "a[rel='next'], .pagination .next:not(.disabled) a, button[aria-label*='next' i]:not([disabled])",
+    "max_rows": 100,
+    "max_pages": 10,
+}
+
+# Runs in the page: read every row of the current listing in one call and,
+# if asked, click through to the next page before returning.
+_EXTRACT_JS = """
+(layout) => {
+  const text = (el) => (el ? el.textContent : "").replace(/\\s+/g, " ").trim();
+  const query = (root, selector, all) => {
+    try {
+      return all ? Array.from(root.querySelectorAll(selector)) : root.querySelector(selector);
+    } catch (e) {
+      return all ? [] : null;  // invalid selector in a custom layout
+    }
+  };
+  let rows = [];
+  for (const selector of layout.rows) {
+    rows = query(document, selector, true);
+    if (rows.length) break;
+  }
+  const records = rows.slice(0, layout.max_rows).map((row) => {
+    const record = {};
+    for (const [field, selector] of Object.entries(layout.fields)) {
+      record[field] = text(query(row, selector, false));
+    }
+    return record;
+  });
+  let advanced = false;
+  if (layout.advance && layout.next) {
+    const next = query(document, layout.next, false);
+    if (next && !next.disabled && next.getAttribute("aria-disabled") !== "true") {
+      next.click();
+      advanced = true;
+    }
+  }
+  return {rows: records, signature: rows.length ? text(rows[0]) : "", advanced};
+}
+"""
+
+# True once the listing no longer starts with the row seen before paging.
+_PAGE_CHANGED_JS = """
+({rows, signature}) => {
+  for (const selector of rows) {
+    let first = null;
+    try { first = document.querySelector(selector); } catch (e) {}
+    if (first) return first.textContent.replace(/\\s+/g, " ").trim() !== signature;
+  }
+  return false;
+}
+"""
+
+
+def load_layout(path: str | None) -> dict:
+    """DEFAULT_LAYOUT with the overrides from a JSON file (fields are merged, not replaced)."""
+    layout = dict(DEFAULT_LAYOUT, fields=dict(DEFAULT_LAYOUT["fields"]))
+    if not path:
+        return layout
+    with open(path, encoding="utf-8") as f:
+        overrides = json.load(f)
+    layout["fields"].update(overrides.pop("fields", {}))
+    layout.update(overrides)
+    if isinstance(layout["rows"], str):
+        layout["rows"] = [layout["rows"]]
+    return layout
+
+
+def scrape_results(page, layout: dict | None = None, ready: Readiness | None = None) -> List[dict]:
+    """
+    Read the current result listing with one page.evaluate per results page,
+    following the layout's "next" control for up to max_pages pages.
+    """
+    ready = ready or Readiness(page)
+    layout = layout or DEFAULT_LAYOUT
+    records: List[dict] = []
+    max_pages = max(1, int(layout.get("max_pages", 1)))
+    for page_no in range(max_pages):
+        result = page.evaluate(_EXTRACT_JS, {**layout, "advance": page_no + 1 < max_pages})
+        records.extend(result["rows"])
+        if not result["advanced"]:
+            break
+        # Works for both client-side paging and full navigations
+        changed = ready.function(
+            "next-page", _PAGE_CHANGED_JS, arg={"rows": layout["rows"], "signature": result["signature"]}
+        )
+        if not changed:
+            break
+    return records
+
+
+def _result_rows(records: List[dict], make: str, model: str, year: str) -> List[dict]:
+    """Scraped records as output rows; unknown layout fields are dropped."""
+    return [
+        {
+            "part_number": r.get("part_number", ""),
+            "name": r.get("name", ""),
+            "brand": r.get("brand", ""),
+            "price": r.get("price", ""),
+            "quantity_min": r.get("quantity_min", ""),
+            "make": make or "",
+            "model": model or "",
+            "year": year or "",
+        }
+        for r in records
     ]
-    exists = Path(output_csv).exists()
-    with open(output_csv, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        if not exists:
-            w.writeheader()
-        for r in rows:
-            w.writerow(r)
 
 
-def extract_by_search(page, query: str) -> List[dict]:
+def extract_by_search(
+    page, query: str, layout: dict | None = None, ready: Readiness | None = None
+) -> List[dict]:
     """Example: type a part name into the search and collect top results.
     Note: Selectors likely need to be adjusted for real markup.
     """
     rows: List[dict] = []
+    ready = ready or Readiness(page)
     # Ensure we are on a page that exposes a global search; try clicking nav if needed
     nav_try = page.locator("a:has-text('Search'), a:has-text('Catalog'), a:has-text('Parts')").first
     if nav_try.count() > 0:
         try:
             nav_try.click()
-            page.wait_for_load_state("networkidle")
-            page.wait_for_timeout(500)
+            ready.network_quiet("search:open")
+            ready.load_state("search:open-load")
         except Exception:
             pass
 
@@ -115,46 +375,28 @@ def extract_by_search(page, query: str) -> List[dict]:
     ]
     search_box = page.locator(", ".join(search_selectors)).first
     if search_box.count() == 0:
-        try:
-            page.wait_for_selector(", ".join(search_selectors), timeout=15000)
-            search_box = page.locator(", ".join(search_selectors)).first
-        except Exception:
+        if not ready.selector("search:box", ", ".join(search_selectors)):
             # Try focusing the page and typing CTRL/ to focus global search if site supports
             try:
                 page.keyboard.press("Control+K")
-                page.wait_for_timeout(500)
-                search_box = page.locator(", ".join(search_selectors)).first
+                ready.selector("search:box-hotkey", ", ".join(search_selectors), timeout_ms=2000)
             except Exception:
                 pass
+        search_box = page.locator(", ".join(search_selectors)).first
     if search_box.count() == 0:
         return rows
     search_box.click()
     search_box.fill(query)
     search_box.press("Enter")
-    page.wait_for_load_state("networkidle")
-    time.sleep(1)
-
-    # Collect items - adjust selectors to match real results list
-    items = page.locator(".result, .part-item, .card, [data-testid='result-card']").all()
-    for it in items[:50]:
-        name = it.locator(".name, .title").first.text_content() or ""
-        part_number = it.locator(".sku, .part-number").first.text_content() or ""
-        brand = it.locator(".brand").first.text_content() or ""
-        price = it.locator(".price").first.text_content() or ""
-        rows.append({
-            "part_number": part_number.strip(),
-            "name": name.strip(),
-            "brand": brand.strip(),
-            "price": price.strip(),
-            "quantity_min": "",
-            "make": "",
-            "model": "",
-            "year": "",
-        })
-    return rows
+    ready.network_quiet("search:results")
+    ready.load_state("search:results-load")
+
+    # Search results are a card list by default; a custom layout decides for itself
+    layout = layout or dict(DEFAULT_LAYOUT, rows=DEFAULT_LAYOUT["rows"][1:], max_rows=50, max_pages=1)
+    return _result_rows(scrape_results(page, layout, ready), "", "", "")
 
 
-def _select_dropdown_value(page, label_texts: List[str], value: str) -> bool:
+def _select_dropdown_value(page, label_texts: List[str], value: str, ready: Readiness) -> bool:
     """
     Attempt to select a value in a dropdown associated with any of the given labels.
     Tries common patterns: label + select, aria-label, role=combobox, data attributes.
@@ -164,6 +406,7 @@ def _select_dropdown_value(page, label_texts: List[str], value: str) -> bool:
         return True
     # Normalize search text
     value_norm = value.strip().lower()
+    wait_label = f"select:{label_texts[0].lower()}"
     # 1) Try <label>Text</label><select> pattern
     for label_text in label_texts:
         label = page.locator(f"label:has-text('{label_text}')").first
@@ -186,8 +429,8 @@ def _select_dropdown_value(page, label_texts: List[str], value: str) -> bool:
                         if txt.lower() == value_norm:
                             sel.select_option(index=i)
                             break
-                page.wait_for_load_state("networkidle")
-                page.wait_for_timeout(300)
+                # Dependent dropdowns usually reload their options over XHR
+                ready.network_quiet(wait_label)
                 return True
     # 2) Try aria-label/select[name]
     for label_text in label_texts:
@@ -203,8 +446,7 @@ def _select_dropdown_value(page, label_texts: List[str], value: str) -> bool:
                     if txt.lower() == value_norm:
                         sel.select_option(index=i)
                         break
-            page.wait_for_load_state("networkidle")
-            page.wait_for_timeout(300)
+            ready.network_quiet(wait_label)
             return True
     # 3) Try comboboxes
     for label_text in label_texts:
@@ -214,8 +456,7 @@ def _select_dropdown_value(page, label_texts: List[str], value: str) -> bool:
             # Type to filter and press Enter
             page.keyboard.type(value)
             page.keyboard.press("Enter")
-            page.wait_for_load_state("networkidle")
-            page.wait_for_timeout(300)
+            ready.network_quiet(wait_label)
             return True
     # 4) Inputs with datalist
     for label_text in label_texts:
@@ -223,85 +464,399 @@ def _select_dropdown_value(page, label_texts: List[str], value: str) -> bool:
         if input_el.count() > 0:
             input_el.fill(value)
             page.keyboard.press("Enter")
-            page.wait_for_load_state("networkidle")
-            page.wait_for_timeout(300)
+            ready.network_quiet(wait_label)
             return True
     return False
 
 
-def extract_by_make_model_years(page, makes: List[str], models: List[str], years: List[str]) -> List[dict]:
+# Keys that catalog JSON payloads use for each output column, most specific first
+_JSON_FIELDS = {
+    "part_number": ("partNumber", "part_number", "partNo", "pn", "sku", "oem"),
+    "name": ("name", "title", "partName", "description"),
+    "brand": ("brand", "brandName", "manufacturer", "maker"),
+    "price": ("price", "unitPrice", "amount", "cost"),
+    "quantity_min": ("minQty", "quantity_min", "minQuantity", "moq", "qty", "quantity"),
+}
+# Too generic on their own (order numbers, country codes, ...); only read on records that also carry a brand or price
+_GENERIC_PART_NUMBER_KEYS = ("number", "code")
+_MAX_RESULT_ROWS = 100
+
+
+class ResponseCapture:
     """
-    Navigate Make/Model/Year filters, then scrape results.
-    Since exact selectors may differ, this function tries several reasonable patterns.
+    Remembers the JSON XHR/fetch responses a page receives so search results
+    can be read from the site's own payload instead of the rendered DOM.
+    Bodies are only read when rows() looks for results, newest first.
     """
-    rows: List[dict] = []
-    # Ensure we are on a page that has filters/search
-    page.wait_for_load_state("domcontentloaded")
-    page.wait_for_timeout(600)
+
+    def __init__(self, page, url_hint: str | None = None):
+        self._url_hint = url_hint
+        self._responses: list = []
+        page.on("response", self._on_response)
+
+    def _on_response(self, response) -> None:
+        if response.request.resource_type not in ("xhr", "fetch"):
+            return
+        if "json" not in (response.headers.get("content-type") or ""):
+            return
+        if self._url_hint and self._url_hint not in response.url:
+            return
+        self._responses.append(response)
+
+    def clear(self) -> None:
+        self._responses.clear()
+
+    def rows(self, make: str, model: str, year: str) -> Optional[List[dict]]:
+        """Rows from the latest payload that holds part records, or None if none was seen."""
+        for response in reversed(self._responses):
+            try:
+                payload = response.json()
+            except Exception:
+                continue
+            records = _find_part_records(payload)
+            if records is not None:
+                return [_row_from_record(r, make, model, year) for r in records[:_MAX_RESULT_ROWS]]
+        return None
+
+
+def _find_part_records(payload) -> Optional[list]:
+    """Breadth-first search for the first list of objects that carry a part number."""
+    pending = [payload]
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, list):
+            dicts = [item for item in node if isinstance(item, dict)]
+            if dicts and any(_part_number(d) for d in dicts[:5]):
+                return dicts
+            pending.extend(item for item in node if isinstance(item, (list, dict)))
+        elif isinstance(node, dict):
+            pending.extend(v for v in node.values() if isinstance(v, (list, dict)))
+    return None
+
+
+def _json_value(record: dict, field: str) -> str:
+    return _first_value(record, _JSON_FIELDS[field])
+
+
+def _part_number(record: dict) -> str:
+    value = _json_value(record, "part_number")
+    if not value and (_json_value(record, "brand") or _json_value(record, "price")):
+        value = _first_value(record, _GENERIC_PART_NUMBER_KEYS)
+    return value
+
+
+def _first_value(record: dict, keys: Tuple[str, ...]) -> str:
+    for key in keys:
+        value = record.get(key)
+        if isinstance(value, dict):
+            # e.g. {"brand": {"id": 3, "name": "Denso"}}
+            value = value.get("name") or value.get("title")
+        if value not in (None, ""):
+            return str(value).strip()
+    return ""
+
+
+def _row_from_record(record: dict, make: str, model: str, year: str) -> dict:
+    row = {field: _json_value(record, field) for field in _JSON_FIELDS}
+    row["part_number"] = _part_number(record)
+    row.update({"make": make or "", "model": model or "", "year": year or ""})
+    return row
+
+
+def _open_catalog(page, ready: Readiness) -> None:
+    """Get onto a page that has the make/model/year filters."""
+    ready.load_state("catalog:load")
+    ready.network_quiet("catalog:settle")
 
     # If site has a dedicated MMY page, try common nav anchors
     possible_nav = page.locator("a:has-text('Catalog'), a:has-text('Parts'), a:has-text('Search')").first
     if possible_nav.count() > 0:
         try:
             possible_nav.click()
-            page.wait_for_load_state("networkidle")
-            page.wait_for_timeout(400)
+            ready.network_quiet("catalog:open")
+            ready.load_state("catalog:open-load")
         except Exception:
             pass
 
-    # Iterate combinations; if some list is empty, use [''] to no-op that level
-    makes_list = makes or [""]
-    models_list = models or [""]
-    years_list = years or [""]
-
-    for make in makes_list:
-        _select_dropdown_value(page, ["Make", "Brand", "Manufacturer"], make)
-        for model in models_list:
-            _select_dropdown_value(page, ["Model"], model)
-            for year in years_list:
-                _select_dropdown_value(page, ["Year", "Production Year"], year)
-
-                # Trigger search if there is a button
-                search_btn = page.locator("button:has-text('Search'), button:has-text('Find'), button[type='submit']").first
-                if search_btn.count() > 0:
-                    try:
-                        search_btn.click()
-                    except Exception:
-                        pass
 
-                page.wait_for_load_state("networkidle")
-                page.wait_for_timeout(600)
+def extract_combination(
+    page,
+    make: str,
+    model: str,
+    year: str,
+    selected: dict | None = None,
+    capture: ResponseCapture | None = None,
+    layout: dict | None = None,
+    ready: Readiness | None = None,
+) -> List[dict]:
+    """
+    Select one make/model/year combination, search, and read the results.
+    selected remembers the page's current dropdown values so unchanged levels
+    are not re-selected (selecting a make usually reloads the model list).
+    With a capture, rows come from the search's JSON response; the DOM is only
+    scraped when no such payload was seen. Pass the page's Readiness to reuse
+    its request tracking and to profile the waits under this combination.
+    """
+    ready = ready or Readiness(page)
+    ready.combination = (make, model, year)
+    started = time.monotonic()
+    try:
+        return _search_combination(page, make, model, year, selected, capture, layout, ready)
+    finally:
+        if ready.profile is not None:
+            ready.profile.finish(ready.combination, time.monotonic() - started)
+        ready.combination = None
+
+
+def _search_combination(page, make, model, year, selected, capture, layout, ready: Readiness) -> List[dict]:
+    selected = selected if selected is not None else {}
+    if selected.get("make") != make:
+        _select_dropdown_value(page, ["Make", "Brand", "Manufacturer"], make, ready)
+        selected.clear()
+        selected["make"] = make
+    if selected.get("model") != model:
+        _select_dropdown_value(page, ["Model"], model, ready)
+        selected.pop("year", None)
+        selected["model"] = model
+    if selected.get("year") != year:
+        _select_dropdown_value(page, ["Year", "Production Year"], year, ready)
+        selected["year"] = year
+
+    if capture is not None:
+        # Dropdown lookups are not results; only keep what the search itself loads
+        capture.clear()
+
+    # Trigger search if there is a button
+    search_btn = page.locator("button:has-text('Search'), button:has-text('Find'), button[type='submit']").first
+    if search_btn.count() > 0:
+        try:
+            search_btn.click()
+        except Exception:
+            pass
 
-                # Collect results - try table and card/grid patterns
-                # 1) Table rows
-                result_rows = page.locator("table tbody tr")
-                if result_rows.count() == 0:
-                    # 2) Cards
-                    result_rows = page.locator(".result, .part-item, .card, [data-testid='result-card']")
+    ready.network_quiet("search")
+    if capture is not None:
+        rows = capture.rows(make, model, year)
+        if rows is not None:
+            return rows
+    # A form submit navigates; make sure the results document is parsed
+    ready.load_state("search:dom")
+    records = scrape_results(page, layout, ready)
+    return _result_rows(records, make, model, year)
 
-                count = min(100, result_rows.count())
-                for i in range(count):
-                    it = result_rows.nth(i)
-                    # Try various selectors within a row/card
-                    name = (it.locator(".name, .title, [data-field='name']").first.text_content() or "").strip()
-                    part_number = (it.locator(".sku, .part-number, [data-field='partNumber'], td:has-text('#')").first.text_content() or "").strip()
-                    brand = (it.locator(".brand, [data-field='brand']").first.text_content() or "").strip()
-                    price = (it.locator(".price, [data-field='price'], td:has(.currency)").first.text_content() or "").strip()
-                    qty = (it.locator(".quantity, .qty, [data-field='minQty']").first.text_content() or "").strip()
-
-                    rows.append({
-                        "part_number": part_number,
-                        "name": name,
-                        "brand": brand,
-                        "price": price,
-                        "quantity_min": qty,
-                        "make": make or "",
-                        "model": model or "",
-                        "year": year or "",
-                    })
+
+class CrawlLedger:
+    """
+    SQLite record of a make/model/year sweep: finished combinations and the
+    part keys already written, so a crashed crawl can --resume without redoing
+    work or appending duplicate rows to the output.
+
+    record() writes a combination's new rows and marks it done inside one
+    ledger transaction, committed only after the rows are written. A crash in
+    between redoes that one combination on resume (its rows may then appear
+    twice); a crash anywhere else loses nothing and duplicates nothing.
+    """
+
+    def __init__(self, path: str, reset: bool = False):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly in record()
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS combinations ("
+            " make TEXT, model TEXT, year TEXT, rows INTEGER, finished_at REAL,"
+            " PRIMARY KEY (make, model, year)) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS part_keys ("
+            " part TEXT, brand TEXT, make TEXT, model TEXT, year TEXT,"
+            " PRIMARY KEY (part, brand, make, model, year)) WITHOUT ROWID"
+        )
+        if reset:
+            self._conn.execute("DELETE FROM combinations")
+            self._conn.execute("DELETE FROM part_keys")
+
+    def done(self) -> set:
+        return {tuple(r) for r in self._conn.execute("SELECT make, model, year FROM combinations")}
+
+    def record(self, combination: Tuple[str, str, str], rows: List[dict], write) -> int:
+        """Pass the combination's unseen rows to write(rows), then mark it done; returns rows written."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            new_rows = []
+            for row in rows:
+                cur = self._conn.execute("INSERT OR IGNORE INTO part_keys VALUES (?, ?, ?, ?, ?)", _part_key(row))
+                if cur.rowcount:
+                    new_rows.append(row)
+            if new_rows:
+                write(new_rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO combinations VALUES (?, ?, ?, ?, ?)",
+                (*combination, len(new_rows), time.time()),
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return len(new_rows)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _part_key(row: dict) -> Tuple[str, str, str, str, str]:
+    # Rows without a part number are told apart by name so they do not collapse into one
+    part = (row.get("part_number") or "").strip().casefold() or f"name:{(row.get('name') or '').strip().casefold()}"
+    return (
+        part,
+        (row.get("brand") or "").strip().casefold(),
+        row.get("make") or "",
+        row.get("model") or "",
+        row.get("year") or "",
+    )
+
+
+def iter_combinations(makes: List[str], models: List[str], years: List[str]) -> Iterator[Tuple[str, str, str]]:
+    """Make x model x year in crawl order; an empty list no-ops that level."""
+    for make in makes or [""]:
+        for model in models or [""]:
+            for year in years or [""]:
+                yield make, model, year
+
+
+def extract_by_make_model_years(
+    page,
+    makes: List[str],
+    models: List[str],
+    years: List[str],
+    source: str = "auto",
+    xhr_match: str | None = None,
+    layout: dict | None = None,
+    profile: CrawlProfile | None = None,
+) -> List[dict]:
+    """
+    Navigate Make/Model/Year filters, then collect results.
+    source="auto" reads the search's JSON response and falls back to the DOM;
+    source="dom" always scrapes the rendered results.
+    Since exact selectors may differ, this function tries several reasonable patterns.
+    """
+    rows: List[dict] = []
+    combinations = list(iter_combinations(makes, models, years))
+    for _, combination_rows, error in iter_combination_results(
+        page, combinations, source, xhr_match, layout, profile
+    ):
+        if error is not None:
+            raise error
+        rows.extend(combination_rows)
     return rows
 
 
+def iter_combination_results(
+    page,
+    combinations: List[Tuple[str, str, str]],
+    source: str = "auto",
+    xhr_match: str | None = None,
+    layout: dict | None = None,
+    profile: CrawlProfile | None = None,
+) -> Iterator[Tuple[Tuple[str, str, str], Optional[List[dict]], Optional[Exception]]]:
+    """
+    Crawl combinations one after another on a single page, yielding
+    (combination, rows, error) as each finishes, like run_worker_pool.
+    """
+    capture = ResponseCapture(page, xhr_match) if source == "auto" else None
+    ready = Readiness(page, profile)
+    # Ensure we are on a page that has filters/search
+    _open_catalog(page, ready)
+
+    selected: dict = {}
+    for combination in combinations:
+        try:
+            yield combination, extract_combination(page, *combination, selected, capture, layout, ready), None
+        except Exception as exc:
+            # Page state is unknown after a failure; re-select every level next time
+            selected.clear()
+            yield combination, None, exc
+
+
+_DONE = object()
+
+
+def run_worker_pool(
+    combinations: List[Tuple[str, str, str]],
+    workers: int,
+    headless: bool = True,
+    min_interval: float = 2.0,
+    source: str = "auto",
+    xhr_match: str | None = None,
+    layout: dict | None = None,
+    profile: CrawlProfile | None = None,
+) -> Iterator[Tuple[Tuple[str, str, str], Optional[List[dict]], Optional[Exception]]]:
+    """
+    Crawl combinations with N browser contexts that share the saved login
+    (.pn_state.json). Each worker thread runs its own Playwright instance and
+    pulls combinations from a shared queue, starting at most one every
+    min_interval seconds (plus jitter) so the site sees a polite request rate.
+    Yields (combination, rows, error) in completion order.
+    """
+    base_url = os.getenv("PN_BASE_URL", "https://login.partsnumber.com")
+    work: "queue.Queue[Tuple[str, str, str]]" = queue.Queue()
+    for combination in combinations:
+        work.put(combination)
+    results: "queue.Queue" = queue.Queue()
+
+    def worker(index: int) -> None:
+        try:
+            with sync_playwright() as pw:
+                browser = pw.chromium.launch(headless=headless)
+                context = browser.new_context(storage_state=STATE_PATH if Path(STATE_PATH).exists() else None)
+                page = context.new_page()
+                capture = ResponseCapture(page, xhr_match) if source == "auto" else None
+                ready = Readiness(page, profile)
+                page.goto(base_url, wait_until="domcontentloaded")
+                _open_catalog(page, ready)
+                selected: dict = {}
+                last_start = 0.0
+                while True:
+                    try:
+                        combination = work.get_nowait()
+                    except queue.Empty:
+                        break
+                    delay = min_interval - (time.monotonic() - last_start)
+                    if delay > 0:
+                        time.sleep(delay + random.uniform(0, min_interval / 4))
+                    last_start = time.monotonic()
+                    try:
+                        rows = extract_combination(page, *combination, selected, capture, layout, ready)
+                        results.put((combination, rows, None))
+                    except Exception as exc:
+                        # Page state is unknown after a failure; re-select every level next time
+                        selected.clear()
+                        results.put((combination, None, exc))
+                context.close()
+                browser.close()
+        except Exception as exc:
+            print(f"worker {index} stopped: {exc}")
+        finally:
+            results.put(_DONE)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+    running = len(threads)
+    while running:
+        item = results.get()
+        if item is _DONE:
+            running -= 1
+            continue
+        yield item
+    for t in threads:
+        t.join()
+
+    # Anything left means every worker died; report it rather than dropping it silently
+    while not work.empty():
+        yield work.get_nowait(), None, RuntimeError("no worker left to process combination")
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--mode", choices=["search", "makes"], default="search")
@@ -311,36 +866,101 @@ def main():
     parser.add_argument("--years", nargs="*", default=[])
     parser.add_argument("--output", default=os.getenv("OUTPUT_CSV", "data/parts_pn.csv"))
     parser.add_argument("--headful", action="store_true")
+    parser.add_argument("--workers", type=int, default=1, help="parallel browser contexts (makes mode)")
+    parser.add_argument("--min-interval", type=float, default=2.0, help="seconds between searches per worker")
+    parser.add_argument(
+        "--source",
+        choices=["auto", "dom"],
+        default="auto",
+        help="auto: read results from the site's JSON responses, scraping the DOM only when none is seen",
+    )
+    parser.add_argument("--xhr-match", help="only consider JSON responses whose URL contains this text")
+    parser.add_argument("--layout", help="JSON file overriding DEFAULT_LAYOUT selectors for DOM scraping")
+    parser.add_argument("--profile", action="store_true", help="print where crawl time went (waits per combination)")
+    parser.add_argument("--ledger", help="crawl ledger for makes mode (default: <output>.ledger.sqlite3)")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip combinations the ledger marks done and rows already written (otherwise the ledger is reset)",
+    )
+    parser.add_argument(
+        "--sink",
+        action="append",
+        choices=["csv", "ndjson", "db"],
+        help="where rows go, repeatable (default: csv to --output); db upserts into parts/vehicles as it crawls",
+    )
+    parser.add_argument("--ndjson-output", help="NDJSON path for --sink ndjson (default: --output with .ndjson)")
+    parser.add_argument("--db-batch-size", type=int, default=500, help="rows per insert/update chunk for --sink db")
     args = parser.parse_args()
-
+    layout = load_layout(args.layout) if args.layout else None
+    profile = CrawlProfile() if args.profile else None
+    sink = open_sink(args.sink or ["csv"], args.output, args.ndjson_output, args.db_batch_size)
+    try:
+        _run(args, layout, profile, sink)
+    finally:
+        sink.close()
+    if profile is not None:
+        print(profile.report())
+
+
+def _run(args, layout: dict | None, profile: CrawlProfile | None, sink: RowSink) -> None:
     with sync_playwright() as pw:
         context = login_and_get_context(pw, headless=not args.headful)
-        page = context.new_page()
-        page.goto(os.getenv("PN_BASE_URL", "https://login.partsnumber.com"), wait_until="domcontentloaded")
-
-        all_rows: List[dict] = []
         if args.mode == "search":
-            all_rows.extend(extract_by_search(page, args.query))
+            page = context.new_page()
+            page.goto(os.getenv("PN_BASE_URL", "https://login.partsnumber.com"), wait_until="domcontentloaded")
+            rows = extract_by_search(page, args.query, layout, Readiness(page, profile))
+            context.close()
+            if rows:
+                sink.write(rows)
+                print(f"Wrote {len(rows)} rows")
+            else:
+                print("No rows extracted. Adjust selectors or queries.")
         else:
-            all_rows.extend(
-                extract_by_make_model_years(
-                    page=page,
-                    makes=args.makes,
-                    models=args.models,
-                    years=args.years,
+            ledger = CrawlLedger(args.ledger or f"{args.output}.ledger.sqlite3", reset=not args.resume)
+            combinations = list(iter_combinations(args.makes, args.models, args.years))
+            done = ledger.done() if args.resume else set()
+            pending = [c for c in combinations if c not in done]
+            if args.resume:
+                print(f"Resuming: {len(combinations) - len(pending)} combinations done, {len(pending)} to go")
+
+            if args.workers > 1:
+                # Login state is now in .pn_state.json; the workers open their own contexts
+                context.close()
+                results = run_worker_pool(
+                    pending,
+                    args.workers,
+                    not args.headful,
+                    args.min_interval,
+                    args.source,
+                    args.xhr_match,
+                    layout,
+                    profile,
                 )
-            )
-
-        if all_rows:
-            write_rows(args.output, all_rows)
-            print(f"Wrote {len(all_rows)} rows to {args.output}")
-        else:
-            print("No rows extracted. Adjust selectors or queries.")
-
-        context.close()
-
-
-if __name__ == "__main__":
-    main()
-
-
+            else:
+                page = context.new_page()
+                page.goto(os.getenv("PN_BASE_URL", "https://login.partsnumber.com"), wait_until="domcontentloaded")
+                results = iter_combination_results(page, pending, args.source, args.xhr_match, layout, profile)
+            try:
+                _stream_results(results, ledger, sink, len(pending))
+            finally:
+                ledger.close()
+                if args.workers <= 1:
+                    context.close()
+
+
+def _stream_results(results, ledger: CrawlLedger, sink: RowSink, total: int) -> None:
+    """Hand each finished combination's new rows to the sink and record it in the ledger."""
+    written = failed = 0
+    for combination, rows, error in results:
+        label = " / ".join(c for c in combination if c) or "(all)"
+        if error is not None:
+            failed += 1
+            print(f"{label}: failed ({error})")
+            continue
+        new_rows = ledger.record(combination, rows, sink.write)
+        written += new_rows
+        print(f"{label}: {len(rows)} rows, {new_rows} new")
+    if failed:
+        print(f"{failed} of {total} combinations failed; rerun with --resume to retry them")
+    print(f"Wrote {written} rows")
@@ -0,0 +1,136 @@
+"""
+Output sinks for the PartsNumber extractor.
+
+Every sink takes batches of extracted rows (the CSV columns below) through
+write(rows) and is finished with close(). The extractor calls write() once per
+finished make/model/year combination, before the crawl ledger marks that
+combination done, so each sink makes a batch durable before write() returns.
+
+  csv     append to a CSV file (header written once)
+  ndjson  append one JSON object per line
+  db      upsert into parts/vehicles through the catalog importer's sync mode,
+          one transaction per batch, so scraped parts are searchable right away
+"""
+import csv
+import json
+import re
+from pathlib import Path
+from typing import List
+
+FIELDNAMES = [
+    "part_number",
+    "name",
+    "brand",
+    "price",
+    "quantity_min",
+    "make",
+    "model",
+    "year",
+]
+
+_NUMBER_RE = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+class RowSink:
+    def write(self, rows: List[dict]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class CsvSink(RowSink):
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, rows: List[dict]) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        exists = Path(self.path).exists()
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=FIELDNAMES, extrasaction="ignore")
+            if not exists:
+                w.writeheader()
+            w.writerows(rows)
+
+
+class NdjsonSink(RowSink):
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, rows: List[dict]) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps({k: row.get(k, "") for k in FIELDNAMES}, ensure_ascii=False))
+                f.write("\n")
+
+
+class DatabaseSink(RowSink):
+    """
+    Upserts rows into the catalog while the crawl runs. Uses the importer's
+    SyncImporter, so a part already stored for the same vehicle is updated
+    only when its name, price or minimum quantity changed, and new vehicles
+    are created on first sight.
+    """
+
+    def __init__(self, batch_size: int = 500):
+        # Imported here so CSV/NDJSON crawls do not need the app and its settings
+        from app import create_app
+        from scripts.import_parts import ImportStats, SyncImporter, normalize_row
+
+        self._normalize_row = normalize_row
+        self._app_context = create_app().app_context()
+        self._app_context.push()
+        self.stats = ImportStats()
+        self._importer = SyncImporter(chunk_size=batch_size, commit_every=batch_size, stats=self.stats)
+
+    def write(self, rows: List[dict]) -> None:
+        for row in rows:
+            self.stats.rows_read += 1
+            record, reject = self._normalize_row({**row, "price": _clean_number(row.get("price"))})
+            if record is None:
+                self.stats.rejects[reject] += 1
+                continue
+            self._importer.add(record)
+        # Commit per batch: the ledger treats a returned write() as stored
+        self._importer.close()
+
+    def close(self) -> None:
+        try:
+            print(self.stats.summary())
+        finally:
+            self._app_context.pop()
+
+
+class MultiSink(RowSink):
+    def __init__(self, sinks: List[RowSink]):
+        self.sinks = sinks
+
+    def write(self, rows: List[dict]) -> None:
+        for sink in self.sinks:
+            sink.write(rows)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+def _clean_number(value) -> str:
+    """'AED 1,234.50' -> '1234.50'; scraped prices carry currency labels and separators."""
+    match = _NUMBER_RE.search(str(value or ""))
+    return match.group(0).replace(",", "") if match else ""
+
+
+def open_sink(names: List[str], output_csv: str, output_ndjson: str | None = None, db_batch_size: int = 500) -> RowSink:
+    """Build the sink(s) selected on the command line."""
+    sinks: List[RowSink] = []
+    for name in dict.fromkeys(names):
+        if name == "csv":
+            sinks.append(CsvSink(output_csv))
+        elif name == "ndjson":
+            sinks.append(NdjsonSink(output_ndjson or str(Path(output_csv).with_suffix(".ndjson"))))
+        elif name == "db":
+            sinks.append(DatabaseSink(db_batch_size))
+        else:
+            raise ValueError(f"unknown sink: {name}")
+    return sinks[0] if len(sinks) == 1 else MultiSink(sinks)
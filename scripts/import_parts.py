@@ -1,70 +1,726 @@
+"""
+Catalog CSV import.
+
+Rows are streamed from the CSV and written with multi-row INSERTs in chunks,
+so memory stays constant regardless of file size. Vehicles are resolved through
+an in-memory (make, model, year) -> id map loaded once at start-up.
+
+Modes:
+  insert  append every row (initial load)
+  sync    upsert by (part_number, brand, vehicle): insert new parts, update the
+          ones whose content hash changed, leave the rest untouched; --retire
+          also deletes stored parts of the file's brands that the file no
+          longer lists
+  native  append via the database's own loader: rows are normalized into a
+          tab-separated staging file, loaded into a staging table with
+          LOAD DATA LOCAL INFILE on MySQL (multi-row INSERTs elsewhere), then
+          merged into vehicles and parts with set-based SQL
+
+With --workers N the file is split into byte ranges aligned to line starts,
+parsed and validated in a process pool, and written in file order by the single
+writer in this process. After each range is committed its end offset is saved
+to a checkpoint file, so --resume continues after the last committed range.
+Ranges are cut at newlines, so quoted fields must not contain line breaks.
+
+Usage:
+  set PARTS_CSV=path/to/your/parts.csv
+  python -m scripts.import_parts
+  python -m scripts.import_parts data/parts.csv --chunk-size 5000 --commit-every 50000
+  python -m scripts.import_parts data/weekly.csv --mode sync --retire
+  python -m scripts.import_parts data/huge.csv --workers 8 --resume
+  python -m scripts.import_parts data/huge.csv --mode native
+"""
+import argparse
+import bisect
 import csv
+import hashlib
+import io
+import json
 import os
-from decimal import Decimal
+import tempfile
+import time
+import uuid
+from array import array
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterable
+from sqlalchemy import (
+    Column, Integer, MetaData, Numeric, String, Table,
+    bindparam, create_engine, delete, func, insert, select, text, update,
+)
 from app import create_app
 from app.extensions import db
 from app.models import Part, Vehicle
 
 
-def import_csv(file_path: str) -> None:
-    app = create_app()
-    with app.app_context():
-        with open(file_path, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                make = (row.get("make") or row.get("car_make") or "").strip()
-                model = (row.get("model") or row.get("car_model") or "").strip()
-                year = (row.get("year") or "").strip()
-                part_number = (row.get("part_number") or row.get("sku") or "").strip()
-                name = (row.get("name") or row.get("part_name") or "").strip()
-                brand = (row.get("brand") or "").strip()
-                price_str = (row.get("price") or "").strip()
-                qty_min_str = (row.get("quantity_min") or row.get("qty_min") or "").strip()
-
-                if not part_number or not name:
-                    continue
-
-                vehicle = None
-                if make or model or year:
-                    vehicle = (
-                        db.session.query(Vehicle)
-                        .filter_by(make=make, model=model, year=year or None)
-                        .first()
-                    )
-                    if not vehicle:
-                        vehicle = Vehicle(make=make, model=model, year=year or None)
-                        db.session.add(vehicle)
-                        db.session.flush()
-
-                price = None
-                if price_str:
-                    try:
-                        price = Decimal(price_str)
-                    except Exception:
-                        price = None
-
-                qty_min = None
-                if qty_min_str:
-                    try:
-                        qty_min = int(qty_min_str)
-                    except Exception:
-                        qty_min = None
-
-                part = Part(
-                    part_number=part_number,
-                    name=name,
-                    brand=brand or None,
-                    price=price,
-                    quantity_min=qty_min,
-                    vehicle_id=vehicle.id if vehicle else None,
+# Column limits from the models; longer values would be rejected by MySQL strict mode
+_MAX_LENGTHS = {
+    "part_number": Part.__table__.c.part_number.type.length,
+    "name": Part.__table__.c.name.type.length,
+    "brand": Part.__table__.c.brand.type.length,
+    "make": Vehicle.__table__.c.make.type.length,
+    "model": Vehicle.__table__.c.model.type.length,
+    "year": Vehicle.__table__.c.year.type.length,
+}
+
+
+def normalize_row(row: dict[str, Any]) -> tuple[dict[str, Any] | None, str | None]:
+    """
+    Map a CSV row (several header spellings accepted) to a clean record.
+    Returns (record, None) or (None, reject_reason).
+    """
+    make = (row.get("make") or row.get("car_make") or "").strip()
+    model = (row.get("model") or row.get("car_model") or "").strip()
+    year = (row.get("year") or "").strip()
+    part_number = (row.get("part_number") or row.get("sku") or "").strip()
+    name = (row.get("name") or row.get("part_name") or "").strip()
+    brand = (row.get("brand") or "").strip()
+    price_str = (row.get("price") or "").strip()
+    qty_min_str = (row.get("quantity_min") or row.get("qty_min") or "").strip()
+
+    if not part_number:
+        return None, "missing_part_number"
+    if not name:
+        return None, "missing_name"
+
+    record = {
+        "make": make,
+        "model": model,
+        "year": year or None,
+        "part_number": part_number,
+        "name": name,
+        "brand": brand or None,
+        "price": None,
+        "quantity_min": None,
+    }
+    for field, limit in _MAX_LENGTHS.items():
+        value = record[field]
+        if value and limit and len(value) > limit:
+            return None, f"{field}_too_long"
+
+    if price_str:
+        try:
+            record["price"] = Decimal(price_str)
+        except InvalidOperation:
+            record["price"] = None
+
+    if qty_min_str:
+        try:
+            record["quantity_min"] = int(qty_min_str)
+        except ValueError:
+            record["quantity_min"] = None
+
+    return record, None
+
+
+def content_hash(name: str, price: Decimal | None, quantity_min: int | None) -> str:
+    """Hash of the fields a supplier refresh may change; price at column precision."""
+    price_text = f"{Decimal(price):.2f}" if price is not None else ""
+    qty_text = str(quantity_min) if quantity_min is not None else ""
+    return hashlib.sha1(f"{name}\x1f{price_text}\x1f{qty_text}".encode("utf-8")).hexdigest()
+
+
+def vehicle_key(make: str, model: str, year: str | None) -> tuple[str, str, str]:
+    # Case-insensitive like the default MySQL collation the original per-row lookup relied on
+    return (make.casefold(), model.casefold(), (year or "").casefold())
+
+
+class ImportStats:
+    """Running counters for an import, printed as throughput lines."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.rows_read = 0
+        self.parts_inserted = 0
+        self.parts_updated = 0
+        self.parts_unchanged = 0
+        self.parts_retired = 0
+        self.vehicles_inserted = 0
+        self.rejects: Counter[str] = Counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        lines = [
+            f"rows read:          {self.rows_read}",
+            f"parts inserted:     {self.parts_inserted}",
+            f"parts updated:      {self.parts_updated}",
+            f"parts unchanged:    {self.parts_unchanged}",
+            f"parts retired:      {self.parts_retired}",
+            f"vehicles inserted:  {self.vehicles_inserted}",
+            f"rejected:           {sum(self.rejects.values())}",
+        ]
+        for reason, count in self.rejects.most_common():
+            lines.append(f"  {reason}: {count}")
+        lines.append(f"elapsed:            {self.elapsed:.1f}s ({self.rows_per_second():,.0f} rows/s)")
+        return "\n".join(lines)
+
+
+class BulkImporter:
+    """
+    Chunked writer for normalized records. Parts are buffered and inserted with
+    one executemany per chunk; the transaction is committed every commit_every
+    rows. New vehicles (rare next to parts) are inserted as they are first seen.
+    """
+
+    def __init__(self, chunk_size: int = 5000, commit_every: int = 50000, stats: ImportStats | None = None) -> None:
+        self.chunk_size = chunk_size
+        self.commit_every = max(commit_every, chunk_size)
+        self.stats = stats or ImportStats()
+        self._vehicle_ids: dict[tuple[str, str, str], int] = {}
+        self._buffer: list[dict[str, Any]] = []
+        self._uncommitted = 0
+        self._load_vehicle_ids()
+
+    def _load_vehicle_ids(self) -> None:
+        rows = db.session.execute(
+            select(Vehicle.id, Vehicle.make, Vehicle.model, Vehicle.year).order_by(Vehicle.id)
+        )
+        for vehicle_id, make, model, year in rows:
+            self._vehicle_ids.setdefault(vehicle_key(make, model, year), vehicle_id)
+
+    def vehicle_id_for(self, make: str, model: str, year: str | None) -> int | None:
+        if not (make or model or year):
+            return None
+        key = vehicle_key(make, model, year)
+        vehicle_id = self._vehicle_ids.get(key)
+        if vehicle_id is None:
+            now = datetime.utcnow()
+            result = db.session.execute(
+                insert(Vehicle.__table__).values(
+                    make=make, model=model, year=year, created_at=now, updated_at=now
                 )
-                db.session.add(part)
+            )
+            vehicle_id = result.inserted_primary_key[0]
+            self._vehicle_ids[key] = vehicle_id
+            self.stats.vehicles_inserted += 1
+        return vehicle_id
 
-            db.session.commit()
+    def add(self, record: dict[str, Any]) -> None:
+        self._buffer.append({
+            "part_number": record["part_number"],
+            "name": record["name"],
+            "brand": record["brand"],
+            "price": record["price"],
+            "quantity_min": record["quantity_min"],
+            "vehicle_id": self.vehicle_id_for(record["make"], record["model"], record["year"]),
+            "content_hash": content_hash(record["name"], record["price"], record["quantity_min"]),
+        })
+        if len(self._buffer) >= self.chunk_size:
+            self.flush()
 
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        now = datetime.utcnow()
+        for part in self._buffer:
+            part["created_at"] = now
+            part["updated_at"] = now
+        db.session.execute(insert(Part.__table__), self._buffer)
+        self.stats.parts_inserted += len(self._buffer)
+        self._uncommitted += len(self._buffer)
+        self._buffer = []
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def commit(self) -> None:
+        db.session.commit()
+        self._uncommitted = 0
+        print(
+            f"committed {self.stats.parts_inserted} parts "
+            f"({self.stats.rows_per_second():,.0f} rows/s, {sum(self.stats.rejects.values())} rejected)"
+        )
+
+    def close(self) -> None:
+        self.flush()
+        self.commit()
+
+
+class SyncImporter(BulkImporter):
+    """
+    Incremental upsert keyed on (part_number, brand, vehicle). Each chunk is
+    compared against the stored rows for its part numbers (one indexed IN
+    query); only new and changed parts are written. Ids of matched parts are
+    kept in a compact array so --retire can delete the ones the file dropped.
+    """
+
+    def __init__(self, *args: Any, retire: bool = False, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.retire = retire
+        self._seen_ids = array("q")
+        self._brands: set[str | None] = set()
+        self._max_existing_id = db.session.scalar(select(func.max(Part.id))) or 0
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        # Later rows win when the file repeats a key
+        incoming: dict[tuple[str, str, int], dict[str, Any]] = {}
+        for part in self._buffer:
+            incoming[_part_key(part["part_number"], part["brand"], part["vehicle_id"])] = part
+            self._brands.add(part["brand"])
+        self._buffer = []
+
+        stored: dict[tuple[str, str, int], tuple[int, str | None]] = {}
+        rows = db.session.execute(
+            select(
+                Part.id, Part.part_number, Part.brand, Part.vehicle_id, Part.content_hash,
+                Part.name, Part.price, Part.quantity_min,
+            )
+            .where(Part.part_number.in_([part["part_number"] for part in incoming.values()]))
+            .order_by(Part.id)
+        )
+        for part_id, part_number, brand, vehicle_id, stored_hash, name, price, quantity_min in rows:
+            key = _part_key(part_number, brand, vehicle_id)
+            if key in incoming and key not in stored:
+                # Rows loaded before hashes existed are compared on their fields
+                stored[key] = (part_id, stored_hash or content_hash(name, price, quantity_min))
+
+        now = datetime.utcnow()
+        inserts: list[dict[str, Any]] = []
+        updates: list[dict[str, Any]] = []
+        for key, part in incoming.items():
+            match = stored.get(key)
+            if match is None:
+                part["created_at"] = now
+                part["updated_at"] = now
+                inserts.append(part)
+                continue
+            part_id, stored_hash = match
+            self._seen_ids.append(part_id)
+            if stored_hash == part["content_hash"]:
+                self.stats.parts_unchanged += 1
+                continue
+            updates.append({
+                "_id": part_id,
+                "name": part["name"],
+                "price": part["price"],
+                "quantity_min": part["quantity_min"],
+                "content_hash": part["content_hash"],
+                "updated_at": now,
+            })
+
+        if inserts:
+            db.session.execute(insert(Part.__table__), inserts)
+            self.stats.parts_inserted += len(inserts)
+        if updates:
+            db.session.connection().execute(
+                update(Part.__table__)
+                .where(Part.__table__.c.id == bindparam("_id"))
+                .values(
+                    name=bindparam("name"),
+                    price=bindparam("price"),
+                    quantity_min=bindparam("quantity_min"),
+                    content_hash=bindparam("content_hash"),
+                    updated_at=bindparam("updated_at"),
+                ),
+                updates,
+            )
+            self.stats.parts_updated += len(updates)
+
+        self._uncommitted += len(incoming)
+        if self._uncommitted >= self.commit_every:
+            self.commit()
+
+    def close(self) -> None:
+        super().close()
+        if self.retire:
+            self._retire_missing()
+
+    def _retire_missing(self) -> None:
+        """Delete stored parts of the file's brands that the file did not list."""
+        if not self._brands:
+            return
+        seen = sorted(self._seen_ids)
+        brand_filter = Part.brand.in_([b for b in self._brands if b is not None])
+        if None in self._brands:
+            brand_filter = brand_filter | Part.brand.is_(None)
+
+        stale: list[int] = []
+        # Parts inserted by this run are never "seen"; only older rows can be stale
+        query = (
+            select(Part.id)
+            .where(brand_filter, Part.id <= self._max_existing_id)
+            .order_by(Part.id)
+        )
+        for (part_id,) in db.session.execute(query.execution_options(yield_per=10000)):
+            index = bisect.bisect_left(seen, part_id)
+            if index < len(seen) and seen[index] == part_id:
+                continue
+            stale.append(part_id)
+            if len(stale) >= self.chunk_size:
+                self._delete(stale)
+                stale = []
+        self._delete(stale)
+        db.session.commit()
+
+    def _delete(self, part_ids: list[int]) -> None:
+        if part_ids:
+            db.session.execute(delete(Part).where(Part.id.in_(part_ids)))
+            self.stats.parts_retired += len(part_ids)
+
+
+def _part_key(part_number: str, brand: str | None, vehicle_id: int | None) -> tuple[str, str, int]:
+    return (part_number.casefold(), (brand or "").casefold(), vehicle_id or 0)
 
-if __name__ == "__main__":
-    path = os.environ.get("PARTS_CSV", "./data/parts.csv")
-    import_csv(path)
 
+def iter_csv_rows(file_path: str) -> Iterable[dict[str, Any]]:
+    with open(file_path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
 
+
+def plan_byte_ranges(file_path: str, chunk_bytes: int, start: int | None = None) -> tuple[list[str], list[tuple[int, int]]]:
+    """
+    Return the CSV header and (start, end) byte ranges covering the data rows,
+    each starting at a line start. start resumes from a committed offset.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        header_line = f.readline()
+        data_start = f.tell()
+        position = max(start or data_start, data_start)
+        ranges: list[tuple[int, int]] = []
+        while position < size:
+            f.seek(min(position + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()  # advance to the next line start
+            end = f.tell()
+            ranges.append((position, end))
+            position = end
+    header = next(csv.reader([header_line.decode("utf-8-sig")]))
+    return header, ranges
+
+
+def parse_byte_range(
+    file_path: str, header: list[str], start: int, end: int
+) -> tuple[int, int, list[dict[str, Any]], Counter, int]:
+    """Process-pool task: read, parse and validate one byte range."""
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    records: list[dict[str, Any]] = []
+    rejects: Counter[str] = Counter()
+    rows_read = 0
+    for row in csv.DictReader(io.StringIO(data.decode("utf-8"), newline=""), fieldnames=header):
+        rows_read += 1
+        record, reason = normalize_row(row)
+        if record is None:
+            rejects[reason] += 1
+        else:
+            records.append(record)
+    return start, end, records, rejects, rows_read
+
+
+class Checkpoint:
+    """Committed byte offset for a file, saved atomically after each committed range."""
+
+    def __init__(self, path: str, file_path: str) -> None:
+        self.path = path
+        stat = os.stat(file_path)
+        self.identity = {"file": os.path.abspath(file_path), "size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+    def load(self) -> int | None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if any(data.get(key) != value for key, value in self.identity.items()):
+            raise RuntimeError(f"Checkpoint {self.path} belongs to a different or modified file")
+        return int(data["committed_offset"])
+
+    def save(self, committed_offset: int, stats: ImportStats) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                **self.identity,
+                "committed_offset": committed_offset,
+                "rows_read": stats.rows_read,
+                "parts_inserted": stats.parts_inserted,
+                "parts_updated": stats.parts_updated,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _import_parallel(
+    importer: BulkImporter,
+    file_path: str,
+    workers: int,
+    chunk_bytes: int,
+    checkpoint: Checkpoint,
+    resume: bool,
+) -> None:
+    stats = importer.stats
+    start = checkpoint.load() if resume else None
+    if start is not None:
+        print(f"resuming at byte {start}")
+    header, ranges = plan_byte_ranges(file_path, chunk_bytes, start)
+
+    # At most 2 ranges per worker are parsed ahead of the writer, bounding memory
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        next_range = iter(ranges)
+        for byte_range in next_range:
+            pending.append(pool.submit(parse_byte_range, file_path, header, *byte_range))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            _, end, records, rejects, rows_read = pending.popleft().result()
+            following = next(next_range, None)
+            if following is not None:
+                pending.append(pool.submit(parse_byte_range, file_path, header, *following))
+
+            stats.rows_read += rows_read
+            stats.rejects.update(rejects)
+            for record in records:
+                importer.add(record)
+            importer.flush()
+            importer.commit()
+            checkpoint.save(end, stats)
+
+
+_STAGING_COLUMNS = (
+    "make", "model", "year", "part_number", "name", "brand", "price", "quantity_min", "content_hash",
+)
+
+
+def staging_table() -> Table:
+    """Staging table for --mode native, named per run so concurrent imports don't share one."""
+    return Table(
+        f"parts_import_staging_{uuid.uuid4().hex[:12]}",
+        MetaData(),
+        Column("make", String(64), nullable=False),
+        Column("model", String(64), nullable=False),
+        Column("year", String(16)),
+        Column("part_number", String(128), nullable=False),
+        Column("name", String(256), nullable=False),
+        Column("brand", String(128)),
+        Column("price", Numeric(12, 2)),
+        Column("quantity_min", Integer),
+        Column("content_hash", String(40)),
+    )
+
+
+def _escape_tsv(value: Any) -> str:
+    """Field encoding understood by LOAD DATA's defaults (\\N is NULL)."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _unescape_tsv(value: str) -> str | None:
+    if value == "\\N":
+        return None
+    if "\\" not in value:
+        return value
+    out: list[str] = []
+    chars = iter(value)
+    for ch in chars:
+        if ch == "\\":
+            nxt = next(chars, "")
+            out.append({"t": "\t", "n": "\n", "r": "\r"}.get(nxt, nxt))
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def write_staging_file(file_path: str, staging_path: str, stats: ImportStats) -> int:
+    """Normalize and validate the CSV into a staging TSV; returns rows written."""
+    written = 0
+    with open(staging_path, "w", encoding="utf-8", newline="\n") as out:
+        for row in iter_csv_rows(file_path):
+            stats.rows_read += 1
+            record, reason = normalize_row(row)
+            if record is None:
+                stats.rejects[reason] += 1
+                continue
+            record["content_hash"] = content_hash(record["name"], record["price"], record["quantity_min"])
+            out.write("\t".join(_escape_tsv(record[c]) for c in _STAGING_COLUMNS) + "\n")
+            written += 1
+    return written
+
+
+def _load_staging(connection, staging: Table, staging_path: str, chunk_size: int) -> None:
+    if connection.dialect.name == "mysql":
+        connection.exec_driver_sql(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging.name} "
+            "CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' "
+            f"({', '.join(_STAGING_COLUMNS)})",
+            (staging_path,),
+        )
+        return
+
+    # Portable fallback: multi-row INSERTs straight from the staging file
+    batch: list[dict[str, Any]] = []
+    with open(staging_path, encoding="utf-8", newline="\n") as f:
+        for line in f:
+            values = [_unescape_tsv(v) for v in line.rstrip("\n").split("\t")]
+            batch.append(dict(zip(_STAGING_COLUMNS, values)))
+            if len(batch) >= chunk_size:
+                connection.execute(insert(staging), batch)
+                batch = []
+    if batch:
+        connection.execute(insert(staging), batch)
+
+
+def _vehicle_key_sql(alias: str) -> list[str]:
+    """SQL counterpart of vehicle_key(): case-insensitive, NULL year equals ''."""
+    return [f"lower({alias}.make)", f"lower({alias}.model)", f"lower(COALESCE({alias}.year, ''))"]
+
+
+def _merge_staging(connection, staging_table: Table) -> tuple[int, int]:
+    """Set-based merge of the staging table into vehicles and parts."""
+    now = datetime.utcnow()
+    staging = staging_table.name
+    has_vehicle = "(s.make <> '' OR s.model <> '' OR s.year IS NOT NULL)"
+    staging_key = _vehicle_key_sql("s")
+    vehicle_key_cols = _vehicle_key_sql("vehicles")
+    # Lowest id per case-insensitive (make, model, year), like the per-row importers' lookup
+    vehicle_map = (
+        f"(SELECT MIN(id) AS id, {vehicle_key_cols[0]} AS make_key, {vehicle_key_cols[1]} AS model_key, "
+        f"{vehicle_key_cols[2]} AS year_key FROM vehicles GROUP BY {', '.join(vehicle_key_cols)})"
+    )
+    join_vehicle_map = " AND ".join(
+        f"v.{column} = {expr}" for column, expr in zip(("make_key", "model_key", "year_key"), staging_key)
+    )
+    match_existing = " AND ".join(f"{a} = {b}" for a, b in zip(_vehicle_key_sql("v"), staging_key))
+
+    # One row per new case-insensitive key, each column spelled as its lowest-sorting variant
+    vehicles = connection.execute(text(
+        f"INSERT INTO vehicles (make, model, year, created_at, updated_at) "
+        f"SELECT MIN(s.make), MIN(s.model), MIN(s.year), :now, :now FROM {staging} s "
+        f"WHERE {has_vehicle} AND NOT EXISTS (SELECT 1 FROM vehicles v WHERE {match_existing}) "
+        f"GROUP BY {', '.join(staging_key)}"
+    ), {"now": now}).rowcount
+
+    parts = connection.execute(text(
+        f"INSERT INTO parts (part_number, name, brand, price, quantity_min, vehicle_id, "
+        f"content_hash, created_at, updated_at) "
+        f"SELECT s.part_number, s.name, s.brand, s.price, s.quantity_min, "
+        f"CASE WHEN {has_vehicle} THEN v.id END, s.content_hash, :now, :now "
+        f"FROM {staging} s LEFT JOIN {vehicle_map} v ON {join_vehicle_map}"
+    ), {"now": now}).rowcount
+    return vehicles, parts
+
+
+def import_native(file_path: str, stats: ImportStats, chunk_size: int = 5000) -> None:
+    """--mode native: staging file -> staging table (bulk loader) -> set-based merge."""
+    engine = db.engine
+    if engine.dialect.name == "mysql":
+        # LOAD DATA LOCAL needs the client-side flag; the server must allow local_infile too
+        engine = create_engine(engine.url, connect_args={"local_infile": True})
+
+    fd, staging_path = tempfile.mkstemp(prefix="parts_staging_", suffix=".tsv")
+    os.close(fd)
+    try:
+        written = write_staging_file(file_path, staging_path, stats)
+        print(f"staged {written} rows ({stats.rows_per_second():,.0f} rows/s)")
+        staging = staging_table()
+        with engine.begin() as connection:
+            staging.create(connection)
+            try:
+                _load_staging(connection, staging, staging_path, chunk_size)
+                print(f"loaded staging table ({stats.rows_per_second():,.0f} rows/s)")
+                stats.vehicles_inserted, stats.parts_inserted = _merge_staging(connection, staging)
+            finally:
+                staging.drop(connection, checkfirst=True)
+    finally:
+        os.remove(staging_path)
+        if engine is not db.engine:
+            engine.dispose()
+
+
+def import_csv(
+    file_path: str,
+    chunk_size: int = 5000,
+    commit_every: int = 50000,
+    mode: str = "insert",
+    retire: bool = False,
+    workers: int = 0,
+    chunk_bytes: int = 16 * 1024 * 1024,
+    checkpoint_path: str | None = None,
+    resume: bool = False,
+) -> ImportStats:
+    if resume and retire:
+        # Matches from the interrupted run are not remembered, so they would look retired
+        raise ValueError("--retire cannot be combined with --resume; rerun the sync without --retire first")
+    app = create_app()
+    with app.app_context():
+        if mode == "native":
+            # Vehicles are resolved in SQL, so the per-row importers' vehicle map is not loaded
+            stats = ImportStats()
+            import_native(file_path, stats, chunk_size=chunk_size)
+            print(stats.summary())
+            return stats
+        if mode == "sync":
+            importer = SyncImporter(chunk_size=chunk_size, commit_every=commit_every, retire=retire)
+        else:
+            importer = BulkImporter(chunk_size=chunk_size, commit_every=commit_every)
+        stats = importer.stats
+        try:
+            if workers > 0:
+                checkpoint = Checkpoint(checkpoint_path or f"{file_path}.checkpoint.json", file_path)
+                _import_parallel(importer, file_path, workers, chunk_bytes, checkpoint, resume)
+                importer.close()
+                checkpoint.clear()
+            else:
+                for row in iter_csv_rows(file_path):
+                    stats.rows_read += 1
+                    record, reason = normalize_row(row)
+                    if record is None:
+                        stats.rejects[reason] += 1
+                        continue
+                    importer.add(record)
+                importer.close()
+        except Exception:
+            db.session.rollback()
+            raise
+        print(stats.summary())
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default=os.environ.get("PARTS_CSV", "./data/parts.csv"))
+    parser.add_argument("--mode", choices=["insert", "sync", "native"], default="insert")
+    parser.add_argument("--retire", action="store_true", help="sync: delete parts missing from the file")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows per multi-row INSERT")
+    parser.add_argument("--commit-every", type=int, default=50000, help="rows per transaction")
+    parser.add_argument("--workers", type=int, default=0, help="parser processes (0 = read in this process)")
+    parser.add_argument("--chunk-mb", type=int, default=16, help="byte range size per parser task")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument("--resume", action="store_true", help="continue after the last committed range")
+    args = parser.parse_args()
+    workers = args.workers or ((os.cpu_count() or 1) if args.resume else 0)
+    import_csv(
+        args.path,
+        chunk_size=args.chunk_size,
+        commit_every=args.commit_every,
+        mode=args.mode,
+        retire=args.retire,
+        workers=workers,
+        chunk_bytes=args.chunk_mb * 1024 * 1024,
+        checkpoint_path=args.checkpoint,
+        resume=args.resume,
+    )
+
+
+if __name__ == "__main__":
+    main()
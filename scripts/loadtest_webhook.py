@@ -0,0 +1,481 @@
+"""
+Load test for the WhatsApp webhook, with local stand-ins for Meta, OpenAI,
+CarPartsDubai and the chassis API.
+
+Starts the stubs (scripts/webhook_stubs.py) and seeds a scratch database.
+Then it runs the app under uvicorn (asgi:app, one worker), pointed at the
+stubs, unless --target names an app that is already running. It posts
+generated Meta webhook payloads at each rate in --rates for --duration
+seconds. Payloads are single text messages, delivery-status callbacks and
+mixed batches, in English and Arabic. The messages ask for part numbers (in
+the catalog or not), chassis numbers (known or not), car parts and
+greetings.
+
+Requests go out open-loop: each one is sent on schedule even if earlier ones
+have not answered yet. A slow app therefore shows up as latency, not as a
+lower send rate. Latency is measured from the scheduled send time. Requests
+beyond --max-inflight are dropped and counted.
+
+For each rate it reports throughput, webhook latency p50/p95/p99, and per
+pipeline stage p50/p95/p99 and error share. The stage numbers come from the
+app's /api/admin/metrics histograms, diffed around the step and interpolated
+within buckets. Metrics are per process: against a --target with several
+workers, stage numbers only cover the worker that answered the scrape.
+The stubs share this process with the load generator; at high rates, run
+them apart (scripts.webhook_stubs) and use --target. --database-url tables
+are dropped and recreated; never point it at data you need.
+
+Usage:
+  python -m scripts.loadtest_webhook --rates 5 10 20 40 --duration 30
+  python -m scripts.loadtest_webhook --latency openai=800 --jitter 0.3 --error-rate chassis=0.05
+  python -m scripts.loadtest_webhook --env LEAD_WRITE_BEHIND=true --database-url mysql+pymysql://root:pw@127.0.0.1/lt
+  # App started separately with the environment printed by scripts.webhook_stubs:
+  python -m scripts.loadtest_webhook --target http://127.0.0.1:8000 --admin-token secret
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import socket
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+from scripts.webhook_stubs import parse_service_values, serve_stubs, stub_env
+
+ROOT = Path(__file__).resolve().parents[1]
+WEBHOOK_PATH = "/webhook/whatsapp"
+PHONE_NUMBER_ID = "100000000000001"
+PERCENTILES = (0.5, 0.95, 0.99)
+STAGE_ORDER = ("message", "intent", "search", "carparts_dubai", "chassis", "lead", "format", "send")
+
+VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+CARS = [("Toyota", "تويوتا", "Corolla", "كورولا"), ("Toyota", "تويوتا", "Camry", "كامري"),
+        ("Nissan", "نيسان", "Patrol", "باترول"), ("Honda", "هوندا", "Civic", "سيفيك")]
+PART_NAMES = [("Brake Pad", "فحمات فرامل"), ("Oil Filter", "فلتر زيت"), ("Alternator", "دينمو"), ("Radiator", "رديتر")]
+TEMPLATES = {
+    "part_number": (
+        ["Do you have {pn}?", "price for {pn} please", "{pn} available?"],
+        ["هل عندكم القطعة {pn}؟", "كم سعر {pn}", "أحتاج {pn}"],
+    ),
+    "chassis": (
+        ["parts for chassis {vin}", "VIN {vin}", "my car chassis number is {vin}"],
+        ["رقم الشاصي {vin}", "أبغى قطع لرقم الشاصي {vin}"],
+    ),
+    "car_part": (
+        ["{part} for {make} {model} {year}", "need {part} {make} {model}"],
+        ["{part_ar} {make_ar} {model_ar} {year}", "أحتاج {part_ar} ل{make_ar} {model_ar}"],
+    ),
+    "greeting": (["hi", "hello", "good morning"], ["مرحبا", "السلام عليكم", "صباح الخير"]),
+}
+INTENT_MIX = {"part_number": 0.35, "chassis": 0.2, "car_part": 0.3, "greeting": 0.15}
+
+
+class PayloadFactory:
+    """Meta webhook payloads drawn from fixed pools of users, part numbers and VINs."""
+
+    def __init__(self, seed: int, arabic_share: float, kinds: dict[str, float]) -> None:
+        self.rng = random.Random(seed)
+        pools = random.Random(seed + 1)
+        self.arabic_share = arabic_share
+        self.kinds = kinds
+        self.users = [f"9715{pools.randint(0, 99_999_999):08d}" for _ in range(500)]
+        self.part_numbers = [
+            f"{pools.randint(10000, 99999)}-{''.join(pools.choices(string.digits + string.ascii_uppercase, k=5))}"
+            for _ in range(400)
+        ]
+        self.vins = ["".join(pools.choices(VIN_CHARS, k=17)) for _ in range(200)]
+
+    def payload(self) -> tuple[dict, int]:
+        """(payload, number of text messages in it)."""
+        kind = self.rng.choices(list(self.kinds), list(self.kinds.values()))[0]
+        if kind == "text":
+            changes = [self._message_change()]
+        elif kind == "status":
+            changes = [self._status_change(self.rng.randint(1, 3))]
+        else:
+            changes = [self._message_change() for _ in range(self.rng.randint(2, 4))]
+            changes.insert(self.rng.randint(0, len(changes)), self._status_change(self.rng.randint(1, 3)))
+        texts = sum(len(c["value"].get("messages", [])) for c in changes)
+        return {"object": "whatsapp_business_account", "entry": [{"id": "200000000000002", "changes": changes}]}, texts
+
+    def text(self) -> str:
+        rng = self.rng
+        intent = rng.choices(list(INTENT_MIX), list(INTENT_MIX.values()))[0]
+        english, arabic = TEMPLATES[intent]
+        template = rng.choice(arabic if rng.random() < self.arabic_share else english)
+        make, make_ar, model, model_ar = rng.choice(CARS)
+        part, part_ar = rng.choice(PART_NAMES)
+        return template.format(
+            pn=rng.choice(self.part_numbers), vin=rng.choice(self.vins), year=rng.randint(2012, 2024),
+            make=make, make_ar=make_ar, model=model, model_ar=model_ar, part=part.lower(), part_ar=part_ar,
+        )
+
+    def _value(self) -> dict:
+        return {
+            "messaging_product": "whatsapp",
+            "metadata": {"display_phone_number": "971500000001", "phone_number_id": PHONE_NUMBER_ID},
+        }
+
+    def _message_change(self) -> dict:
+        user = self.rng.choice(self.users)
+        value = self._value()
+        value["contacts"] = [{"profile": {"name": f"Customer {user[-4:]}"}, "wa_id": user}]
+        value["messages"] = [{
+            "from": user,
+            "id": f"wamid.{uuid.uuid4().hex}",
+            "timestamp": str(int(time.time())),
+            "type": "text",
+            "text": {"body": self.text()},
+        }]
+        return {"field": "messages", "value": value}
+
+    def _status_change(self, count: int) -> dict:
+        value = self._value()
+        value["statuses"] = [
+            {
+                "id": f"wamid.{uuid.uuid4().hex}",
+                "status": self.rng.choice(["sent", "delivered", "read"]),
+                "timestamp": str(int(time.time())),
+                "recipient_id": self.rng.choice(self.users),
+            }
+            for _ in range(count)
+        ]
+        return {"field": "messages", "value": value}
+
+
+def seed_database(database_url: str, factory: PayloadFactory) -> None:
+    """Scratch catalog: half the generated part numbers and VINs, and parts for every car."""
+    # AppConfig reads DATABASE_URL at import time, so set it before importing the app
+    os.environ["DATABASE_URL"] = database_url
+    from app import create_app
+    from app.extensions import db
+    from app.models import Part, Vehicle
+
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        vehicles = [Vehicle(make=make, model=model, year="2018") for make, _, model, _ in CARS]
+        vehicles += [
+            Vehicle(make="Toyota", model="Land Cruiser", year="2020", chassis_number=vin)
+            for vin in factory.vins[: len(factory.vins) // 2]
+        ]
+        db.session.add_all(vehicles)
+        db.session.flush()
+        parts = [
+            Part(part_number=f"CAT-{vehicle.id}-{i}", name=name, brand="Denso", price=120, vehicle_id=vehicle.id)
+            for vehicle in vehicles[: len(CARS)] for i, (name, _) in enumerate(PART_NAMES)
+        ]
+        parts += [
+            Part(part_number=pn, name=PART_NAMES[i % len(PART_NAMES)][0], brand="Aisin", price=95,
+                 vehicle_id=vehicles[len(CARS) + i % (len(vehicles) - len(CARS))].id)
+            for i, pn in enumerate(factory.part_numbers[: len(factory.part_numbers) // 2])
+        ]
+        db.session.add_all(parts)
+        db.session.commit()
+        db.engine.dispose()
+
+
+def start_app(port: int, env: dict[str, str]) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+        "--workers", "1", "--no-access-log", "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=ROOT, env={**os.environ, **env})
+
+
+def wait_ready(base_url: str, token: str, proc: subprocess.Popen | None, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f"App exited with code {proc.returncode} during startup")
+        try:
+            if httpx.get(f"{base_url}/api/admin/config", headers=_auth(token), timeout=2).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise SystemExit(f"App at {base_url} not ready after {timeout:.0f}s")
+
+
+async def run_step(
+    client: httpx.AsyncClient, url: str, factory: PayloadFactory, rate: float, duration: float, max_inflight: int
+) -> dict:
+    """Post payloads open-loop at `rate` per second for `duration` seconds."""
+    loop = asyncio.get_running_loop()
+    latencies: list[float] = []
+    outcomes: Counter[str] = Counter()
+    messages = 0
+    inflight: set[asyncio.Task] = set()
+
+    async def send(body: bytes, texts: int, scheduled: float) -> None:
+        nonlocal messages
+        try:
+            response = await client.post(url, content=body, headers={"Content-Type": "application/json"})
+        except httpx.HTTPError as e:
+            outcomes[type(e).__name__] += 1
+            return
+        if response.status_code != 200:
+            outcomes[f"http_{response.status_code}"] += 1
+            return
+        outcomes["ok"] += 1
+        messages += texts
+        latencies.append(loop.time() - scheduled)
+
+    start = loop.time()
+    for i in range(int(rate * duration)):
+        scheduled = start + i / rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= max_inflight:
+            outcomes["dropped"] += 1
+            continue
+        payload, texts = factory.payload()
+        task = asyncio.create_task(send(json.dumps(payload).encode(), texts, scheduled))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    if inflight:
+        await asyncio.wait(list(inflight))
+    elapsed = loop.time() - start
+
+    latencies.sort()
+    return {
+        "rate": rate,
+        "sent": sum(outcomes.values()) - outcomes["dropped"],
+        "ok": outcomes["ok"],
+        "failed": sum(n for k, n in outcomes.items() if k not in ("ok", "dropped")),
+        "dropped": outcomes["dropped"],
+        "failures": {k: n for k, n in outcomes.items() if k not in ("ok", "dropped")},
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(outcomes["ok"] / elapsed, 2),
+        "messages_per_second": round(messages / elapsed, 2),
+        "latency_ms": {_label(q): _ms(_percentile(latencies, q)) for q in PERCENTILES}
+        | {"max": _ms(latencies[-1] if latencies else None)},
+    }
+
+
+_SAMPLE_RE = re.compile(
+    r'^carparts_stage_(duration_seconds_bucket|duration_seconds_count|errors_total)'
+    r'\{stage="([^"]+)"(?:,le="([^"]+)")?\} (\S+)$'
+)
+
+
+def scrape_metrics(base_url: str, token: str) -> dict[str, dict] | None:
+    """{stage: {"buckets": {upper bound: cumulative count}, "count": n, "errors": n}} or None when unavailable."""
+    try:
+        response = httpx.get(f"{base_url}/api/admin/metrics", headers=_auth(token), timeout=10)
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    stages: dict[str, dict] = {}
+    for line in response.text.splitlines():
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            continue
+        kind, stage, le, value = match.groups()
+        entry = stages.setdefault(stage, {"buckets": {}, "count": 0, "errors": 0})
+        if kind == "duration_seconds_bucket":
+            entry["buckets"][float(le)] = float(value)
+        elif kind == "duration_seconds_count":
+            entry["count"] = float(value)
+        else:
+            entry["errors"] = float(value)
+    return stages
+
+
+def stage_report(before: dict[str, dict], after: dict[str, dict]) -> dict[str, dict]:
+    """Per-stage count, error share and interpolated percentiles for what happened between two scrapes."""
+    report = {}
+    for stage, now in after.items():
+        then = before.get(stage, {"buckets": {}, "count": 0, "errors": 0})
+        count = now["count"] - then["count"]
+        if count <= 0:
+            continue
+        buckets = sorted((bound, n - then["buckets"].get(bound, 0)) for bound, n in now["buckets"].items())
+        report[stage] = {
+            "count": int(count),
+            "error_share": round((now["errors"] - then["errors"]) / count, 4),
+        } | {_label(q): _ms(histogram_quantile(buckets, q)) for q in PERCENTILES}
+    return report
+
+
+def histogram_quantile(buckets: list[tuple[float, float]], q: float) -> float | None:
+    """Quantile from cumulative (upper bound, count) buckets, linear within a bucket (like PromQL)."""
+    if not buckets or buckets[-1][1] <= 0:
+        return None
+    rank = q * buckets[-1][1]
+    lower, below = 0.0, 0.0
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            if math.isinf(bound):
+                # Past the largest finite bucket; the bound is all we know
+                return lower
+            if cumulative == below:
+                return bound
+            return lower + (bound - lower) * (rank - below) / (cumulative - below)
+        lower, below = bound, cumulative
+    return lower
+
+
+def _percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return None
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def _label(q: float) -> str:
+    return f"p{q * 100:g}"
+
+
+def _ms(seconds: float | None) -> float | None:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def _auth(token: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _parse_mix(items: list[str]) -> dict[str, float]:
+    mix = {}
+    for item in items:
+        kind, _, share = item.partition("=")
+        if kind not in ("text", "status", "batch") or not share:
+            raise SystemExit(f"--mix: expected text|status|batch=SHARE, got {item!r}")
+        mix[kind] = float(share)
+    return mix
+
+
+def print_report(results: list[dict]) -> None:
+    def cell(value) -> str:
+        return "-" if value is None else f"{value:g}"
+
+    labels = [_label(q) for q in PERCENTILES]
+    print()
+    print(f"{'rate/s':>7} {'sent':>7} {'ok':>7} {'failed':>7} {'dropped':>7} {'req/s':>8} {'msg/s':>8} "
+          + " ".join(f"{label + ' ms':>10}" for label in labels) + f" {'max ms':>10}")
+    for r in results:
+        print(f"{r['rate']:>7g} {r['sent']:>7} {r['ok']:>7} {r['failed']:>7} {r['dropped']:>7} "
+              f"{r['requests_per_second']:>8g} {r['messages_per_second']:>8g} "
+              + " ".join(f"{cell(r['latency_ms'][label]):>10}" for label in labels)
+              + f" {cell(r['latency_ms']['max']):>10}")
+        if r["failures"]:
+            print(f"{'':>7} failures: {', '.join(f'{k}={n}' for k, n in sorted(r['failures'].items()))}")
+
+    for r in results:
+        stages = r.get("stages")
+        if not stages:
+            continue
+        print(f"\nStages at {r['rate']:g}/s")
+        print(f"  {'stage':<16} {'count':>7} {'errors':>7} " + " ".join(f"{label + ' ms':>10}" for label in labels))
+        ordered = [s for s in STAGE_ORDER if s in stages] + sorted(s for s in stages if s not in STAGE_ORDER)
+        for stage in ordered:
+            s = stages[stage]
+            print(f"  {stage:<16} {s['count']:>7} {s['error_share']:>7.1%} "
+                  + " ".join(f"{cell(s[label]):>10}" for label in labels))
+
+
+async def run(args, base_url: str, token: str) -> list[dict]:
+    factory = PayloadFactory(args.seed, args.arabic, _parse_mix(args.mix))
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    results = []
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        url = f"{base_url}{WEBHOOK_PATH}"
+        if args.warmup:
+            await run_step(client, url, factory, args.rates[0], args.warmup, args.max_inflight)
+        for rate in args.rates:
+            before = scrape_metrics(base_url, token)
+            result = await run_step(client, url, factory, rate, args.duration, args.max_inflight)
+            after = scrape_metrics(base_url, token)
+            if before is not None and after is not None:
+                result["stages"] = stage_report(before, after)
+            results.append(result)
+            print(f"{rate:g}/s: {result['ok']} ok, {result['failed']} failed, {result['dropped']} dropped, "
+                  f"p95 {result['latency_ms']['p95']} ms", flush=True)
+            if args.pause:
+                await asyncio.sleep(args.pause)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", nargs="+", type=float, default=[5, 10, 20, 40], help="webhook requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per rate")
+    parser.add_argument("--warmup", type=float, default=5, help="unreported seconds at the first rate")
+    parser.add_argument("--pause", type=float, default=2, help="idle seconds between rates")
+    parser.add_argument("--max-inflight", type=int, default=256, help="requests over this many in flight are dropped")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("--mix", nargs="*", default=["text=0.7", "status=0.2", "batch=0.1"], help="payload kinds")
+    parser.add_argument("--arabic", type=float, default=0.3, help="share of messages in Arabic")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", nargs="*", default=[], help="stub latency in ms, e.g. openai=400 graph=80")
+    parser.add_argument("--jitter", type=float, default=0.2, help="stub latency varies by +/- this fraction")
+    parser.add_argument("--error-rate", nargs="*", default=[], help="stub share of 500s, e.g. chassis=0.05")
+    parser.add_argument("--env", nargs="*", default=[], help="extra app settings, e.g. LEAD_WRITE_BEHIND=true")
+    parser.add_argument(
+        "--database-url",
+        help="scratch database for the started app (all tables are dropped); default: a temporary SQLite file",
+    )
+    parser.add_argument("--target", help="already running app to test instead of starting one")
+    parser.add_argument("--admin-token", default=os.getenv("ADMIN_TOKEN", "admin-token"), help="for --target metrics")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    proc = None
+    if args.target:
+        base_url, token = args.target.rstrip("/"), args.admin_token
+    else:
+        stubs = serve_stubs(
+            parse_service_values(args.latency, "latency"),
+            args.jitter,
+            parse_service_values(args.error_rate, "error-rate"),
+        )
+        workdir = tempfile.mkdtemp(prefix="loadtest_webhook_")
+        database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+        seed_database(database_url, PayloadFactory(args.seed, args.arabic, _parse_mix(args.mix)))
+
+        port, token = _free_port(), uuid.uuid4().hex
+        env = {**stub_env(stubs), "DATABASE_URL": database_url, "ADMIN_TOKEN": token}
+        env.update(item.split("=", 1) for item in args.env if "=" in item)
+        base_url = f"http://127.0.0.1:{port}"
+        proc = start_app(port, env)
+
+    try:
+        wait_ready(base_url, token, proc)
+        results = asyncio.run(run(args, base_url, token))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    print_report(results)
+    if not any(r.get("stages") for r in results):
+        print("\nNo stage metrics (GET /api/admin/metrics failed; check --admin-token)")
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
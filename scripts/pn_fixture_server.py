@@ -0,0 +1,242 @@
+"""
+Local stand-in for the PartsNumber site, for exercising the extractor without
+touching the real catalog.
+
+Serves a login form (#username / #password), a catalog page with Make / Model /
+Year dropdowns and a Search button, and a results table whose rows are
+generated deterministically from the selected combination. With --xhr the
+catalog page loads its results from /api/parts as JSON, like a single-page app;
+with --page-size the server-rendered results are split over pages linked by a
+rel="next" anchor.
+
+Usage:
+  python -m scripts.pn_fixture_server --port 8765 --rows 25 --latency-ms 50
+  set PN_BASE_URL=http://127.0.0.1:8765
+  set PN_USERNAME=test
+  set PN_PASSWORD=test
+  python -m scripts.extract_partsnumber --mode makes --makes Toyota Nissan --years 2018 2019 --workers 4
+"""
+import argparse
+import hashlib
+import html
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+CATALOG = {
+    "Toyota": ["Corolla", "Camry", "Land Cruiser"],
+    "Nissan": ["Patrol", "Sunny"],
+    "Honda": ["Civic", "Accord"],
+}
+YEARS = [str(y) for y in range(2015, 2025)]
+PART_NAMES = ["Brake Pad", "Oil Filter", "Air Filter", "Alternator", "Radiator", "Headlight"]
+BRANDS = ["Denso", "Bosch", "Aisin", "NGK"]
+SESSION_COOKIE = "pn_session=fixture"
+
+
+def fixture_rows(make: str, model: str, year: str, count: int) -> list[dict[str, str]]:
+    """Deterministic parts for a combination; the extractor's expected output."""
+    rows = []
+    for i in range(count):
+        digest = hashlib.sha1(f"{make}|{model}|{year}|{i}".encode()).hexdigest()
+        rows.append({
+            "part_number": f"{digest[:5].upper()}-{digest[5:10].upper()}",
+            "name": PART_NAMES[int(digest[10:12], 16) % len(PART_NAMES)],
+            "brand": BRANDS[int(digest[12:14], 16) % len(BRANDS)],
+            "price": f"{int(digest[14:18], 16) % 2000 + 10}.00",
+            "quantity_min": str(int(digest[18:19], 16) % 4 + 1),
+        })
+    return rows
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    rows_per_combination = 25
+    latency = 0.0
+    xhr = False
+    page_size = 0
+    # Requests per path, for asserting crawl behaviour (shared across handlers)
+    hits: dict[str, int] = {}
+    hits_lock = threading.Lock()
+
+    def log_message(self, format, *args):  # noqa: A002 - signature fixed by BaseHTTPRequestHandler
+        pass
+
+    def _record_hit(self, path: str) -> None:
+        with self.hits_lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+    def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8", headers=None) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _logged_in(self) -> bool:
+        return SESSION_COOKIE in (self.headers.get("Cookie") or "")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self._record_hit(url.path)
+        if url.path == "/":
+            if self._logged_in():
+                self._send(302, "", headers={"Location": "/catalog"})
+            else:
+                self._send(200, _login_page())
+        elif url.path == "/catalog":
+            if not self._logged_in():
+                self._send(302, "", headers={"Location": "/"})
+                return
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            self._send(200, _catalog_page(query, self.rows_per_combination, self.xhr, self.page_size))
+        elif url.path == "/api/parts":
+            if not self._logged_in():
+                self._send(401, json.dumps({"error": "unauthorized"}), "application/json")
+                return
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            self._send(200, json.dumps(_parts_payload(query, self.rows_per_combination)), "application/json")
+        else:
+            self._send(404, "not found", "text/plain")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self._record_hit(url.path)
+        if url.path == "/login":
+            self._send(302, "", headers={"Location": "/catalog", "Set-Cookie": f"{SESSION_COOKIE}; Path=/"})
+        else:
+            self._send(404, "not found", "text/plain")
+
+
+def _login_page() -> str:
+    return """<!doctype html><html><body>
+<form method="post" action="/login">
+  <input id="username" name="username" type="text">
+  <input id="password" name="password" type="password">
+  <button type="submit">Login</button>
+</form></body></html>"""
+
+
+def _options(values: list[str], selected: str | None) -> str:
+    out = ['<option value="">--</option>']
+    for value in values:
+        attr = " selected" if value == selected else ""
+        out.append(f'<option value="{html.escape(value)}"{attr}>{html.escape(value)}</option>')
+    return "".join(out)
+
+
+def _matching_rows(query: dict[str, str], rows_per_combination: int) -> list[dict[str, str]]:
+    make, model, year = query.get("make"), query.get("model"), query.get("year")
+    if make and model and year and model in CATALOG.get(make, []):
+        return fixture_rows(make, model, year, rows_per_combination)
+    return []
+
+
+def _parts_payload(query: dict[str, str], rows_per_combination: int) -> dict:
+    """The /api/parts shape: nested envelope, camelCase keys, typed values."""
+    items = [
+        {
+            "id": i + 1,
+            "partNumber": row["part_number"],
+            "name": row["name"],
+            "brand": {"name": row["brand"]},
+            "price": float(row["price"]),
+            "currency": "AED",
+            "minQty": int(row["quantity_min"]),
+        }
+        for i, row in enumerate(_matching_rows(query, rows_per_combination))
+    ]
+    return {"data": {"items": items, "total": len(items)}}
+
+
+# Client-side rendering for --xhr: intercept the form and fill the table from /api/parts
+_XHR_SCRIPT = """<script>
+document.querySelector("form").addEventListener("submit", async (event) => {
+  event.preventDefault();
+  const params = new URLSearchParams(new FormData(event.target));
+  const body = await (await fetch("/api/parts?" + params)).json();
+  document.querySelector("tbody").innerHTML = body.data.items.map((p) =>
+    `<tr><td class="name">${p.name}</td><td class="part-number">${p.partNumber}</td>` +
+    `<td class="brand">${p.brand.name}</td><td class="price"><span class="currency">${p.currency}</span> ` +
+    `${p.price.toFixed(2)}</td><td class="qty">${p.minQty}</td></tr>`).join("");
+});
+</script>"""
+
+
+def _catalog_page(query: dict[str, str], rows_per_combination: int, xhr: bool = False, page_size: int = 0) -> str:
+    make, model, year = query.get("make"), query.get("model"), query.get("year")
+    models = sorted({m for ms in CATALOG.values() for m in ms})
+    rows_html = ""
+    pager_html = ""
+    if not xhr:
+        rows = _matching_rows(query, rows_per_combination)
+        if page_size:
+            page_no = max(1, int(query.get("page") or 1))
+            if page_no * page_size < len(rows):
+                next_query = urlencode({**query, "page": page_no + 1})
+                pager_html = f'<nav class="pagination"><a rel="next" href="/catalog?{html.escape(next_query)}">Next</a></nav>'
+            rows = rows[(page_no - 1) * page_size:page_no * page_size]
+        for row in rows:
+            rows_html += (
+                "<tr>"
+                f'<td class="name">{html.escape(row["name"])}</td>'
+                f'<td class="part-number">{html.escape(row["part_number"])}</td>'
+                f'<td class="brand">{html.escape(row["brand"])}</td>'
+                f'<td class="price"><span class="currency">AED</span> {row["price"]}</td>'
+                f'<td class="qty">{row["quantity_min"]}</td>'
+                "</tr>"
+            )
+    return f"""<!doctype html><html><body>
+<nav><a href="/catalog">Catalog</a></nav>
+<form method="get" action="/catalog">
+  <label for="make">Make</label><select id="make" name="make">{_options(list(CATALOG), make)}</select>
+  <label for="model">Model</label><select id="model" name="model">{_options(models, model)}</select>
+  <label for="year">Year</label><select id="year" name="year">{_options(YEARS, year)}</select>
+  <button type="submit">Search</button>
+</form>
+<table><thead><tr><th>Name</th><th>Part #</th><th>Brand</th><th>Price</th><th>Min qty</th></tr></thead>
+<tbody>{rows_html}</tbody></table>
+{pager_html}
+{_XHR_SCRIPT if xhr else ""}
+</body></html>"""
+
+
+def serve_fixture(
+    port: int = 0, rows: int = 25, latency_ms: int = 0, xhr: bool = False, page_size: int = 0
+) -> tuple[ThreadingHTTPServer, threading.Thread]:
+    """Start the fixture server on a daemon thread; port 0 picks a free port."""
+    handler = type(
+        "ConfiguredFixtureHandler",
+        (FixtureHandler,),
+        {"rows_per_combination": rows, "latency": latency_ms / 1000, "xhr": xhr, "page_size": page_size, "hits": {}},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=25, help="result rows per make/model/year")
+    parser.add_argument("--latency-ms", type=int, default=0, help="delay added to every response")
+    parser.add_argument("--xhr", action="store_true", help="render results client-side from /api/parts")
+    parser.add_argument("--page-size", type=int, default=0, help="paginate server-rendered results (0: one page)")
+    args = parser.parse_args()
+    server, thread = serve_fixture(args.port, args.rows, args.latency_ms, args.xhr, args.page_size)
+    print(f"PartsNumber fixture listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        thread.join()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Bulk chassis (VIN) resolution for fleet customers.
+
+Reads chassis numbers (one per line, or the first column of a CSV) and writes
+one NDJSON event per line: per-VIN results, progress and a final summary.
+
+Usage:
+  python -m scripts.resolve_chassis fleet_vins.txt --output data/fleet_vehicles.ndjson
+"""
+import argparse
+import json
+import sys
+from app import create_app
+from app.services.chassis_service import ChassisService
+
+
+def read_chassis_numbers(file_path: str) -> list[str]:
+    chassis_numbers: list[str] = []
+    with open(file_path, encoding="utf-8") as f:
+        for line in f:
+            value = line.split(",")[0].strip().strip('"')
+            if value and value.lower() not in ("chassis", "chassis_number", "vin"):
+                chassis_numbers.append(value)
+    return chassis_numbers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input", help="file with one chassis number per line")
+    parser.add_argument("--output", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--workers", type=int, help="parallel external API calls")
+    args = parser.parse_args()
+
+    app = create_app()
+    if args.workers:
+        app.config["CHASSIS_BULK_WORKERS"] = args.workers
+
+    chassis_numbers = read_chassis_numbers(args.input)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        with app.app_context():
+            for event in ChassisService().lookup_many(chassis_numbers):
+                if event["event"] == "result":
+                    out.write(json.dumps(event) + "\n")
+                elif event["event"] == "progress":
+                    print(f"{event['done']}/{event['total']} resolved", file=sys.stderr)
+                else:
+                    print(json.dumps(event), file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Local stand-ins for the services the WhatsApp webhook calls, for load tests.
+
+One HTTP server per service, each with its own injectable latency, jitter
+and error rate:
+  * graph:    Meta Graph API, POST /v18.0/<phone_number_id>/messages
+  * openai:   POST /v1/chat/completions; the intent prompt gets a JSON intent
+              derived from the message (part number, VIN, greeting, car part;
+              English or Arabic), the formatting prompt a short reply
+  * carparts: CarPartsDubai stock lookup, GET /stock-details?part_number=
+  * chassis:  chassis API, GET /lookup?chassis=
+
+Lookups are deterministic: a part number or VIN is either always found or
+never found (about half of each). Errors are HTTP 500s.
+
+Usage:
+  python -m scripts.webhook_stubs --latency openai=400 graph=80 carparts=250 chassis=300 --jitter 0.2
+  # then start the app with the printed environment (single worker for per-stage metrics)
+
+scripts/loadtest_webhook.py starts these itself.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SERVICES = ("graph", "openai", "carparts", "chassis")
+DEFAULT_LATENCY_MS = {"graph": 80, "openai": 400, "carparts": 250, "chassis": 300}
+
+PART_NUMBER_RE = re.compile(r"\b\d{5}-[0-9A-Z]{5}\b")
+VIN_RE = re.compile(r"\b[A-HJ-NPR-Z0-9]{17}\b")
+GREETINGS = ("hi", "hello", "hey", "good morning", "مرحبا", "السلام عليكم", "صباح الخير")
+# English and Arabic names the load generator uses -> entity values
+MAKES = {"toyota": "Toyota", "تويوتا": "Toyota", "nissan": "Nissan", "نيسان": "Nissan", "honda": "Honda", "هوندا": "Honda"}
+MODELS = {
+    "corolla": "Corolla", "كورولا": "Corolla", "camry": "Camry", "كامري": "Camry",
+    "patrol": "Patrol", "باترول": "Patrol", "civic": "Civic", "سيفيك": "Civic",
+}
+PARTS = {
+    "brake pad": "Brake Pad", "فحمات فرامل": "Brake Pad", "oil filter": "Oil Filter", "فلتر زيت": "Oil Filter",
+    "alternator": "Alternator", "دينمو": "Alternator", "radiator": "Radiator", "رديتر": "Radiator",
+}
+
+
+def is_known(key: str) -> bool:
+    """Whether a stub "finds" this part number / VIN; stable across runs."""
+    return hashlib.sha1(key.encode("utf-8")).digest()[0] % 2 == 0
+
+
+def classify(message: str) -> dict:
+    """The intent JSON a well-behaved model would return for a generated message."""
+    language = "ar" if re.search(r"[؀-ۿ]", message) else "en"
+    lowered = message.lower()
+    match = VIN_RE.search(message.upper())
+    if match:
+        return {"intent": "chassis", "entities": {"chassis": match.group(0)}, "language": language}
+    match = PART_NUMBER_RE.search(message.upper())
+    if match:
+        return {"intent": "part_number", "entities": {"part_number": match.group(0)}, "language": language}
+    if any(lowered.strip().startswith(g) for g in GREETINGS):
+        return {"intent": "greeting", "entities": {}, "language": language}
+    entities = {}
+    for table, key in ((MAKES, "car_make"), (MODELS, "car_model"), (PARTS, "part_name")):
+        for word, value in table.items():
+            if word in lowered:
+                entities[key] = value
+                break
+    return {"intent": "car_part" if entities else "unknown", "entities": entities, "language": language}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+    service = ""
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    # Requests served, by status (shared across handlers of one service)
+    hits: dict[int, int] = {}
+    hits_lock = threading.Lock()
+
+    def log_message(self, format, *args):  # noqa: A002 - signature fixed by BaseHTTPRequestHandler
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.latency:
+            spread = self.latency * self.jitter
+            time.sleep(max(0.0, self.latency + random.uniform(-spread, spread)))
+        if self.error_rate and random.random() < self.error_rate:
+            self._send(500, {"error": {"message": "injected failure"}})
+            return
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        handler = getattr(self, f"_{self.service}", None)
+        status, payload = handler(method, url.path, query, body) if handler else (404, {"error": "unknown service"})
+        self._send(status, payload)
+
+    def _send(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        with self.hits_lock:
+            self.hits[status] = self.hits.get(status, 0) + 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # ---- Services
+
+    def _graph(self, method, path, query, body):
+        if method != "POST" or not path.endswith("/messages"):
+            return 404, {"error": {"message": "unknown endpoint"}}
+        to = json.loads(body or b"{}").get("to", "")
+        return 200, {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": to, "wa_id": to}],
+            "messages": [{"id": f"wamid.{uuid.uuid4().hex}"}],
+        }
+
+    def _openai(self, method, path, query, body):
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": "unknown endpoint"}}
+        request = json.loads(body or b"{}")
+        messages = request.get("messages", [])
+        system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        if "Respond ONLY with valid JSON" in system:
+            content = json.dumps(classify(user), ensure_ascii=False)
+        else:
+            arabic = "language preference is: ar" in user
+            content = "وجدنا القطع المطلوبة. هل تريد طلبها؟" if arabic else "We found matching parts. Would you like to order?"
+        return 200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o-mini"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 120, "completion_tokens": 40, "total_tokens": 160},
+        }
+
+    def _carparts(self, method, path, query, body):
+        part_number = query.get("part_number", "")
+        if not part_number or not is_known(part_number):
+            return 404, {"error": "not found"}
+        return 200, {"stocks": [
+            {"part_number": part_number, "name": "Brake Pad", "brand": "Denso", "price": "185.00", "quantity": 4},
+            {"part_number": part_number, "name": "Brake Pad", "brand": "Bosch", "price": "160.00", "quantity": 2},
+        ]}
+
+    def _chassis(self, method, path, query, body):
+        chassis = query.get("chassis", "")
+        if not path.endswith("/lookup") or not chassis or not is_known(chassis):
+            return 404, {"error": "not found"}
+        return 200, {"make": "Toyota", "model": "Corolla", "year": 2018}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Load tests open many connections at once
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # The app drops requests it no longer needs (e.g. the CarPartsDubai probe after a local hit)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def serve_stubs(
+    latency_ms: dict[str, float] | None = None,
+    jitter: float = 0.0,
+    error_rate: dict[str, float] | None = None,
+    host: str = "127.0.0.1",
+) -> dict[str, StubServer]:
+    """Start every stub on its own free port (daemon threads); returns {service: server}."""
+    latency_ms = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+    error_rate = error_rate or {}
+    servers = {}
+    for service in SERVICES:
+        handler = type(
+            f"{service.title()}StubHandler",
+            (StubHandler,),
+            {
+                "service": service,
+                "latency": latency_ms[service] / 1000,
+                "jitter": jitter,
+                "error_rate": error_rate.get(service, 0.0),
+                "hits": {},
+            },
+        )
+        server = StubServer((host, 0), handler)
+        threading.Thread(target=server.serve_forever, name=f"stub-{service}", daemon=True).start()
+        servers[service] = server
+    return servers
+
+
+def stub_env(servers: dict[str, StubServer]) -> dict[str, str]:
+    """App settings that point every external call at the stubs."""
+    def url(service: str) -> str:
+        host, port = servers[service].server_address[:2]
+        return f"http://{host}:{port}"
+
+    return {
+        "META_GRAPH_API_URL": f"{url('graph')}/v18.0",
+        "META_ACCESS_TOKEN": "stub-token",
+        "META_PHONE_NUMBER_ID": "100000000000001",
+        "OPENAI_BASE_URL": f"{url('openai')}/v1",
+        "OPENAI_API_KEY": "sk-stub",
+        "CARPARTSDUBAI_STOCK_URL": f"{url('carparts')}/stock-details",
+        "CHASSIS_API_BASE_URL": url("chassis"),
+        "CHASSIS_API_KEY": "stub-key",
+    }
+
+
+def parse_service_values(items: list[str], name: str) -> dict[str, float]:
+    """["openai=400", "graph=80"] -> {"openai": 400.0, "graph": 80.0}."""
+    values = {}
+    for item in items or []:
+        service, _, value = item.partition("=")
+        if service not in SERVICES or not value:
+            raise SystemExit(f"--{name}: expected SERVICE=NUMBER with SERVICE in {', '.join(SERVICES)}, got {item!r}")
+        values[service] = float(value)
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", nargs="*", default=[], help="per-service latency in ms, e.g. openai=400")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency varies by +/- this fraction")
+    parser.add_argument("--error-rate", nargs="*", default=[], help="per-service share of 500s, e.g. chassis=0.05")
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+    servers = serve_stubs(
+        parse_service_values(args.latency, "latency"),
+        args.jitter,
+        parse_service_values(args.error_rate, "error-rate"),
+        args.host,
+    )
+    print("Stubs running; start the app with:")
+    for key, value in stub_env(servers).items():
+        print(f"  {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()